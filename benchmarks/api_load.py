@@ -0,0 +1,490 @@
+"""Load test of the API hot paths against a seeded database.
+
+Seeds a fresh SQLite database with users, cards per user and transactions
+per card, then runs each scenario against the real app, either in-process
+over ASGI or through uvicorn on loopback, and writes a JSON report with
+throughput and p50/p95/p99 latency per scenario. Runs use a fixed random
+seed, so reports from two commits can be put side by side with ``compare``.
+
+    python benchmarks/api_load.py run [--transport asgi|uvicorn] [--users 100]
+        [--cards-per-user 3] [--transactions-per-card 500] [--requests 2000]
+        [--concurrency 16] [--scenarios users_me,list_cards,...] [--output report.json]
+    python benchmarks/api_load.py compare before.json after.json
+
+Scenarios: token (password login, bcrypt bound, so it runs a tenth of the
+requests), users_me, list_cards, transactions_cursor (follows the cursor
+through a card's whole history), transactions_offset (pages deep with
+skip), create_transactions (write burst) and mixed. Rate limits are lifted
+and logging is left unconfigured, so stdout carries only the report.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PASSWORD = "BenchPass123!"
+
+Response = Tuple[int, Dict[str, str], bytes]
+
+def prepare_environment(workdir: str) -> None:
+    """Point the app at a scratch database and lift limits; must run before importing it."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["AUDIT_LOG_PATH"] = os.path.join(workdir, "audit.log")
+    os.environ["RATE_LIMIT_ROUTES"] = ""
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    sys.path.insert(0, os.path.join(ROOT, "src"))
+
+def bench_app():
+    from app.core.settings import Settings
+    from main import create_app
+
+    return create_app(Settings(rate_limit=10 ** 9, login_max_attempts=10 ** 9, configure_logging=False))
+
+def seed(users: int, cards_per_user: int, transactions_per_card: int, rng: random.Random) -> Dict[str, Any]:
+    """Create the schema and bulk-insert the dataset; returns what the scenarios need."""
+    from sqlalchemy import insert
+
+    from app.core.security import get_password_hash
+    from app.crud.balance import rebuild_balances
+    from app.database.database import SessionLocal, engine, init_db
+    from app.models.models import Card, Transaction, User
+
+    init_db()
+    hashed = get_password_hash(PASSWORD)
+    now = datetime(2024, 1, 1)
+    words = ["coffee", "rent", "salary", "groceries", "fuel", "books", "gym", "travel", "dinner", "refund"]
+    emails = [f"user{i}@bench.example" for i in range(users)]
+    cards: Dict[str, List[int]] = {}
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"id": i + 1, "email": email, "hashed_password": hashed, "full_name": f"User {i}", "is_active": True}
+            for i, email in enumerate(emails)
+        ])
+        card_rows = []
+        for i, email in enumerate(emails):
+            cards[email] = []
+            for _ in range(cards_per_user):
+                card_id = len(card_rows) + 1
+                cards[email].append(card_id)
+                card_rows.append({
+                    "id": card_id,
+                    "card_number": "".join(rng.choice("0123456789") for _ in range(16)),
+                    "card_name": f"Card {card_id}",
+                    "bank_name": rng.choice(["North Bank", "City Credit", "Union Savings"]),
+                    "owner_id": i + 1,
+                })
+        connection.execute(insert(Card), card_rows)
+        for card in card_rows:
+            connection.execute(insert(Transaction), [
+                {
+                    "amount": round(rng.uniform(1, 500), 2),
+                    "description": f"{rng.choice(words)} {rng.choice(words)}",
+                    "date": now - timedelta(minutes=rng.randrange(365 * 24 * 60)),
+                    "type": "income" if rng.random() < 0.2 else "expense",
+                    "card_id": card["id"],
+                }
+                for _ in range(transactions_per_card)
+            ])
+    db = SessionLocal()
+    try:
+        rebuild_balances(db)
+        db.commit()
+    finally:
+        db.close()
+    return {"emails": emails, "cards": cards}
+
+class ASGIClient:
+    """Calls the app directly, the way a server would, without a socket."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str, headers: Dict[str, str], body: bytes = b"") -> Response:
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+            "root_path": "", "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 80),
+            "headers": [(b"host", b"bench")] + [
+                (name.lower().encode(), value.encode()) for name, value in headers.items()
+            ] + [(b"content-length", str(len(body)).encode())],
+        }
+        sent = False
+        disconnected = asyncio.Event()
+        status, response_headers, chunks = 0, {}, []
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers.update((k.decode().lower(), v.decode()) for k, v in message.get("headers", ()))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            disconnected.set()
+        return status, response_headers, b"".join(chunks)
+
+    async def close(self) -> None:
+        pass
+
+class HTTPClient:
+    """Minimal keep-alive HTTP/1.1 client, one connection per worker."""
+
+    def __init__(self, port: int):
+        self.port = port
+        self._connection: Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = None
+
+    async def request(self, method: str, path: str, headers: Dict[str, str], body: bytes = b"") -> Response:
+        if self._connection is None:
+            self._connection = await asyncio.open_connection("127.0.0.1", self.port)
+        reader, writer = self._connection
+        lines = [f"{method} {path} HTTP/1.1", f"Host: 127.0.0.1:{self.port}", f"Content-Length: {len(body)}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+
+        status = int((await reader.readline()).split()[1])
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+        if response_headers.get("transfer-encoding") == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).strip(), 16)
+                chunks.append(await reader.readexactly(size + 2))
+                if not size:
+                    break
+            data = b"".join(chunk[:-2] for chunk in chunks)
+        else:
+            data = await reader.readexactly(int(response_headers.get("content-length", "0")))
+        if response_headers.get("connection") == "close":
+            await self.close()
+        return status, response_headers, data
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            self._connection[1].close()
+            self._connection = None
+
+class Worker:
+    """State one simulated client keeps between requests."""
+
+    def __init__(self, client, dataset: Dict[str, Any], tokens: Dict[str, str], rng: random.Random):
+        self.client = client
+        self.dataset = dataset
+        self.tokens = tokens
+        self.rng = rng
+        self.cursor: Optional[Tuple[str, int, Optional[str]]] = None
+
+    def user(self) -> Tuple[str, Dict[str, str]]:
+        email = self.rng.choice(self.dataset["emails"])
+        return email, {"Authorization": f"Bearer {self.tokens[email]}"}
+
+    async def token(self) -> Response:
+        email = self.rng.choice(self.dataset["emails"])
+        body = urlencode({"username": email, "password": PASSWORD}).encode()
+        return await self.client.request(
+            "POST", "/api/v1/token", {"Content-Type": "application/x-www-form-urlencoded"}, body
+        )
+
+    async def users_me(self) -> Response:
+        _, headers = self.user()
+        return await self.client.request("GET", "/api/v1/users/me/", headers)
+
+    async def list_cards(self) -> Response:
+        _, headers = self.user()
+        return await self.client.request("GET", "/api/v1/cards/?include_balance=true", headers)
+
+    async def transactions_cursor(self) -> Response:
+        if self.cursor is None:
+            email, _ = self.user()
+            self.cursor = (email, self.rng.choice(self.dataset["cards"][email]), None)
+        email, card_id, cursor = self.cursor
+        path = f"/api/v1/cards/{card_id}/transactions/?limit=100"
+        if cursor:
+            path += f"&cursor={cursor}"
+        response = await self.client.request("GET", path, {"Authorization": f"Bearer {self.tokens[email]}"})
+        following = response[1].get("x-next-cursor")
+        self.cursor = (email, card_id, following) if following else None
+        return response
+
+    async def transactions_offset(self) -> Response:
+        email, headers = self.user()
+        card_id = self.rng.choice(self.dataset["cards"][email])
+        skip = self.rng.randrange(max(1, self.dataset["transactions_per_card"] - 100))
+        return await self.client.request("GET", f"/api/v1/cards/{card_id}/transactions/?limit=100&skip={skip}", headers)
+
+    async def create_transactions(self) -> Response:
+        email, headers = self.user()
+        card_id = self.rng.choice(self.dataset["cards"][email])
+        body = json.dumps({"amount": round(self.rng.uniform(1, 500), 2), "description": "bench purchase", "type": "expense"})
+        return await self.client.request(
+            "POST", f"/api/v1/cards/{card_id}/transactions/", {**headers, "Content-Type": "application/json"}, body.encode()
+        )
+
+    async def mixed(self) -> Response:
+        scenario = self.rng.choices(
+            [self.users_me, self.list_cards, self.transactions_cursor, self.transactions_offset, self.create_transactions],
+            weights=[30, 20, 30, 5, 15]
+        )[0]
+        return await scenario()
+
+# Scenario name -> share of --requests it runs
+SCENARIOS = {
+    "token": 0.1,
+    "users_me": 1.0,
+    "list_cards": 1.0,
+    "transactions_cursor": 1.0,
+    "transactions_offset": 1.0,
+    "create_transactions": 1.0,
+    "mixed": 1.0,
+}
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+async def run_scenario(
+    name: str,
+    make_client: Callable[[], Any],
+    dataset: Dict[str, Any],
+    tokens: Dict[str, str],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    seed_value: int
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    remaining = warmup + requests
+    # Wall-clock span of the measured requests, for throughput
+    window = [float("inf"), 0.0]
+
+    async def work(index: int) -> None:
+        nonlocal remaining
+        client = make_client()
+        worker = Worker(client, dataset, tokens, random.Random(f"{seed_value}-{name}-{index}"))
+        scenario: Callable[[], Awaitable[Response]] = getattr(worker, name)
+        try:
+            while remaining > 0:
+                remaining -= 1
+                measured = remaining < requests
+                started = time.perf_counter()
+                status, _, _ = await scenario()
+                if measured:
+                    finished = time.perf_counter()
+                    latencies.append(finished - started)
+                    statuses[status] += 1
+                    window[0], window[1] = min(window[0], started), max(window[1], finished)
+        finally:
+            await client.close()
+
+    await asyncio.gather(*(work(index) for index in range(concurrency)))
+    elapsed = window[1] - window[0]
+    ordered = sorted(latencies)
+    errors = {str(status): count for status, count in sorted(statuses.items()) if not 200 <= status < 300}
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "duration_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(ordered, 0.50) * 1000, 3),
+            "p95": round(percentile(ordered, 0.95) * 1000, 3),
+            "p99": round(percentile(ordered, 0.99) * 1000, 3),
+            "mean": round(statistics.fmean(ordered) * 1000, 3),
+            "max": round(ordered[-1] * 1000, 3),
+        },
+    }
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+def _wait_for_port(port: int, server: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("uvicorn did not start listening")
+
+def _git_commit() -> Optional[str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+async def run_suite(args: argparse.Namespace, workdir: str) -> Dict[str, Any]:
+    from app.core.security import create_access_token
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    dataset = seed(args.users, args.cards_per_user, args.transactions_per_card, rng)
+    dataset["transactions_per_card"] = args.transactions_per_card
+    seed_seconds = time.perf_counter() - started
+    tokens = {email: create_access_token({"sub": email}, timedelta(hours=12)) for email in dataset["emails"]}
+
+    server = lifespan = None
+    if args.transport == "uvicorn":
+        port = _free_port()
+        server = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "serve", "--workdir", workdir, "--port", str(port)],
+            env=os.environ.copy()
+        )
+        _wait_for_port(port, server)
+        make_client = lambda: HTTPClient(port)  # noqa: E731
+    else:
+        app = bench_app()
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__anext__()
+        make_client = lambda: ASGIClient(app)  # noqa: E731
+
+    scenarios = {}
+    try:
+        for name in args.scenarios:
+            requests = max(1, int(args.requests * SCENARIOS[name]))
+            warmup = max(1, int(args.warmup * SCENARIOS[name]))
+            scenarios[name] = await run_scenario(
+                name, make_client, dataset, tokens, requests, args.concurrency, warmup, args.seed
+            )
+            print(f"{name}: {scenarios[name]['throughput_rps']} req/s, p99 {scenarios[name]['latency_ms']['p99']} ms", file=sys.stderr)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if lifespan is not None:
+            # Resume the lifespan generator past its yield to run the shutdown steps
+            try:
+                await lifespan.__anext__()
+            except StopAsyncIteration:
+                pass
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "transport": args.transport,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "dataset": {
+                "users": args.users,
+                "cards": args.users * args.cards_per_user,
+                "transactions": args.users * args.cards_per_user * args.transactions_per_card,
+                "seed_seconds": round(seed_seconds, 2),
+            },
+        },
+        "scenarios": scenarios,
+    }
+
+def compare(before_path: str, after_path: str) -> None:
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    def change(old: float, new: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    print(f"{'scenario':<22} {'req/s':>20} {'p50 ms':>20} {'p99 ms':>20}")
+    for name, new in after["scenarios"].items():
+        old = before["scenarios"].get(name)
+        if old is None:
+            continue
+        cells = [
+            f"{old['throughput_rps']:g}->{new['throughput_rps']:g} {change(old['throughput_rps'], new['throughput_rps'])}",
+            *(
+                f"{old['latency_ms'][key]:g}->{new['latency_ms'][key]:g} {change(old['latency_ms'][key], new['latency_ms'][key])}"
+                for key in ("p50", "p99")
+            ),
+        ]
+        print(f"{name:<22} " + " ".join(f"{cell:>20}" for cell in cells))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Seed a database and run the scenarios")
+    run.add_argument("--transport", choices=("asgi", "uvicorn"), default="asgi")
+    run.add_argument("--users", type=int, default=100)
+    run.add_argument("--cards-per-user", type=int, default=3)
+    run.add_argument("--transactions-per-card", type=int, default=500)
+    run.add_argument("--requests", type=int, default=2000, help="measured requests per scenario")
+    run.add_argument("--warmup", type=int, default=100, help="unmeasured requests per scenario")
+    run.add_argument("--concurrency", type=int, default=16)
+    run.add_argument("--scenarios", type=lambda value: value.split(","), default=list(SCENARIOS))
+    run.add_argument("--seed", type=int, default=1234)
+    run.add_argument("--output", help="write the JSON report here instead of stdout")
+
+    serve = commands.add_parser("serve", help="Run the app under uvicorn (used by --transport uvicorn)")
+    serve.add_argument("--workdir", required=True)
+    serve.add_argument("--port", type=int, required=True)
+
+    diff = commands.add_parser("compare", help="Compare two JSON reports")
+    diff.add_argument("before")
+    diff.add_argument("after")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        compare(args.before, args.after)
+        return
+    if args.command == "serve":
+        prepare_environment(args.workdir)
+        import uvicorn
+
+        uvicorn.run(bench_app(), host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+        return
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    with tempfile.TemporaryDirectory(prefix="budget-bench-") as workdir:
+        prepare_environment(workdir)
+        report = asyncio.run(run_suite(args, workdir))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
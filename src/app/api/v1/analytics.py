@@ -0,0 +1,34 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+
+from ...crud import analytics as analytics_crud
+from ...crud import card as card_crud
+from ...schemas import schemas
+from ...core.principal_cache import Principal
+from ...dependencies import DBSession, get_current_user, get_read_session, run_db
+
+router = APIRouter()
+
+@router.get("/cards/{card_id}/analytics", response_model=schemas.CardAnalytics)
+async def read_card_analytics(
+    card_id: int,
+    bucket: str = Query("month", regex="^(day|week|month)$"),
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    db: DBSession = Depends(get_read_session),
+    current_user: Principal = Depends(get_current_user)
+):
+    card = await run_db(db, card_crud.get_card, card_id=card_id)
+    if card is None or card.owner_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Card not found")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    return await run_db(
+        db,
+        analytics_crud.get_card_analytics,
+        card_id=card_id,
+        bucket=bucket,
+        date_from=date_from,
+        date_to=date_to
+    )
@@ -2,16 +2,15 @@ from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from jose import JWTError, jwt
 from passlib.context import CryptContext
 import re
 import logging
 
-from ...crud.user import create_user, get_user_by_email
-from ...database.database import get_db
+from ...crud.user import create_user, get_user, get_user_by_email
+from ...dependencies import DBSession, get_current_user, get_read_session, get_session, run_db, run_write
+from ...core.principal_cache import Principal
 from ...schemas.schemas import Token, UserCreate, User
-from ...core.security import verify_password, create_access_token
+from ...core.security import verify_password_async, get_password_hash_async, create_access_token
 from ...core.monitoring import record_security_event
 
 logger = logging.getLogger(__name__)
@@ -35,10 +34,10 @@ def validate_password(password: str) -> bool:
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_session)
 ):
-    user = get_user_by_email(db, form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await run_db(db, get_user_by_email, form_data.username)
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         record_security_event(
             "failed_login_attempt",
             f"Failed login attempt for user: {form_data.username}",
@@ -65,9 +64,13 @@ async def login_for_access_token(
     
     return {"access_token": access_token, "token_type": "bearer"}
 
+def _create_user_response(db, user: UserCreate, hashed_password: str) -> User:
+    # Serialized inside the session call: the new user lazy-loads its cards
+    return User.from_orm(create_user(db=db, user=user, hashed_password=hashed_password))
+
 @router.post("/users/", response_model=User)
-def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = get_user_by_email(db, email=user.email)
+async def create_new_user(user: UserCreate, db: DBSession = Depends(get_session)):
+    db_user = await run_db(db, get_user_by_email, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=400,
@@ -75,40 +78,31 @@ def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
         )
     # Validate password complexity
     if not validate_password(user.password):
-        logger.warning(f"Password complexity check failed for: {user.email}", 
+        logger.warning("Password complexity check failed for: %s", user.email, 
                      extra={"security": True})
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Password must be at least 8 characters and contain at least one letter, one number, and one special character"
         )
-    created_user = create_user(db=db, user=user)
-    logger.info(f"New user registered: {user.email}", 
+    hashed_password = await get_password_hash_async(user.password)
+    created_user = await run_write(
+        db, _create_user_response, user=user, hashed_password=hashed_password
+    )
+    logger.info("New user registered: %s", user.email, 
                extra={"security": True})
     record_security_event("user_created", f"New user created: {user.email}")
     return created_user
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = get_user_by_email(db, email=email)
-    if user is None:
-        raise credentials_exception
-    return user
-
 @router.get("/users/me/", response_model=User)
-async def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(
+    principal: Principal = Depends(get_current_user),
+    db: DBSession = Depends(get_read_session)
+):
+    current_user = await run_db(db, get_user, principal.id, with_cards=True)
+    if current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return current_user
\ No newline at end of file
@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Response
+from typing import List, Optional
 
+from ...crud import balance as balance_crud
 from ...crud import card as card_crud
 from ...schemas import schemas
-from ...dependencies import get_db, get_current_user
+from ...core.principal_cache import Principal
+from ...core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from ...dependencies import (
+    DBSession,
+    get_current_user,
+    get_read_session,
+    get_session,
+    get_write_session,
+    run_db,
+    run_write
+)
 
 router = APIRouter()
 
@@ -14,49 +24,91 @@ def mask_card_number(card_number: str) -> str:
         return ""
     return "*" * (len(card_number) - 4) + card_number[-4:]
 
-def mask_card_response(card: schemas.Card) -> schemas.Card:
+def mask_card_response(card: schemas.CardSummary) -> schemas.CardSummary:
     """Mask sensitive data in card response"""
     card.card_number = mask_card_number(card.card_number)
     return card
 
-@router.post("/cards/", response_model=schemas.Card)
-def create_card(
+def _card_summary(card, with_balance: bool) -> schemas.CardSummary:
+    if with_balance:
+        return schemas.CardSummary.from_orm(card)
+    # The listing query leaves the balance unloaded, so it is not read here
+    fields = {name: getattr(card, name) for name in schemas.CardSummary.__fields__ if name != "balance"}
+    return schemas.CardSummary(**fields)
+
+def _create_card_summary(db, card: schemas.CardCreate, user_id: int) -> schemas.CardSummary:
+    # Serialized inside the session call: the refreshed card lazy-loads its balance
+    db_card = card_crud.create_card(db=db, card=card, user_id=user_id)
+    return mask_card_response(schemas.CardSummary.from_orm(db_card))
+
+@router.post("/cards/", response_model=schemas.CardSummary)
+async def create_card(
     card: schemas.CardCreate,
-    db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(get_current_user)
+    db: DBSession = Depends(get_write_session),
+    current_user: Principal = Depends(get_current_user)
 ):
-    db_card = card_crud.create_card(db=db, card=card, user_id=current_user.id)
-    return mask_card_response(schemas.Card.from_orm(db_card))
+    return await run_write(db, _create_card_summary, card=card, user_id=current_user.id)
 
-@router.get("/cards/", response_model=List[schemas.Card])
-def read_cards(
+@router.get("/cards/", response_model=List[schemas.CardSummary])
+async def read_cards(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    include_balance: bool = False,
+    db: DBSession = Depends(get_read_session),
+    current_user: Principal = Depends(get_current_user)
 ):
-    cards = card_crud.get_user_cards(db, user_id=current_user.id, skip=skip, limit=limit)
-    return [mask_card_response(schemas.Card.from_orm(card)) for card in cards]
+    after_id = None
+    if cursor is not None:
+        try:
+            after_id = int(decode_cursor(cursor)["id"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    cards = await run_db(
+        db,
+        card_crud.get_user_cards,
+        user_id=current_user.id,
+        skip=skip,
+        limit=limit,
+        after_id=after_id,
+        with_balance=include_balance
+    )
+    if cards and len(cards) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor({"id": cards[-1].id})
+    return [mask_card_response(_card_summary(card, include_balance)) for card in cards]
 
 @router.get("/cards/{card_id}", response_model=schemas.Card)
-def read_card(
+async def read_card(
     card_id: int,
-    db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(get_current_user)
+    db: DBSession = Depends(get_read_session),
+    current_user: Principal = Depends(get_current_user)
 ):
-    db_card = card_crud.get_card(db, card_id=card_id)
+    db_card = await run_db(db, card_crud.get_card, card_id=card_id, with_transactions=True)
     if db_card is None or db_card.owner_id != current_user.id:
         raise HTTPException(status_code=404, detail="Card not found")
     return mask_card_response(schemas.Card.from_orm(db_card))
 
+@router.get("/cards/{card_id}/balance", response_model=schemas.CardBalance)
+async def read_card_balance(
+    card_id: int,
+    # Primary: a missing balance row is rebuilt and committed on first read
+    db: DBSession = Depends(get_session),
+    current_user: Principal = Depends(get_current_user)
+):
+    db_card = await run_db(db, card_crud.get_card, card_id=card_id)
+    if db_card is None or db_card.owner_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Card not found")
+    return await run_db(db, balance_crud.get_card_balance, card_id=card_id)
+
 @router.delete("/cards/{card_id}", response_model=schemas.Card)
-def delete_card(
+async def delete_card(
     card_id: int,
-    db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(get_current_user)
+    db: DBSession = Depends(get_write_session),
+    current_user: Principal = Depends(get_current_user)
 ):
-    db_card = card_crud.get_card(db, card_id=card_id)
+    db_card = await run_db(db, card_crud.get_card, card_id=card_id)
     if db_card is None or db_card.owner_id != current_user.id:
         raise HTTPException(status_code=404, detail="Card not found")
-    card_crud.delete_card(db=db, card_id=card_id)
+    await run_write(db, card_crud.delete_card, card_id=card_id)
     return {"message": "Card deleted successfully"}
\ No newline at end of file
@@ -1,55 +1,255 @@
-from fastapi import APIRouter, Depends, HTTPException
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, Iterator, List, Optional
 
 from ...crud import transaction as transaction_crud
 from ...crud import card as card_crud
 from ...schemas import schemas
-from ...dependencies import get_db, get_current_user
+from ...core.principal_cache import Principal
+from ...core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from ...dependencies import (
+    DBSession,
+    get_current_user,
+    get_read_db,
+    get_read_session,
+    get_write_session,
+    run_db,
+    run_write
+)
 
 router = APIRouter()
 
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "50000"))
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+# Placeholder for NDJSON lines that are not valid JSON
+_INVALID_JSON = object()
+
+async def _read_bulk_records(request: Request) -> List[Any]:
+    """Read a JSON array or an NDJSON stream of records from the body."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type in NDJSON_CONTENT_TYPES:
+        records: List[Any] = []
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            records.extend(_parse_ndjson_line(line) for line in lines if line.strip())
+            if len(records) > BULK_MAX_ROWS:
+                break
+        if buffer.strip():
+            records.append(_parse_ndjson_line(buffer))
+    else:
+        try:
+            records = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Request body must be valid JSON")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Request body must be a JSON array")
+    if len(records) > BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {BULK_MAX_ROWS} transactions per request"
+        )
+    return records
+
+def _parse_ndjson_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError:
+        return _INVALID_JSON
+
 @router.post("/cards/{card_id}/transactions/", response_model=schemas.Transaction)
-def create_transaction(
+async def create_transaction(
     card_id: int,
     transaction: schemas.TransactionCreate,
-    db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(get_current_user)
+    db: DBSession = Depends(get_write_session),
+    current_user: Principal = Depends(get_current_user)
 ):
-    card = card_crud.get_card(db, card_id=card_id)
+    card = await run_db(db, card_crud.get_card, card_id=card_id)
     if card is None or card.owner_id != current_user.id:
         raise HTTPException(status_code=404, detail="Card not found")
-    return transaction_crud.create_transaction(
-        db=db, transaction=transaction, card_id=card_id
+    return await run_write(
+        db, transaction_crud.create_transaction, transaction=transaction, card_id=card_id
     )
 
+@router.post(
+    "/cards/{card_id}/transactions/bulk",
+    response_model=schemas.BulkTransactionResult
+)
+async def create_transactions_bulk(
+    card_id: int,
+    request: Request,
+    db: DBSession = Depends(get_write_session),
+    current_user: Principal = Depends(get_current_user)
+):
+    card = await run_db(db, card_crud.get_card, card_id=card_id)
+    if card is None or card.owner_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Card not found")
+
+    records = await _read_bulk_records(request)
+    # Plain dicts: validating thousands of result models dominates otherwise
+    results: List[dict] = []
+    valid: List[schemas.TransactionCreate] = []
+    valid_results: List[dict] = []
+    for index, record in enumerate(records):
+        if record is _INVALID_JSON:
+            results.append({"index": index, "status": "invalid", "id": None, "errors": ["Invalid JSON"]})
+            continue
+        try:
+            transaction = schemas.TransactionCreate.parse_obj(record)
+        except ValidationError as exc:
+            errors = [
+                f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}"
+                for err in exc.errors()
+            ]
+            results.append({"index": index, "status": "invalid", "id": None, "errors": errors})
+            continue
+        result = {"index": index, "status": "created", "id": None, "errors": []}
+        results.append(result)
+        valid.append(transaction)
+        valid_results.append(result)
+
+    if valid:
+        ids = await run_write(db, transaction_crud.create_transactions_bulk, valid, card_id)
+        for result, transaction_id in zip(valid_results, ids):
+            result["id"] = transaction_id
+
+    return JSONResponse(content={
+        "created": len(valid),
+        "failed": len(results) - len(valid),
+        "results": results
+    })
+
 @router.get("/cards/{card_id}/transactions/", response_model=List[schemas.Transaction])
-def read_transactions(
+async def read_transactions(
     card_id: int,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    transaction_type: Optional[str] = Query(None, alias="type"),
+    db: DBSession = Depends(get_read_session),
+    current_user: Principal = Depends(get_current_user)
+):
+    card = await run_db(db, card_crud.get_card, card_id=card_id)
+    if card is None or card.owner_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Card not found")
+    after = None
+    if cursor is not None:
+        values = decode_cursor(cursor)
+        try:
+            after = (datetime.fromisoformat(values["date"]), int(values["id"]))
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    transactions = await run_db(
+        db,
+        transaction_crud.get_card_transactions,
+        card_id=card_id,
+        skip=skip,
+        limit=limit,
+        after=after,
+        date_from=date_from,
+        date_to=date_to,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        transaction_type=transaction_type
+    )
+    if transactions and len(transactions) == limit:
+        last = transactions[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            {"date": last.date.isoformat(), "id": last.id}
+        )
+    return transactions
+
+def _export_csv(batches) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(transaction_crud.EXPORT_COLUMNS)
+    for rows in batches:
+        writer.writerows(
+            (row.id, row.date.isoformat() if row.date else "", row.type, row.amount, row.description)
+            for row in rows
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def _export_ndjson(batches) -> Iterator[str]:
+    for rows in batches:
+        yield "".join(
+            json.dumps({
+                "id": row.id,
+                "date": row.date.isoformat() if row.date else None,
+                "type": row.type,
+                "amount": row.amount,
+                "description": row.description
+            }) + "\n"
+            for row in rows
+        )
+
+EXPORT_FORMATS = {
+    "csv": (_export_csv, "text/csv"),
+    "ndjson": (_export_ndjson, "application/x-ndjson"),
+}
+
+@router.get("/cards/{card_id}/transactions/export")
+def export_transactions(
+    card_id: int,
+    export_format: str = Query("csv", alias="format", regex="^(csv|ndjson)$"),
+    # The batches are read lazily while the response streams, which needs a
+    # sync session even when the rest of the API runs on the async engine
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     card = card_crud.get_card(db, card_id=card_id)
     if card is None or card.owner_id != current_user.id:
         raise HTTPException(status_code=404, detail="Card not found")
-    return transaction_crud.get_card_transactions(
-        db, card_id=card_id, skip=skip, limit=limit
+    formatter, media_type = EXPORT_FORMATS[export_format]
+    batches = transaction_crud.stream_card_transactions(db, card_id=card_id)
+    return StreamingResponse(
+        formatter(batches),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="card-{card_id}-transactions.{export_format}"'
+        }
+    )
+
+@router.get("/transactions/search", response_model=List[schemas.Transaction])
+async def search_transactions(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(50, ge=1, le=200),
+    db: DBSession = Depends(get_read_session),
+    current_user: Principal = Depends(get_current_user)
+):
+    return await run_db(
+        db, transaction_crud.search_transactions, user_id=current_user.id, query=q, limit=limit
     )
 
 @router.delete("/transactions/{transaction_id}", response_model=schemas.Transaction)
-def delete_transaction(
+async def delete_transaction(
     transaction_id: int,
-    db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(get_current_user)
+    db: DBSession = Depends(get_write_session),
+    current_user: Principal = Depends(get_current_user)
 ):
-    transaction = transaction_crud.get_transaction(db, transaction_id=transaction_id)
+    transaction = await run_db(db, transaction_crud.get_transaction, transaction_id=transaction_id)
     if transaction is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
-    card = card_crud.get_card(db, card_id=transaction.card_id)
+    card = await run_db(db, card_crud.get_card, card_id=transaction.card_id)
     if card.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    return transaction_crud.delete_transaction(db=db, transaction_id=transaction_id)
\ No newline at end of file
+    return await run_write(db, transaction_crud.delete_transaction, transaction_id=transaction_id)
\ No newline at end of file
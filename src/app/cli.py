@@ -0,0 +1,34 @@
+import argparse
+
+from .database.database import SessionLocal, init_db
+from .crud.balance import rebuild_balances
+
+def _rebuild_balances(args: argparse.Namespace) -> None:
+    db = SessionLocal()
+    try:
+        count = rebuild_balances(db, card_id=args.card_id)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Rebuilt balances for {count} card(s)")
+
+def _migrate(args: argparse.Namespace) -> None:
+    init_db()
+    print("Database schema is up to date")
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Budget API maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate = subparsers.add_parser("migrate", help="Create missing tables and indexes")
+    migrate.set_defaults(func=_migrate)
+
+    rebuild = subparsers.add_parser("rebuild-balances", help="Recompute per-card balances from transactions")
+    rebuild.add_argument("--card-id", type=int, default=None, help="Only rebuild this card")
+    rebuild.set_defaults(func=_rebuild_balances)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
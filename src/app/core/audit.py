@@ -0,0 +1,532 @@
+import calendar
+import gzip
+import json
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .event_store import to_timestamp
+from .metrics import AUDIT_BATCH_SIZE, AUDIT_EVENTS, AUDIT_QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+# Audit log configuration
+AUDIT_LOG_PATH = Path(os.getenv("AUDIT_LOG_PATH", "audit.log"))
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_MAX = int(os.getenv("AUDIT_BATCH_MAX", "512"))
+AUDIT_FLUSH_INTERVAL_MS = float(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "50"))
+# "always" fsyncs every batch, "interval" at most every AUDIT_FSYNC_INTERVAL_SECONDS,
+# "never" leaves it to the OS
+AUDIT_FSYNC = os.getenv("AUDIT_FSYNC", "interval")
+AUDIT_FSYNC_INTERVAL_SECONDS = float(os.getenv("AUDIT_FSYNC_INTERVAL_SECONDS", "1"))
+# Rotate when the file would pass this size or is this old; 0 disables
+AUDIT_MAX_BYTES = int(os.getenv("AUDIT_MAX_BYTES", str(50 * 1024 * 1024)))
+AUDIT_ROTATE_SECONDS = float(os.getenv("AUDIT_ROTATE_SECONDS", "86400"))
+# How long a caller may wait for room in a full queue before the event is dropped
+AUDIT_BLOCK_SECONDS = float(os.getenv("AUDIT_BLOCK_SECONDS", "0"))
+# Each file has a sidecar index with one entry per block of this many seconds or bytes
+AUDIT_INDEX_BLOCK_SECONDS = float(os.getenv("AUDIT_INDEX_BLOCK_SECONDS", "60"))
+AUDIT_INDEX_BLOCK_BYTES = int(os.getenv("AUDIT_INDEX_BLOCK_BYTES", str(256 * 1024)))
+# "gzip" compresses rotated segments in the background, "none" leaves them as they are
+AUDIT_COMPRESS = os.getenv("AUDIT_COMPRESS", "gzip")
+# How far out of timestamp order events may reach the writer
+AUDIT_MAX_SKEW_SECONDS = float(os.getenv("AUDIT_MAX_SKEW_SECONDS", "60"))
+
+FSYNC_POLICIES = ("always", "interval", "never")
+COMPRESS_POLICIES = ("gzip", "none")
+
+INDEX_SUFFIX = ".idx"
+ARCHIVE_SUFFIX = ".gz"
+# Oldest event time, newest event time (never decreasing along the file), offset, length
+_INDEX_RECORD = struct.Struct("<ddQQ")
+# Uncompressed size of the gzip members in archived segments
+ARCHIVE_MEMBER_BYTES = 64 * 1024
+
+IndexRecord = Tuple[float, float, int, int]
+
+def index_path(path: Path) -> Path:
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+def read_index(path: Path) -> List[IndexRecord]:
+    """Block index of a log file or segment; empty if it has none."""
+    try:
+        data = index_path(path).read_bytes()
+    except FileNotFoundError:
+        return []
+    # A torn final record is ignored
+    return list(_INDEX_RECORD.iter_unpack(data[:len(data) - len(data) % _INDEX_RECORD.size]))
+
+def _event_time(event: Dict[str, Any], default: float) -> float:
+    try:
+        return to_timestamp(datetime.fromisoformat(event["timestamp"]))
+    except (KeyError, TypeError, ValueError):
+        return default
+
+def _time_range(data: bytes, default: float) -> Tuple[float, float]:
+    """Oldest and newest event time in a run of JSON lines."""
+    times = []
+    for line in data.splitlines():
+        try:
+            times.append(_event_time(json.loads(line), default))
+        except ValueError:
+            continue
+    return (min(times), max(times)) if times else (default, default)
+
+def _segment_key(path: Path, segment: Path) -> str:
+    name = segment.name[len(path.name) + 1:]
+    return name[:-len(ARCHIVE_SUFFIX)] if name.endswith(ARCHIVE_SUFFIX) else name
+
+def _stamp_order(key: str) -> Tuple[str, int]:
+    stamp, _, suffix = key.partition("-")
+    return stamp, int(suffix) if suffix.isdigit() else 0
+
+def _segment_start(key: str) -> Optional[float]:
+    try:
+        return calendar.timegm(time.strptime(key.partition("-")[0], "%Y%m%dT%H%M%S"))
+    except ValueError:
+        return None
+
+def segment_paths(path: Path) -> List[Path]:
+    """Rotated segments of ``path``, oldest first.
+
+    A segment that is being compressed is listed once, as the plain file.
+    """
+    segments: Dict[str, Path] = {}
+    for segment in path.parent.glob(f"{path.name}.*"):
+        if segment.name.endswith((INDEX_SUFFIX, ".tmp")):
+            continue
+        key = _segment_key(path, segment)
+        if key not in segments or not segment.name.endswith(ARCHIVE_SUFFIX):
+            segments[key] = segment
+    return [segments[key] for key in sorted(segments, key=_stamp_order)]
+
+def _merge_blocks(records: List[IndexRecord], min_bytes: int) -> List[IndexRecord]:
+    """Join adjacent index blocks until each holds at least ``min_bytes``."""
+    merged: List[IndexRecord] = []
+    for oldest, newest, offset, length in records:
+        if merged and merged[-1][3] < min_bytes:
+            previous = merged[-1]
+            merged[-1] = (min(previous[0], oldest), newest, previous[2], previous[3] + length)
+        else:
+            merged.append((oldest, newest, offset, length))
+    return merged
+
+def compress_segment(segment: Path, member_bytes: int = ARCHIVE_MEMBER_BYTES) -> Path:
+    """Gzip a rotated segment into ``<segment>.gz`` with its own block index.
+
+    Adjacent index blocks are merged into gzip members of at least
+    ``member_bytes`` so they compress well, and each member can still be
+    decompressed on its own. The result is an ordinary multi-member gzip
+    file that ``zcat`` reads.
+    """
+    records = read_index(segment)
+    target = segment.with_name(segment.name + ARCHIVE_SUFFIX)
+    partial = target.with_name(target.name + ".tmp")
+    archived = []
+    with segment.open("rb") as f, partial.open("wb") as out:
+        size = os.fstat(f.fileno()).st_size
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                indexed = records[-1][2] + records[-1][3] if records else 0
+                if indexed < size:
+                    # Segments written before indexing existed
+                    oldest, newest = _time_range(data[indexed:size], os.fstat(f.fileno()).st_mtime)
+                    records.append((oldest, newest, indexed, size - indexed))
+                for oldest, newest, offset, length in _merge_blocks(records, member_bytes):
+                    member = gzip.compress(data[offset:offset + length], mtime=0)
+                    archived.append(_INDEX_RECORD.pack(oldest, newest, out.tell(), len(member)))
+                    out.write(member)
+        out.flush()
+        os.fsync(out.fileno())
+    index_path(target).write_bytes(b"".join(archived))
+    os.replace(partial, target)
+    # Readers that find the plain segment gone fall back to the archive
+    segment.unlink()
+    index_path(segment).unlink(missing_ok=True)
+    return target
+
+def _select_blocks(records: List[IndexRecord], start: float, end: float) -> List[IndexRecord]:
+    # Newest times never decrease, so the first candidate is found by bisection;
+    # blocks after one that starts more than the skew past ``end`` cannot match
+    first = bisect_left(records, start, key=lambda record: record[1])
+    selected = []
+    for record in records[first:]:
+        if record[0] - AUDIT_MAX_SKEW_SECONDS > end:
+            break
+        if record[0] <= end:
+            selected.append(record)
+    return selected
+
+def _read_segment(segment: Path, start: float, end: float) -> List[bytes]:
+    """Raw JSON lines of the blocks of ``segment`` that may hold events in range."""
+    compressed = segment.name.endswith(ARCHIVE_SUFFIX)
+    records = read_index(segment)
+    try:
+        f = segment.open("rb")
+    except FileNotFoundError:
+        if compressed:
+            return []
+        # Compressed since it was listed
+        return _read_segment(segment.with_name(segment.name + ARCHIVE_SUFFIX), start, end)
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            chunks = [
+                data[offset:offset + length]
+                for _, _, offset, length in _select_blocks(records, start, end)
+                if offset + length <= size
+            ]
+            indexed = records[-1][2] + records[-1][3] if records else 0
+            if not compressed and indexed < size:
+                # The block still being written is not indexed yet
+                chunks.append(data[indexed:size])
+    if compressed:
+        chunks = [gzip.decompress(chunk) for chunk in chunks]
+    return chunks
+
+def query_audit_log(start: float, end: float, path: Path = AUDIT_LOG_PATH) -> List[Dict[str, Any]]:
+    """Audit events with ``start <= timestamp <= end`` (epoch seconds), oldest first.
+
+    Segments are skipped by the start time in their names, and within a
+    segment only the index blocks overlapping the range are read.
+    """
+    path = Path(path)
+    segments = segment_paths(path)
+    starts = [_segment_start(_segment_key(path, segment)) for segment in segments]
+    chunks = []
+    for i, segment in enumerate(segments):
+        if starts[i] is not None and starts[i] - AUDIT_MAX_SKEW_SECONDS > end:
+            break
+        following = starts[i + 1] if i + 1 < len(starts) else None
+        # Segment names are truncated to the second
+        if following is not None and following + 1 + AUDIT_MAX_SKEW_SECONDS < start:
+            continue
+        chunks.extend(_read_segment(segment, start, end))
+    if path.exists():
+        chunks.extend(_read_segment(path, start, end))
+
+    entries = []
+    for chunk in chunks:
+        for line in chunk.splitlines():
+            try:
+                entry = json.loads(line)
+                event_time = to_timestamp(datetime.fromisoformat(entry["timestamp"]))
+            except (KeyError, TypeError, ValueError):
+                logger.error("Error parsing audit log entry", extra={"security": True})
+                continue
+            if start <= event_time <= end:
+                entries.append(entry)
+    return entries
+
+class AuditWriter:
+    """Appends audit events to a JSON-lines file from a background thread.
+
+    ``write`` only puts the event on a bounded queue. The writer thread
+    takes what has queued up (up to ``batch_max`` events, waiting at most
+    ``flush_interval`` seconds for more), serializes it and appends it with
+    a single write, then fsyncs according to ``fsync``. When the queue is
+    full, callers wait up to ``block_seconds`` and then drop the event; the
+    drop is counted in ``audit_events_total{outcome="dropped"}``.
+
+    The file is rotated before it would exceed ``max_bytes`` or once it is
+    ``rotate_seconds`` old. The finished segment is renamed to
+    ``<name>.<UTC time of its first event>``, so segment names sort
+    chronologically, and with ``compress="gzip"`` it is then compressed by
+    a background thread.
+
+    Alongside each file the writer keeps ``<name>.idx``: one fixed-size
+    record per block of about ``index_block_seconds`` of events or
+    ``index_block_bytes``, holding the block's time range and byte range.
+    ``query_audit_log`` uses it to read only the blocks a query needs.
+    """
+
+    def __init__(
+        self,
+        path: Path = AUDIT_LOG_PATH,
+        max_queue: int = AUDIT_QUEUE_SIZE,
+        batch_max: int = AUDIT_BATCH_MAX,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL_MS / 1000,
+        fsync: str = AUDIT_FSYNC,
+        fsync_interval: float = AUDIT_FSYNC_INTERVAL_SECONDS,
+        max_bytes: int = AUDIT_MAX_BYTES,
+        rotate_seconds: float = AUDIT_ROTATE_SECONDS,
+        block_seconds: float = AUDIT_BLOCK_SECONDS,
+        index_block_seconds: float = AUDIT_INDEX_BLOCK_SECONDS,
+        index_block_bytes: int = AUDIT_INDEX_BLOCK_BYTES,
+        compress: str = AUDIT_COMPRESS
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"AUDIT_FSYNC must be one of {', '.join(FSYNC_POLICIES)}")
+        if compress not in COMPRESS_POLICIES:
+            raise ValueError(f"AUDIT_COMPRESS must be one of {', '.join(COMPRESS_POLICIES)}")
+        self.path = Path(path)
+        self.batch_max = max(1, batch_max)
+        self.flush_interval = max(0.0, flush_interval)
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.block_seconds = block_seconds
+        self.index_block_seconds = index_block_seconds
+        self.index_block_bytes = index_block_bytes
+        self.compress = compress
+        self._queue: "queue.Queue[Union[Dict[str, Any], threading.Event, None]]" = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._file = None
+        self._index = None
+        self._opened_at = 0.0
+        self._first_event = None
+        self._block_offset = 0
+        self._block_range: Tuple[float, float] | None = None
+        self._indexed_newest = float("-inf")
+        self._pending_index: List[bytes] = []
+        self._archivers: List[threading.Thread] = []
+        self._last_fsync = 0.0
+        self._dropping = False
+        self._written = 0
+        self._dropped = 0
+        self._batches = 0
+        self._rotations = 0
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                    self._thread.start()
+
+    def write(self, event: Dict[str, Any]) -> bool:
+        """Queue ``event``; returns False if it was dropped."""
+        self._ensure_started()
+        try:
+            if self.block_seconds > 0:
+                self._queue.put(event, timeout=self.block_seconds)
+            else:
+                self._queue.put_nowait(event)
+        except queue.Full:
+            AUDIT_EVENTS.labels("dropped").inc()
+            with self._lock:
+                self._dropped += 1
+                warn, self._dropping = not self._dropping, True
+            if warn:
+                logger.warning("Audit queue full (%d events), dropping events", self._queue.maxsize)
+            return False
+        AUDIT_QUEUE_DEPTH.inc()
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far is written; False on timeout."""
+        if self._thread is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while item is not None and len(batch) < self.batch_max:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            events = [item for item in batch if isinstance(item, dict)]
+            if events:
+                AUDIT_QUEUE_DEPTH.dec(len(events))
+                try:
+                    self._append(events)
+                except Exception as e:
+                    logger.error("Failed to write %d audit events: %s", len(events), e)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    try:
+                        if self._file is not None:
+                            self._sync(force=True)
+                    except Exception as e:
+                        logger.error("Failed to sync the audit log: %s", e)
+                    item.set()
+            if batch[-1] is None:
+                try:
+                    if self._file is not None:
+                        self._close_block()
+                        self._write_index()
+                        self._sync(force=True)
+                        self._file.close()
+                        self._index.close()
+                except Exception as e:
+                    logger.error("Failed to close the audit log: %s", e)
+                self._file = self._index = None
+                return
+
+    def _append(self, events: List[Dict[str, Any]]) -> None:
+        lines = [(json.dumps(event) + "\n").encode() for event in events]
+        now = time.time()
+        if self._file is None:
+            self._open()
+        size = self._file.tell()
+        if size and (
+            (self.max_bytes and size + sum(map(len, lines)) > self.max_bytes)
+            or (self.rotate_seconds and now - self._opened_at >= self.rotate_seconds)
+        ):
+            self._rotate()
+            size = 0
+
+        position = size
+        for event, line in zip(events, lines):
+            event_time = _event_time(event, now)
+            if self._block_range is not None and (
+                position - self._block_offset + len(line) > self.index_block_bytes
+                or event_time - self._block_range[0] >= self.index_block_seconds
+            ):
+                self._close_block(position)
+            if self._block_range is None:
+                self._block_range = (event_time, event_time)
+            else:
+                self._block_range = (min(event_time, self._block_range[0]), max(event_time, self._block_range[1]))
+            if self._first_event is None:
+                self._first_event = event_time
+            position += len(line)
+        self._file.write(b"".join(lines))
+        self._file.flush()
+        self._sync()
+        # Index entries only ever point at data that has been written
+        self._write_index()
+        AUDIT_EVENTS.labels("written").inc(len(events))
+        AUDIT_BATCH_SIZE.observe(len(events))
+        with self._lock:
+            self._written += len(events)
+            self._batches += 1
+            self._dropping = False
+
+    def _open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("ab")
+        # Like TimedRotatingFileHandler, an existing file counts from its last write
+        stat = os.fstat(self._file.fileno())
+        self._opened_at = stat.st_mtime if stat.st_size else time.time()
+
+        # Keep the index entries that describe data which made it to disk
+        index = index_path(self.path)
+        records = read_index(self.path)
+        valid, indexed = [], 0
+        for record in records:
+            if record[2] != indexed or indexed + record[3] > stat.st_size:
+                break
+            valid.append(record)
+            indexed += record[3]
+        if index.exists() and index.stat().st_size != len(valid) * _INDEX_RECORD.size:
+            index.write_bytes(b"".join(_INDEX_RECORD.pack(*record) for record in valid))
+        self._index = index.open("ab", buffering=0)
+        self._indexed_newest = valid[-1][1] if valid else float("-inf")
+        self._first_event = valid[0][0] if valid else None
+        self._block_offset = indexed
+        self._block_range = None
+        if indexed < stat.st_size:
+            # Data written after the last index entry becomes the open block
+            with self.path.open("rb") as f:
+                f.seek(indexed)
+                self._block_range = _time_range(f.read(), self._opened_at)
+            if self._first_event is None:
+                self._first_event = self._block_range[0]
+
+    def _close_block(self, end: Optional[int] = None) -> None:
+        if end is None:
+            end = self._file.tell()
+        if self._block_range is not None and end > self._block_offset:
+            oldest, newest = self._block_range
+            newest = max(newest, self._indexed_newest)
+            self._pending_index.append(_INDEX_RECORD.pack(oldest, newest, self._block_offset, end - self._block_offset))
+            self._indexed_newest = newest
+        self._block_offset = end
+        self._block_range = None
+
+    def _write_index(self) -> None:
+        if self._pending_index:
+            self._index.write(b"".join(self._pending_index))
+            self._pending_index.clear()
+
+    def _sync(self, force: bool = False) -> None:
+        if self.fsync == "never" and not force:
+            return
+        now = time.monotonic()
+        if force or self.fsync == "always" or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+    def _rotate(self) -> None:
+        self._close_block()
+        self._write_index()
+        self._sync(force=True)
+        self._file.close()
+        self._index.close()
+        started = self._first_event if self._first_event is not None else self._opened_at
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(started))
+        target = self.path.with_name(f"{self.path.name}.{stamp}")
+        suffix = 1
+        while target.exists():
+            target = self.path.with_name(f"{self.path.name}.{stamp}-{suffix}")
+            suffix += 1
+        os.replace(self.path, target)
+        if index_path(self.path).exists():
+            os.replace(index_path(self.path), index_path(target))
+        with self._lock:
+            self._rotations += 1
+        if self.compress == "gzip":
+            archiver = threading.Thread(target=self._archive, args=(target,), name="audit-archiver", daemon=True)
+            archiver.start()
+            self._archivers = [thread for thread in self._archivers if thread.is_alive()] + [archiver]
+        self._open()
+
+    def _archive(self, segment: Path) -> None:
+        try:
+            compress_segment(segment)
+        except Exception as e:
+            logger.error("Failed to compress audit segment %s: %s", segment, e)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "path": str(self.path),
+                "queued": self._queue.qsize(),
+                "queue_size": self._queue.maxsize,
+                "written": self._written,
+                "dropped": self._dropped,
+                "batches": self._batches,
+                "rotations": self._rotations,
+                "fsync": self.fsync,
+                "compress": self.compress,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Write everything queued, then stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            if wait:
+                thread.join()
+                for archiver in self._archivers:
+                    archiver.join()
+
+# Global instance
+audit_writer = AuditWriter()
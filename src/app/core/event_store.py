@@ -0,0 +1,140 @@
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Any, Dict, Generic, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_NAIVE_EPOCH = datetime(1970, 1, 1)
+
+def to_timestamp(moment: datetime) -> float:
+    """Seconds since the epoch; naive datetimes are read as UTC, like ``utcnow()``."""
+    if moment.tzinfo is None:
+        return (moment - _NAIVE_EPOCH).total_seconds()
+    return moment.astimezone(timezone.utc).timestamp()
+
+class _Postings:
+    """Ascending sequence numbers of one index value; expired ones are skipped by ``head``."""
+
+    __slots__ = ("seqs", "head")
+
+    def __init__(self):
+        self.seqs: List[int] = []
+        self.head = 0
+
+    def __len__(self) -> int:
+        return len(self.seqs) - self.head
+
+    def pop_oldest(self) -> None:
+        self.head += 1
+        if self.head > 64 and self.head * 2 > len(self.seqs):
+            del self.seqs[:self.head]
+            self.head = 0
+
+class EventStore(Generic[T]):
+    """Fixed-capacity, time-ordered ring buffer of events.
+
+    Event number ``n`` lives in slot ``n % capacity``; once the buffer is
+    full each new event overwrites the oldest, so memory stays constant.
+    Timestamps are clamped to never go backwards, which keeps the buffer
+    sorted for binary search. Each field in ``index_fields`` has an index
+    from value to the ascending event numbers carrying it, so a query for
+    one IP, type or user bisects that list instead of the whole buffer.
+    Queries cost O(log n + k) for k matches.
+    """
+
+    def __init__(self, capacity: int, index_fields: Sequence[str] = ()):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.index_fields = tuple(index_fields)
+        self._times = [0.0] * capacity
+        self._items: List[Optional[T]] = [None] * capacity
+        self._keys: List[Tuple[Any, ...]] = [()] * capacity
+        self._indexes: Dict[str, Dict[Any, _Postings]] = {field: {} for field in self.index_fields}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @property
+    def _first(self) -> int:
+        return max(0, self._next - self.capacity)
+
+    def __len__(self) -> int:
+        return self._next - self._first
+
+    def append(self, item: T, timestamp: float, **keys: Any) -> None:
+        """Store ``item`` at ``timestamp`` under the given index ``keys``."""
+        values = tuple(keys.get(field) for field in self.index_fields)
+        with self._lock:
+            seq = self._next
+            slot = seq % self.capacity
+            if seq:
+                timestamp = max(timestamp, self._times[(seq - 1) % self.capacity])
+            if seq >= self.capacity:
+                self._evict(slot)
+            self._times[slot] = timestamp
+            self._items[slot] = item
+            self._keys[slot] = values
+            for field, value in zip(self.index_fields, values):
+                if value is not None:
+                    postings = self._indexes[field].get(value)
+                    if postings is None:
+                        postings = self._indexes[field][value] = _Postings()
+                    postings.seqs.append(seq)
+            self._next = seq + 1
+
+    def _evict(self, slot: int) -> None:
+        # The evicted event is the oldest, so it heads every postings list it is in
+        for field, value in zip(self.index_fields, self._keys[slot]):
+            if value is None:
+                continue
+            postings = self._indexes[field][value]
+            postings.pop_oldest()
+            if not postings:
+                del self._indexes[field][value]
+
+    def _time_of(self, seq: int) -> float:
+        return self._times[seq % self.capacity]
+
+    def query(self, start: float, end: float, **filters: Any) -> List[T]:
+        """Events with ``start <= timestamp <= end`` matching every filter, oldest first."""
+        with self._lock:
+            if not filters:
+                seqs: Sequence[int] = range(self._first, self._next)
+                lo = 0
+            else:
+                candidates = []
+                for field, value in filters.items():
+                    if field not in self._indexes:
+                        raise ValueError(f"{field!r} is not an indexed field")
+                    postings = self._indexes[field].get(value)
+                    if postings is None:
+                        return []
+                    candidates.append(postings)
+                best = min(candidates, key=len)
+                seqs, lo = best.seqs, best.head
+            begin = bisect_left(seqs, start, lo=lo, key=self._time_of)
+            stop = bisect_right(seqs, end, lo=begin, key=self._time_of)
+            positions = [self.index_fields.index(field) for field in filters]
+            wanted = tuple(filters.values())
+            results = []
+            for seq in seqs[begin:stop]:
+                slot = seq % self.capacity
+                if positions:
+                    keys = self._keys[slot]
+                    if any(keys[position] != value for position, value in zip(positions, wanted)):
+                        continue
+                results.append(self._items[slot])
+            return results
+
+    def __iter__(self) -> Iterator[T]:
+        with self._lock:
+            items = [self._items[seq % self.capacity] for seq in range(self._first, self._next)]
+        return iter(items)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items = [None] * self.capacity
+            self._keys = [()] * self.capacity
+            self._indexes = {field: {} for field in self.index_fields}
+            self._next = 0
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict
+
+from prometheus_client import Histogram
+
+from fastapi import HTTPException, status
+
+from .metrics import PASSWORD_HASHING_DURATION, PASSWORD_HASHING_REJECTED
+
+# Hashing executor configuration
+HASH_EXECUTOR_KIND = os.getenv("HASH_EXECUTOR_KIND", "thread")  # "thread" or "process"
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MAX_QUEUE = int(os.getenv("HASH_MAX_QUEUE", "64"))
+HASH_TIMEOUT_SECONDS = float(os.getenv("HASH_TIMEOUT_SECONDS", "10"))
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please retry later",
+        headers={"Retry-After": "1"},
+    )
+
+class HashingExecutor:
+    """Bounded worker pool for CPU-bound password hashing.
+
+    At most ``max_queue`` calls may be pending (running or waiting) at once;
+    further submissions are rejected with a 503 instead of piling up behind
+    the pool. A call that outlives ``timeout`` gets the same 503.
+    """
+
+    def __init__(
+        self,
+        kind: str = HASH_EXECUTOR_KIND,
+        workers: int = HASH_WORKERS,
+        max_queue: int = HASH_MAX_QUEUE,
+        timeout: float = HASH_TIMEOUT_SECONDS
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown hashing executor kind: {kind}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_queue = max(self.workers, max_queue)
+        self.timeout = timeout
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._calls = 0
+        self._rejected = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers,
+                            thread_name_prefix="hashing"
+                        )
+        return self._executor
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """Schedule ``fn(*args)`` on the pool, shedding load when it is full."""
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self._rejected += 1
+                PASSWORD_HASHING_REJECTED.inc()
+                raise _busy()
+            self._pending += 1
+
+        started = time.perf_counter()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        duration = PASSWORD_HASHING_DURATION.labels(fn.__name__.lstrip("_"))
+        future.add_done_callback(lambda _: self._record(time.perf_counter() - started, duration))
+        return future
+
+    def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run ``fn(*args)`` on the pool and block until it finishes."""
+        try:
+            return self.submit(fn, *args).result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise _busy() from None
+
+    async def run_async(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run ``fn(*args)`` on the pool without blocking the event loop."""
+        future = asyncio.wrap_future(self.submit(fn, *args))
+        try:
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise _busy() from None
+
+    def _record(self, elapsed: float, duration: Histogram) -> None:
+        duration.observe(elapsed)
+        with self._lock:
+            self._pending -= 1
+            self._calls += 1
+            self._total_seconds += elapsed
+            if elapsed > self._max_seconds:
+                self._max_seconds = elapsed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return call counts and timings (seconds, including queue wait)."""
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "pending": self._pending,
+                "calls": self._calls,
+                "rejected": self._rejected,
+                "total_seconds": self._total_seconds,
+                "avg_seconds": self._total_seconds / self._calls if self._calls else 0.0,
+                "max_seconds": self._max_seconds,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+# Global instance
+hashing_executor = HashingExecutor()
@@ -0,0 +1,191 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from .metrics import LOG_RECORDS_DROPPED
+
+# Logging configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+# "json" writes one object per line, "text" the classic single-line format
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Once the queue is this full, records below WARNING are sampled at LOG_SHED_SAMPLE_RATE
+LOG_SHED_THRESHOLD = float(os.getenv("LOG_SHED_THRESHOLD", "0.5"))
+LOG_SHED_SAMPLE_RATE = float(os.getenv("LOG_SHED_SAMPLE_RATE", "0.1"))
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+# Correlation ID of the request being handled, set by CorrelationIdMiddleware
+correlation_id: ContextVar[Optional[str]] = ContextVar("correlation_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "correlation_id"
+}
+
+class JSONFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line, with any ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        seconds = int(record.created)
+        entry: Dict[str, Any] = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "correlation_id", None):
+            entry["correlation_id"] = record.correlation_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+class CorrelationIdFilter(logging.Filter):
+    """Stamps records with the current request's correlation ID."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+class SheddingQueueHandler(logging.handlers.QueueHandler):
+    """Queues records for the listener thread without ever blocking the caller.
+
+    The queue is an unbounded ``SimpleQueue`` (no locking on put) kept to
+    ``max_queue`` records by checking its size first. Once it is
+    ``shed_threshold`` full, records below WARNING are kept with probability
+    ``sample_rate``; when it is completely full every new record is dropped.
+    Both are counted in ``log_records_dropped_total``.
+    """
+
+    def __init__(self, log_queue: queue.SimpleQueue, max_queue: int, shed_threshold: float, sample_rate: float):
+        super().__init__(log_queue)
+        self.max_queue = max_queue
+        self.shed_depth = int(max_queue * shed_threshold)
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self.dropped = {"shed": 0, "full": 0}
+        self.addFilter(CorrelationIdFilter())
+
+    def _drop(self, reason: str) -> None:
+        LOG_RECORDS_DROPPED.labels(reason).inc()
+        with self._lock:
+            self.dropped[reason] += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener runs in this process, so the record can be passed as is;
+        # only the message is rendered now, in case its arguments change later
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        depth = self.queue.qsize()
+        if depth >= self.max_queue:
+            self._drop("full")
+            return
+        if depth >= self.shed_depth and record.levelno < logging.WARNING and random.random() >= self.sample_rate:
+            self._drop("shed")
+            return
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+class LogPipeline:
+    """Root logging through a bounded queue and a single writer thread.
+
+    Request code only appends records to the queue; formatting and the
+    stdout and file writes happen on the listener thread.
+    """
+
+    def __init__(
+        self,
+        level: str = LOG_LEVEL,
+        filename: Optional[str] = LOG_FILE,
+        fmt: str = LOG_FORMAT,
+        max_queue: int = LOG_QUEUE_SIZE,
+        shed_threshold: float = LOG_SHED_THRESHOLD,
+        sample_rate: float = LOG_SHED_SAMPLE_RATE
+    ):
+        if fmt not in ("json", "text"):
+            raise ValueError("LOG_FORMAT must be json or text")
+        self.level = level
+        self.filename = filename
+        self.fmt = fmt
+        self.max_queue = max_queue
+        self.shed_threshold = shed_threshold
+        self.sample_rate = sample_rate
+        self.handler: Optional[SheddingQueueHandler] = None
+        self._logger: Optional[logging.Logger] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self._lock = threading.Lock()
+
+    def _targets(self) -> List[logging.Handler]:
+        formatter = JSONFormatter() if self.fmt == "json" else logging.Formatter(TEXT_FORMAT)
+        targets: List[logging.Handler] = [logging.StreamHandler(sys.stdout)]
+        if self.filename:
+            targets.append(logging.FileHandler(self.filename, mode="a"))
+        for target in targets:
+            target.setFormatter(formatter)
+        return targets
+
+    def configure(self, logger: Optional[logging.Logger] = None) -> None:
+        """Route ``logger`` (the root logger by default) through the queue."""
+        logger = logger or logging.getLogger()
+        with self._lock:
+            if self.handler is not None:
+                return
+            log_queue: queue.SimpleQueue = queue.SimpleQueue()
+            self.handler = SheddingQueueHandler(log_queue, self.max_queue, self.shed_threshold, self.sample_rate)
+            self._listener = logging.handlers.QueueListener(log_queue, *self._targets(), respect_handler_level=True)
+            self._listener.start()
+            self._logger = logger
+        logger.addHandler(self.handler)
+        logger.setLevel(self.level)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            handler = self.handler
+        if handler is None:
+            return {"configured": False}
+        with handler._lock:
+            dropped = dict(handler.dropped)
+        return {
+            "configured": True,
+            "queued": handler.queue.qsize(),
+            "queue_size": self.max_queue,
+            "dropped": dropped,
+        }
+
+    def shutdown(self) -> None:
+        """Write out everything queued and stop the listener thread."""
+        with self._lock:
+            handler, listener, logger = self.handler, self._listener, self._logger
+            self.handler = self._listener = self._logger = None
+        if handler is not None:
+            logger.removeHandler(handler)
+        if listener is not None:
+            listener.stop()
+            for target in listener.handlers:
+                target.close()
+
+# Global instance
+log_pipeline = LogPipeline()
@@ -0,0 +1,231 @@
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+def _buckets(name: str, default: Sequence[float]) -> Tuple[float, ...]:
+    value = os.getenv(name)
+    if not value:
+        return tuple(default)
+    return tuple(sorted(float(bound) for bound in value.split(",") if bound.strip()))
+
+# Metrics configuration. With PROMETHEUS_MULTIPROC_DIR set (one directory
+# shared by all uvicorn workers, emptied before start) every worker writes
+# its samples there and /metrics aggregates them.
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+METRICS_LATENCY_BUCKETS = _buckets(
+    "METRICS_LATENCY_BUCKETS", (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+METRICS_SIZE_BUCKETS = _buckets(
+    "METRICS_SIZE_BUCKETS", (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+)
+METRICS_DB_BUCKETS = _buckets(
+    "METRICS_DB_BUCKETS", (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+)
+
+UNMATCHED_ROUTE = "unmatched"
+# Other methods are counted as "OTHER" so clients cannot mint new series
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled.", ["method", "route", "status"]
+)
+HTTP_REQUEST_LATENCY = Histogram(
+    "http_request_latency_seconds", "HTTP request latency.", ["method", "route"],
+    buckets=METRICS_LATENCY_BUCKETS
+)
+# Kept from the original /metrics output; use the histogram for percentiles
+HTTP_REQUEST_DURATION = Gauge(
+    "http_request_duration_seconds", "Latency of the most recent request per method.", ["method"],
+    multiprocess_mode="mostrecent"
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "HTTP response body size.", ["method", "route"],
+    buckets=METRICS_SIZE_BUCKETS
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being handled.", ["method"],
+    multiprocess_mode="livesum"
+)
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Duration of individual SQL statements.",
+    buckets=METRICS_DB_BUCKETS
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request.", ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+DB_QUERY_SECONDS_PER_REQUEST = Histogram(
+    "db_query_seconds_per_request", "Total SQL time per HTTP request.", ["route"],
+    buckets=METRICS_DB_BUCKETS
+)
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total", "Checkouts that gave up after pool_timeout.", ["pool"]
+)
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use", "Connections currently checked out.", ["pool"],
+    multiprocess_mode="livesum"
+)
+DB_POOL_IDLE = Gauge(
+    "db_pool_connections_idle", "Connections idle in the pool.", ["pool"],
+    multiprocess_mode="livesum"
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Connections open beyond pool_size.", ["pool"],
+    multiprocess_mode="livesum"
+)
+
+PASSWORD_HASHING_DURATION = Histogram(
+    "password_hashing_duration_seconds",
+    "bcrypt hash/verify time including executor queue wait.", ["operation"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+PASSWORD_HASHING_REJECTED = Counter(
+    "password_hashing_rejected_total", "Hashing calls shed because the executor queue was full."
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups; hit ratio is hit / (hit + miss).", ["cache", "result"]
+)
+
+AUDIT_EVENTS = Counter(
+    "audit_events_total", "Audit events by outcome: written, or dropped on a full queue.", ["outcome"]
+)
+AUDIT_QUEUE_DEPTH = Gauge(
+    "audit_queue_depth", "Audit events waiting for the writer thread.",
+    multiprocess_mode="livesum"
+)
+AUDIT_BATCH_SIZE = Histogram(
+    "audit_batch_size", "Audit events appended per write.",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records dropped before output: shed (sampled out under load) or full (queue full).",
+    ["reason"]
+)
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    query_seconds: float = 0.0
+
+# Per-request query accounting; shared by the threadpool and greenlets the
+# request runs on because they copy the request's context
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    DB_QUERY_DURATION.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if exception_context.cursor is not None and connection is not None:
+        started = connection.info.get("query_started")
+        if started:
+            started.pop()
+
+class MetricsMiddleware:
+    """Records request count, latency, size and DB usage per route template."""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Dict[Callable[..., Any], str] = {}
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        route = self._routes.get(endpoint)
+        if route is None:
+            for candidate in scope["app"].routes:
+                if getattr(candidate, "endpoint", None) is endpoint:
+                    route = candidate.path
+                    break
+            else:
+                route = UNMATCHED_ROUTE
+            self._routes[endpoint] = route
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"] if scope["method"] in HTTP_METHODS else "OTHER"
+        status_code = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            _request_stats.reset(token)
+            route = self._route(scope)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            HTTP_REQUEST_LATENCY.labels(method, route).observe(elapsed)
+            HTTP_REQUEST_DURATION.labels(method).set(elapsed)
+            HTTP_RESPONSE_SIZE.labels(method, route).observe(size)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.queries)
+            DB_QUERY_SECONDS_PER_REQUEST.labels(route).observe(stats.query_seconds)
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, with its content type."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges from the shared multiprocess directory."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
@@ -1,39 +1,355 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from slowapi.middleware import SlowAPIMiddleware
-from slowapi.errors import RateLimitExceeded
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+import math
+import re
 import time
 import os
+import uuid
+from .logging_config import correlation_id
 from .monitoring import record_security_event
+from .rate_limit import (
+    RATE_LIMIT_FAILURE_MODE,
+    RATE_LIMIT_ROUTES,
+    BackendUnavailable,
+    LockoutTracker,
+    RateLimitBackend,
+    login_lockouts,
+    parse_route_limits,
+    rate_limiter,
+)
 
-limiter = Limiter(key_func=get_remote_address)
+# Largest request body accepted, checked against the bytes actually received
+MAX_REQUEST_SIZE = int(os.getenv("MAX_REQUEST_SIZE", str(5 * 1024 * 1024)))  # 5MB
 
-class RequestSizeMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        if request.headers.get('content-length'):
-            if int(request.headers['content-length']) > 5 * 1024 * 1024:  # 5MB limit
-                return JSONResponse(
-                    status_code=413,
-                    content={"detail": "Request too large"}
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Content-Security-Policy": "default-src 'self'; script-src 'self'; style-src 'self'; img-src 'self' data:; font-src 'self'",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+}
+
+class RequestTooLarge(Exception):
+    """Raised from ``receive`` once the body passes the size limit."""
+
+class RequestSizeMiddleware:
+    """Rejects requests whose body is larger than ``max_size`` with a 413.
+
+    A too-large ``content-length`` is refused before the app runs; chunked
+    or understated bodies are counted as they are read, and once the limit
+    is passed the app's response is replaced by the 413.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int = MAX_REQUEST_SIZE):
+        self.app = app
+        self.max_size = max_size
+        self.rejection = JSONResponse(status_code=413, content={"detail": "Request too large"})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > self.max_size:
+                    await self.rejection(scope, receive, send)
+                    return
+                break
+
+        received = 0
+        too_large = False
+        response_started = False
+
+        async def receive_wrapper() -> Message:
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    too_large = True
+                    raise RequestTooLarge()
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if too_large:
+                # Whatever the app made of the aborted read, the answer is 413
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        except Exception:
+            if not too_large:
+                raise
+        if too_large and not response_started:
+            await self.rejection(scope, receive, send)
+
+class SecurityHeadersMiddleware:
+    """Sets ``SECURITY_HEADERS`` on every HTTP response, replacing app values."""
+
+    def __init__(self, app: ASGIApp, headers: Dict[str, str] = SECURITY_HEADERS):
+        self.app = app
+        self.headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+        self.names = frozenset(name for name, _ in self.headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = [header for header in message.get("headers", ()) if header[0] not in self.names]
+                headers.extend(self.headers)
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+class ProcessTimeMiddleware:
+    """Adds ``X-Process-Time``: seconds until the response headers were sent."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.time()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                process_time = time.time() - start_time
+                message["headers"] = [
+                    *message.get("headers", ()), (b"x-process-time", str(process_time).encode("latin-1"))
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+# Incoming request IDs are reused only if they look like an ID
+_REQUEST_ID = re.compile(rb"[A-Za-z0-9._:-]{1,128}")
+
+class CorrelationIdMiddleware:
+    """Gives each request a correlation ID for its log records.
+
+    The ID comes from the ``X-Request-ID`` header when the client sent a
+    sensible one and is generated otherwise; it is echoed in the response.
+    """
+
+    def __init__(self, app: ASGIApp, header: str = "X-Request-ID"):
+        self.app = app
+        self.header = header.lower().encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == self.header and _REQUEST_ID.fullmatch(value):
+                request_id = value
+                break
+        if request_id is None:
+            request_id = uuid.uuid4().hex.encode("latin-1")
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), (self.header, request_id)]
+            await send(message)
+
+        token = correlation_id.set(request_id.decode("latin-1"))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            correlation_id.reset(token)
+
+def _client_ip(scope: Scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+async def _call_backend(backend: RateLimitBackend, method: Callable[..., Any], *args: Any) -> Any:
+    """Call ``method`` of ``backend``, on the threadpool when the backend blocks on I/O."""
+    if backend.blocking:
+        return await run_in_threadpool(method, *args)
+    return method(*args)
+
+def _check_failure_mode(failure_mode: str) -> str:
+    if failure_mode not in ("open", "closed"):
+        raise ValueError("RATE_LIMIT_FAILURE_MODE must be open or closed")
+    return failure_mode
+
+def _unavailable_response() -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Rate limiting unavailable"},
+        headers={"Retry-After": "5"}
+    )
+
+class RateLimitingMiddleware:
+    """Per-client sliding-window rate limit, answering 429 when exceeded.
+
+    Each client gets ``rate_limit`` requests per ``time_window`` seconds.
+    ``route_limits`` maps path prefixes to their own ``(limit, window)``,
+    counted separately from the global limit; the longest prefix wins.
+    While the backend is unreachable, ``failure_mode`` "open" lets requests
+    through and "closed" answers them with 503.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        rate_limit: int = 100,
+        time_window: float = 60,
+        route_limits: Optional[Dict[str, Tuple[int, float]]] = None,
+        limiter: RateLimitBackend = rate_limiter,
+        failure_mode: str = RATE_LIMIT_FAILURE_MODE
+    ):
+        self.app = app
+        self.rate_limit = rate_limit
+        self.time_window = time_window
+        if route_limits is None:
+            route_limits = parse_route_limits(RATE_LIMIT_ROUTES)
+        self.route_limits = sorted(route_limits.items(), key=lambda item: len(item[0]), reverse=True)
+        self.limiter = limiter
+        self.failure_mode = _check_failure_mode(failure_mode)
+
+    def _limit_for(self, path: str) -> Tuple[str, int, float]:
+        for prefix, (limit, window) in self.route_limits:
+            if path.startswith(prefix):
+                return prefix, limit, window
+        return "*", self.rate_limit, self.time_window
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        client_ip = _client_ip(scope)
+        rule, limit, window = self._limit_for(scope["path"])
+        try:
+            result = await _call_backend(self.limiter, self.limiter.hit, f"{rule}|{client_ip}", limit, window)
+        except BackendUnavailable:
+            if self.failure_mode == "closed":
+                await _unavailable_response()(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+            return
+        if result.allowed:
+            await self.app(scope, receive, send)
+            return
+
+        if result.first_rejection:
+            record_security_event(
+                "rate_limit_exceeded",
+                f"Rate limit of {limit} requests per {window:g}s exceeded on {rule}",
+                severity="medium",
+                source_ip=client_ip
+            )
+        response = JSONResponse(
+            status_code=429,
+            content={"detail": "Too many requests"},
+            headers={"Retry-After": str(max(1, math.ceil(result.retry_after)))}
+        )
+        await response(scope, receive, send)
+
+class BruteForceProtectionMiddleware:
+    """Locks a client out of the login endpoints after repeated failures.
+
+    ``max_attempts`` 401 responses from ``paths`` within ``lockout_time``
+    seconds lock the client out for ``lockout_time`` seconds; a successful
+    login clears its failures. ``failure_mode`` applies as for
+    ``RateLimitingMiddleware`` while the backend is unreachable; failures
+    seen then are not counted.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_attempts: int = 5,
+        lockout_time: float = 300,
+        paths: Iterable[str] = ("/api/v1/token",),
+        tracker: LockoutTracker = login_lockouts,
+        failure_mode: str = RATE_LIMIT_FAILURE_MODE
+    ):
+        self.app = app
+        self.max_attempts = max_attempts
+        self.lockout_time = lockout_time
+        self.paths = frozenset(paths)
+        self.tracker = tracker
+        self.failure_mode = _check_failure_mode(failure_mode)
+
+    async def _track(self, method: Callable[..., Any], *args: Any) -> Any:
+        return await _call_backend(self.tracker.backend, method, *args)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        client_ip = _client_ip(scope)
+        try:
+            locked_for = await self._track(self.tracker.locked_for, client_ip)
+        except BackendUnavailable:
+            if self.failure_mode == "closed":
+                await _unavailable_response()(scope, receive, send)
+                return
+            locked_for = 0.0
+        if locked_for:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Too many failed login attempts"},
+                headers={"Retry-After": str(max(1, math.ceil(locked_for)))}
+            )
+            await response(scope, receive, send)
+            return
+
+        status_code = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+        try:
+            if status_code == 401:
+                locked = await self._track(
+                    self.tracker.record_failure, client_ip, self.max_attempts, self.lockout_time, self.lockout_time
                 )
-        response = await call_next(request)
-        return response
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Content-Security-Policy"] = "default-src 'self'; script-src 'self'; style-src 'self'; img-src 'self' data:; font-src 'self'"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        return response
+                if locked:
+                    record_security_event(
+                        "brute_force_attempt",
+                        f"Locked out for {self.lockout_time:g}s after {self.max_attempts} failed logins",
+                        severity="high",
+                        source_ip=client_ip
+                    )
+            elif status_code is not None and 200 <= status_code < 300:
+                await self._track(self.tracker.reset, client_ip)
+        except BackendUnavailable:
+            # The response is already sent; the backend logged the outage
+            pass
 
 def init_middleware(app: FastAPI) -> None:
+    # slowapi is only needed here, so plain imports of this module stay light
+    from slowapi import Limiter
+    from slowapi.errors import RateLimitExceeded
+    from slowapi.middleware import SlowAPIMiddleware
+    from slowapi.util import get_remote_address
+
     # CORS configuration
     allowed_origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
     app.add_middleware(
@@ -52,7 +368,7 @@ def init_middleware(app: FastAPI) -> None:
     app.add_middleware(SecurityHeadersMiddleware)
 
     # Rate limiting configuration
-    app.state.limiter = limiter
+    app.state.limiter = Limiter(key_func=get_remote_address)
     app.add_middleware(SlowAPIMiddleware)
 
     @app.exception_handler(RateLimitExceeded)
@@ -67,13 +383,7 @@ def init_middleware(app: FastAPI) -> None:
             content={"detail": "Too many requests"}
         )
 
-    # Request timing middleware
-    @app.middleware("http")
-    async def add_timing_header(request, call_next):
-        start_time = time.time()
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        response.headers["X-Process-Time"] = str(process_time)
-        return response
+    # Request timing
+    app.add_middleware(ProcessTimeMiddleware)
 
     return app
\ No newline at end of file
@@ -1,14 +1,20 @@
 from datetime import datetime, timedelta
 import logging
+import os
 from typing import List, Dict, Any, Optional
-from collections import defaultdict
 import threading
 from dataclasses import dataclass
-import json
-from pathlib import Path
+
+from .audit import AUDIT_LOG_PATH, audit_writer, query_audit_log
+from .event_store import EventStore, to_timestamp
+from .rate_limit import rate_limiter
 
 logger = logging.getLogger(__name__)
 
+# In-memory event history; the oldest entries are overwritten once full
+SECURITY_EVENTS_CAPACITY = int(os.getenv("SECURITY_EVENTS_CAPACITY", "100000"))
+SECURITY_ALERTS_CAPACITY = int(os.getenv("SECURITY_ALERTS_CAPACITY", "10000"))
+
 @dataclass
 class SecurityAlert:
     timestamp: datetime
@@ -30,91 +36,96 @@ class SecurityMonitor:
         return cls._instance
 
     def initialize(self):
-        self.alerts: List[SecurityAlert] = []
-        self.failed_logins = defaultdict(list)
-        self.request_counts = defaultdict(list)
-        self.suspicious_activities = defaultdict(list)
+        self.alerts: EventStore[SecurityAlert] = EventStore(
+            SECURITY_ALERTS_CAPACITY, ("event_type", "source_ip")
+        )
+        # Sliding-window counts per IP, shared with the rate limiter backend
+        self.counters = rate_limiter
+        self.suspicious_activities: EventStore[tuple] = EventStore(
+            SECURITY_ALERTS_CAPACITY, ("source_ip", "activity_type")
+        )
 
     def add_alert(self, alert: SecurityAlert):
-        with self._lock:
-            self.alerts.append(alert)
-            logger.warning(
-                f"Security Alert: {alert.event_type} - {alert.description}",
-                extra={
-                    "security": True,
-                    "event_type": alert.event_type,
-                    "severity": alert.severity,
-                    "source_ip": alert.source_ip
-                }
-            )
-
-    def get_alerts(self, start_time: datetime, end_time: datetime) -> List[SecurityAlert]:
-        with self._lock:
-            return [
-                alert for alert in self.alerts
-                if start_time <= alert.timestamp <= end_time
-            ]
+        self.alerts.append(
+            alert, to_timestamp(alert.timestamp), event_type=alert.event_type, source_ip=alert.source_ip
+        )
+        logger.warning(
+            "Security Alert: %s - %s", alert.event_type, alert.description,
+            extra={
+                "security": True,
+                "event_type": alert.event_type,
+                "severity": alert.severity,
+                "source_ip": alert.source_ip
+            }
+        )
+
+    def get_alerts(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        event_type: Optional[str] = None,
+        source_ip: Optional[str] = None
+    ) -> List[SecurityAlert]:
+        filters = {"event_type": event_type, "source_ip": source_ip}
+        return self.alerts.query(
+            to_timestamp(start_time),
+            to_timestamp(end_time),
+            **{field: value for field, value in filters.items() if value is not None}
+        )
 
     def record_failed_login(self, ip_address: str, timestamp: datetime = None):
         if timestamp is None:
             timestamp = datetime.now()
         
-        with self._lock:
-            self.failed_logins[ip_address].append(timestamp)
-            recent_failures = [
-                t for t in self.failed_logins[ip_address]
-                if timestamp - t < timedelta(minutes=5)
-            ]
-            self.failed_logins[ip_address] = recent_failures
-
-            if len(recent_failures) >= 5:
-                self.add_alert(SecurityAlert(
-                    timestamp=timestamp,
-                    event_type="brute_force_attempt",
-                    description=f"Multiple failed login attempts from {ip_address}",
-                    severity="high",
-                    source_ip=ip_address
-                ))
+        recent_failures = self.counters.add(
+            f"monitor:failed_login|{ip_address}", timedelta(minutes=5).total_seconds(), timestamp.timestamp()
+        )
+        if recent_failures >= 5:
+            self.add_alert(SecurityAlert(
+                timestamp=timestamp,
+                event_type="brute_force_attempt",
+                description=f"Multiple failed login attempts from {ip_address}",
+                severity="high",
+                source_ip=ip_address
+            ))
 
     def record_request(self, ip_address: str, endpoint: str, timestamp: datetime = None):
         if timestamp is None:
             timestamp = datetime.now()
         
-        with self._lock:
-            self.request_counts[ip_address].append(timestamp)
-            recent_requests = [
-                t for t in self.request_counts[ip_address]
-                if timestamp - t < timedelta(minutes=1)
-            ]
-            self.request_counts[ip_address] = recent_requests
-
-            if len(recent_requests) > 100:
-                self.add_alert(SecurityAlert(
-                    timestamp=timestamp,
-                    event_type="rate_limit_exceeded",
-                    description=f"Rate limit exceeded for {ip_address}",
-                    severity="medium",
-                    source_ip=ip_address
-                ))
-
-    def record_suspicious_activity(self, ip_address: str, activity_type: str, details: str):
-        timestamp = datetime.now()
-        with self._lock:
-            self.suspicious_activities[ip_address].append((timestamp, activity_type))
+        recent_requests = self.counters.add(
+            f"monitor:request|{ip_address}", timedelta(minutes=1).total_seconds(), timestamp.timestamp()
+        )
+        if recent_requests > 100:
             self.add_alert(SecurityAlert(
                 timestamp=timestamp,
-                event_type="suspicious_activity",
-                description=f"{activity_type}: {details}",
+                event_type="rate_limit_exceeded",
+                description=f"Rate limit exceeded for {ip_address}",
                 severity="medium",
                 source_ip=ip_address
             ))
 
+    def record_suspicious_activity(self, ip_address: str, activity_type: str, details: str):
+        timestamp = datetime.now()
+        self.suspicious_activities.append(
+            (timestamp, activity_type), to_timestamp(timestamp),
+            source_ip=ip_address, activity_type=activity_type
+        )
+        self.add_alert(SecurityAlert(
+            timestamp=timestamp,
+            event_type="suspicious_activity",
+            description=f"{activity_type}: {details}",
+            severity="medium",
+            source_ip=ip_address
+        ))
+
 # Global instance
 security_monitor = SecurityMonitor()
 
 # Initialize security event storage
-SECURITY_EVENTS = []
-AUDIT_LOG_PATH = Path("audit.log")
+SECURITY_EVENTS: EventStore[Dict[str, Any]] = EventStore(
+    SECURITY_EVENTS_CAPACITY, ("type", "source_ip", "user_id")
+)
 
 def record_security_event(
     event_type: str,
@@ -124,8 +135,9 @@ def record_security_event(
     user_id: Optional[str] = None
 ) -> None:
     """Record a security event for monitoring."""
+    now = datetime.utcnow()
     event = {
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": now.isoformat(),
         "type": event_type,
         "description": description,
         "severity": severity,
@@ -133,7 +145,9 @@ def record_security_event(
         "user_id": user_id
     }
     
-    SECURITY_EVENTS.append(event)
+    SECURITY_EVENTS.append(
+        event, to_timestamp(now), type=event_type, source_ip=source_ip, user_id=user_id
+    )
     
     # Log the security event
     log_level = {
@@ -143,36 +157,31 @@ def record_security_event(
         "critical": logging.CRITICAL
     }.get(severity, logging.INFO)
     
-    logger.log(log_level, f"Security Event: {json.dumps(event)}", extra={"security": True})
+    logger.log(
+        log_level, "Security Event: %s - %s", event_type, description,
+        extra={"security": True, "event": event}
+    )
     
-    # Write to audit log
-    with AUDIT_LOG_PATH.open("a") as f:
-        f.write(json.dumps(event) + "\n")
-
-def get_security_alerts(start_time: datetime, end_time: datetime) -> list:
-    """Get security alerts within a time range."""
-    alerts = []
-    for event in SECURITY_EVENTS:
-        event_time = datetime.fromisoformat(event["timestamp"])
-        if start_time <= event_time <= end_time:
-            alerts.append(event)
-    return alerts
+    # Write to audit log (in the background)
+    audit_writer.write(event)
+
+def get_security_alerts(
+    start_time: datetime,
+    end_time: datetime,
+    event_type: Optional[str] = None,
+    source_ip: Optional[str] = None,
+    user_id: Optional[str] = None
+) -> list:
+    """Get security alerts within a time range, optionally for one type, IP or user."""
+    filters = {"type": event_type, "source_ip": source_ip, "user_id": user_id}
+    return SECURITY_EVENTS.query(
+        to_timestamp(start_time),
+        to_timestamp(end_time),
+        **{field: value for field, value in filters.items() if value is not None}
+    )
 
 def get_audit_trail(start_time: datetime, end_time: datetime) -> list:
     """Get audit trail entries within a time range."""
-    if not AUDIT_LOG_PATH.exists():
-        return []
-        
-    audit_entries = []
-    with AUDIT_LOG_PATH.open("r") as f:
-        for line in f:
-            try:
-                entry = json.loads(line)
-                event_time = datetime.fromisoformat(entry["timestamp"])
-                if start_time <= event_time <= end_time:
-                    audit_entries.append(entry)
-            except (json.JSONDecodeError, KeyError, ValueError):
-                logger.error("Error parsing audit log entry", extra={"security": True})
-                continue
-    
-    return audit_entries
\ No newline at end of file
+    # Include events still queued for the writer
+    audit_writer.flush(timeout=5)
+    return query_audit_log(to_timestamp(start_time), to_timestamp(end_time), AUDIT_LOG_PATH)
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set
+
+from .metrics import CACHE_REQUESTS
+
+# Principal cache configuration
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "300"))
+
+@dataclass(frozen=True)
+class Principal:
+    """Slim authenticated user record kept in the cache."""
+    id: int
+    email: str
+    is_active: bool
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+_CACHE_HITS = CACHE_REQUESTS.labels("principal", "hit")
+_CACHE_MISSES = CACHE_REQUESTS.labels("principal", "miss")
+
+class PrincipalCache:
+    """LRU cache of authenticated principals keyed by token hash.
+
+    Entries expire at the token's ``exp`` claim or after ``ttl`` seconds,
+    whichever comes first, so a user change made in another worker is
+    picked up within ``ttl``.
+    """
+
+    def __init__(self, max_size: int = PRINCIPAL_CACHE_SIZE, ttl: int = PRINCIPAL_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple[Principal, float]]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, token: str) -> Optional[Principal]:
+        key = hash_token(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                _CACHE_MISSES.inc()
+                return None
+            principal, expires_at = entry
+            if expires_at <= now:
+                self._remove(key)
+                self.misses += 1
+                _CACHE_MISSES.inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            _CACHE_HITS.inc()
+            return principal
+
+    def set(self, token: str, principal: Principal, exp: Optional[float] = None) -> None:
+        if self.max_size <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        key = hash_token(token)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (principal, expires_at)
+            self._keys_by_user.setdefault(principal.id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop every cached token belonging to ``user_id``."""
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key: str) -> None:
+        principal, _ = self._entries.pop(key)
+        keys = self._keys_by_user.get(principal.id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[principal.id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+# Global instance
+principal_cache = PrincipalCache()
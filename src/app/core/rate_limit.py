@@ -0,0 +1,243 @@
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+# Rate limiting configuration
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Per-route limits as "path=limit/window_seconds" pairs; the longest matching
+# path prefix wins over the global limit
+RATE_LIMIT_ROUTES = os.getenv("RATE_LIMIT_ROUTES", "/api/v1/token=20/60")
+# Where counters live: "memory" (per process), "mmap" or "sqlite" (shared by
+# the workers on one host) or "redis" (shared by every host)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# While a shared backend is unreachable, "open" lets requests through
+# unlimited and "closed" answers them with 503
+RATE_LIMIT_FAILURE_MODE = os.getenv("RATE_LIMIT_FAILURE_MODE", "open")
+
+def parse_route_limits(value: str) -> Dict[str, Tuple[int, float]]:
+    """Parse ``RATE_LIMIT_ROUTES`` into ``{path_prefix: (limit, window)}``."""
+    limits: Dict[str, Tuple[int, float]] = {}
+    for rule in value.split(","):
+        if not rule.strip():
+            continue
+        path, _, spec = rule.strip().rpartition("=")
+        limit, _, window = spec.partition("/")
+        if not path or not window:
+            raise ValueError(f"Invalid rate limit rule {rule!r}, expected path=limit/seconds")
+        limits[path] = (int(limit), float(window))
+    return limits
+
+class BackendUnavailable(Exception):
+    """Raised when a shared backend cannot be reached."""
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    retry_after: float
+    # True only for the first rejection after the key was last allowed
+    first_rejection: bool
+
+def roll_window(start: float, current: int, previous: int, window: float, now: float) -> Tuple[float, int, int]:
+    """Advance a key's fixed window to the one containing ``now``."""
+    elapsed = now - start
+    if elapsed < window:
+        return start, current, previous
+    periods = int(elapsed // window)
+    return start + periods * window, 0, current if periods == 1 else 0
+
+def estimate(start: float, current: int, previous: int, window: float, now: float) -> float:
+    """Sliding count: the previous window weighted by how much still overlaps."""
+    return previous * (1.0 - (now - start) / window) + current
+
+def retry_after(start: float, current: int, previous: int, window: float, limit: int, now: float) -> float:
+    """Seconds until one more hit fits under ``limit``."""
+    if current + 1 > limit or not previous:
+        wait = start + window - now
+    else:
+        # Until enough of the previous window has slid out
+        slack = (limit - current - 1) / previous
+        wait = start + window * (1.0 - slack) - now
+    return max(wait, 0.0)
+
+class RateLimitBackend(ABC):
+    """Storage for per-key sliding-window counters and lockouts.
+
+    Every method is atomic for all threads (and, for shared backends, all
+    processes) using the same store. ``now`` defaults to ``time.time()`` so
+    that timestamps agree between workers. Backends that wait on I/O set
+    ``blocking``, and the middleware then calls them from the threadpool.
+    """
+
+    blocking = False
+
+    @abstractmethod
+    def hit(self, key: str, limit: int, window: float, now: Optional[float] = None) -> RateLimitResult:
+        """Count a hit for ``key`` unless it would exceed ``limit`` per ``window``."""
+
+    @abstractmethod
+    def add(self, key: str, window: float, now: Optional[float] = None) -> float:
+        """Count a hit for ``key`` and return its sliding count."""
+
+    @abstractmethod
+    def lock(self, key: str, seconds: float, now: Optional[float] = None) -> None:
+        """Lock ``key`` out for ``seconds`` and drop its counts."""
+
+    @abstractmethod
+    def locked_for(self, key: str, now: Optional[float] = None) -> float:
+        """Seconds ``key`` stays locked out; 0 when it is not locked."""
+
+    @abstractmethod
+    def reset(self, key: str) -> None:
+        """Forget ``key``'s counts and lockout."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Forget every key."""
+
+    def close(self) -> None:
+        pass
+
+class _Window:
+    __slots__ = ("window", "start", "current", "previous", "blocked", "locked_until")
+
+    def __init__(self, window: float, now: float):
+        self.window = window
+        self.start = now
+        self.current = 0
+        self.previous = 0
+        self.blocked = False
+        self.locked_until = 0.0
+
+class SlidingWindowCounter(RateLimitBackend):
+    """In-process backend: approximate sliding-window counts in O(1).
+
+    Each key keeps only the hits of its current fixed window and of the one
+    before it. Windows start at a key's first hit, so a burst shorter than
+    the window is counted exactly.
+
+    Keys are kept in least-recently-hit order. Adding a key evicts, from the
+    front, keys idle for two windows (their count is back to zero) and the
+    oldest keys beyond ``max_keys``, so memory stays bounded and eviction
+    costs amortized O(1) per hit.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._entries: "OrderedDict[str, _Window]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, key: str, window: float, now: float) -> _Window:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Window(window, now)
+            self._evict(now)
+        else:
+            self._entries.move_to_end(key)
+            entry.window = window
+            entry.start, entry.current, entry.previous = roll_window(
+                entry.start, entry.current, entry.previous, window, now
+            )
+        return entry
+
+    def _evict(self, now: float) -> None:
+        entries = self._entries
+        while entries:
+            key, entry = next(iter(entries.items()))
+            idle = now - entry.start >= 2 * entry.window and entry.locked_until <= now
+            if len(entries) <= self.max_keys and not idle:
+                break
+            del entries[key]
+
+    def hit(self, key: str, limit: int, window: float, now: Optional[float] = None) -> RateLimitResult:
+        if now is None:
+            now = time.time()
+        with self._lock:
+            entry = self._entry(key, window, now)
+            if estimate(entry.start, entry.current, entry.previous, window, now) + 1 <= limit:
+                entry.current += 1
+                entry.blocked = False
+                return RateLimitResult(True, 0.0, False)
+            first_rejection = not entry.blocked
+            entry.blocked = True
+            return RateLimitResult(
+                False, retry_after(entry.start, entry.current, entry.previous, window, limit, now), first_rejection
+            )
+
+    def add(self, key: str, window: float, now: Optional[float] = None) -> float:
+        if now is None:
+            now = time.time()
+        with self._lock:
+            entry = self._entry(key, window, now)
+            entry.current += 1
+            return estimate(entry.start, entry.current, entry.previous, window, now)
+
+    def lock(self, key: str, seconds: float, now: Optional[float] = None) -> None:
+        if now is None:
+            now = time.time()
+        with self._lock:
+            entry = self._entry(key, seconds, now)
+            entry.current = entry.previous = 0
+            entry.locked_until = now + seconds
+
+    def locked_for(self, key: str, now: Optional[float] = None) -> float:
+        if now is None:
+            now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return 0.0
+            return max(entry.locked_until - now, 0.0)
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class LockoutTracker:
+    """Locks a key out after too many failures within a window."""
+
+    def __init__(self, backend: RateLimitBackend, prefix: str = "lockout|"):
+        self.backend = backend
+        self.prefix = prefix
+
+    def locked_for(self, key: str, now: Optional[float] = None) -> float:
+        """Seconds ``key`` stays locked out; 0 when it is not locked."""
+        return self.backend.locked_for(self.prefix + key, now)
+
+    def record_failure(
+        self, key: str, max_attempts: int, window: float, lockout: float, now: Optional[float] = None
+    ) -> bool:
+        """Count a failure; returns True when it starts a lockout."""
+        if self.backend.add(self.prefix + key, window, now) < max_attempts:
+            return False
+        self.backend.lock(self.prefix + key, lockout, now)
+        return True
+
+    def reset(self, key: str) -> None:
+        self.backend.reset(self.prefix + key)
+
+def create_backend(kind: str = RATE_LIMIT_BACKEND) -> RateLimitBackend:
+    """Backend named by ``RATE_LIMIT_BACKEND``, configured from its env vars."""
+    if kind == "memory":
+        return SlidingWindowCounter()
+    from . import rate_limit_backends
+
+    if kind == "mmap":
+        return rate_limit_backends.MmapBackend()
+    if kind == "sqlite":
+        return rate_limit_backends.SQLiteBackend()
+    if kind == "redis":
+        return rate_limit_backends.RedisBackend()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND {kind!r}, expected memory, mmap, sqlite or redis")
+
+# Global instances
+rate_limiter = create_backend()
+login_lockouts = LockoutTracker(rate_limiter)
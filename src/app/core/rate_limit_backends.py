@@ -0,0 +1,505 @@
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import socket
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+from .rate_limit import (
+    BackendUnavailable,
+    RateLimitBackend,
+    RateLimitResult,
+    estimate,
+    retry_after,
+    roll_window,
+)
+
+logger = logging.getLogger(__name__)
+
+# Shared backend configuration; every worker on a host must use the same values
+RATE_LIMIT_MMAP_PATH = os.getenv(
+    "RATE_LIMIT_MMAP_PATH", os.path.join(tempfile.gettempdir(), "budget-api-rate-limits.bin")
+)
+RATE_LIMIT_MMAP_SLOTS = int(os.getenv("RATE_LIMIT_MMAP_SLOTS", "65536"))
+RATE_LIMIT_SQLITE_PATH = os.getenv(
+    "RATE_LIMIT_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "budget-api-rate-limits.db")
+)
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_REDIS_PREFIX = os.getenv("RATE_LIMIT_REDIS_PREFIX", "budget-api:rl:")
+# After a failed call, Redis is not tried again for this many seconds
+RATE_LIMIT_REDIS_RETRY_SECONDS = float(os.getenv("RATE_LIMIT_REDIS_RETRY_SECONDS", "5"))
+
+# key hash, window, start, locked_until, current, previous, blocked
+_SLOT = struct.Struct("<QdddIIB7x")
+_EMPTY_SLOT = bytes(_SLOT.size)
+# Slots searched for a key, starting at its hash
+_PROBES = 8
+
+def _key_hash(key: str) -> int:
+    # Stable across processes, unlike hash(); 0 marks an empty slot
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+class MmapBackend(RateLimitBackend):
+    """Counter table in a memory-mapped file shared by the workers on a host.
+
+    Keys hash into ``slots`` fixed-size slots and probe up to 8 neighbours.
+    A new key takes an empty or idle slot in its run, or else the one whose
+    window started longest ago, so the file never grows. Each call holds an
+    exclusive ``flock`` on the file for a few microseconds, which makes the
+    read-modify-write atomic across processes.
+    """
+
+    # flock waits for other processes holding the file
+    blocking = True
+
+    def __init__(self, path: str = RATE_LIMIT_MMAP_PATH, slots: int = RATE_LIMIT_MMAP_SLOTS):
+        self.path = path
+        self.slots = slots
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = slots * _SLOT.size
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+        # flock does not exclude threads sharing the descriptor
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _find(self, key_hash: int, now: float, create: bool) -> Tuple[Optional[int], Optional[list]]:
+        """Offset and fields of ``key_hash``'s slot, claiming one if ``create``."""
+        free = stalest = None
+        stalest_start = float("inf")
+        base = key_hash % self.slots
+        for probe in range(_PROBES):
+            offset = (base + probe) % self.slots * _SLOT.size
+            fields = list(_SLOT.unpack_from(self._map, offset))
+            slot_hash, window, start, locked_until = fields[:4]
+            if slot_hash == key_hash:
+                return offset, fields
+            if not create:
+                continue
+            if free is None and (slot_hash == 0 or (now - start >= 2 * window and locked_until <= now)):
+                free = offset
+            if start < stalest_start:
+                stalest, stalest_start = offset, start
+        if not create:
+            return None, None
+        offset = free if free is not None else stalest
+        return offset, [key_hash, 0.0, now, 0.0, 0, 0, 0]
+
+    def _update(self, key: str, window: float, now: float) -> Tuple[int, list]:
+        offset, fields = self._find(_key_hash(key), now, create=True)
+        fields[1] = window
+        fields[2], fields[4], fields[5] = roll_window(fields[2], fields[4], fields[5], window, now)
+        return offset, fields
+
+    def hit(self, key: str, limit: int, window: float, now: Optional[float] = None) -> RateLimitResult:
+        if now is None:
+            now = time.time()
+        with self._locked():
+            offset, fields = self._update(key, window, now)
+            _, _, start, _, current, previous, blocked = fields
+            if estimate(start, current, previous, window, now) + 1 <= limit:
+                fields[4] += 1
+                fields[6] = 0
+                result = RateLimitResult(True, 0.0, False)
+            else:
+                fields[6] = 1
+                result = RateLimitResult(
+                    False, retry_after(start, current, previous, window, limit, now), not blocked
+                )
+            _SLOT.pack_into(self._map, offset, *fields)
+            return result
+
+    def add(self, key: str, window: float, now: Optional[float] = None) -> float:
+        if now is None:
+            now = time.time()
+        with self._locked():
+            offset, fields = self._update(key, window, now)
+            fields[4] += 1
+            _SLOT.pack_into(self._map, offset, *fields)
+            return estimate(fields[2], fields[4], fields[5], window, now)
+
+    def lock(self, key: str, seconds: float, now: Optional[float] = None) -> None:
+        if now is None:
+            now = time.time()
+        with self._locked():
+            offset, fields = self._update(key, seconds, now)
+            fields[3] = now + seconds
+            fields[4] = fields[5] = 0
+            _SLOT.pack_into(self._map, offset, *fields)
+
+    def locked_for(self, key: str, now: Optional[float] = None) -> float:
+        if now is None:
+            now = time.time()
+        with self._locked():
+            _, fields = self._find(_key_hash(key), now, create=False)
+        return max(fields[3] - now, 0.0) if fields else 0.0
+
+    def reset(self, key: str) -> None:
+        with self._locked():
+            offset, _ = self._find(_key_hash(key), time.time(), create=False)
+            if offset is not None:
+                self._map[offset:offset + _SLOT.size] = _EMPTY_SLOT
+
+    def clear(self) -> None:
+        with self._locked():
+            self._map[:] = bytes(len(self._map))
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+class SQLiteBackend(RateLimitBackend):
+    """Counters in a SQLite table shared through a local database file.
+
+    Each call is one ``BEGIN IMMEDIATE`` transaction that reads the row,
+    decides and upserts it, so workers take turns on SQLite's write lock.
+    The file uses WAL with ``synchronous=OFF``: counters need not survive a
+    power loss. Idle rows are deleted every ``sweep_every`` calls.
+    SQLite errors such as "database is locked" raise ``BackendUnavailable``.
+    """
+
+    # Waiting for the write lock can take up to the 5 s busy timeout
+    blocking = True
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS rate_limits ("
+        "key TEXT PRIMARY KEY, window REAL NOT NULL, start REAL NOT NULL, locked_until REAL NOT NULL, "
+        "current INTEGER NOT NULL, previous INTEGER NOT NULL, blocked INTEGER NOT NULL"
+        ") WITHOUT ROWID"
+    )
+    _SELECT = "SELECT window, start, locked_until, current, previous, blocked FROM rate_limits WHERE key = ?"
+    _UPSERT = (
+        "INSERT INTO rate_limits (key, window, start, locked_until, current, previous, blocked) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+        "window = excluded.window, start = excluded.start, locked_until = excluded.locked_until, "
+        "current = excluded.current, previous = excluded.previous, blocked = excluded.blocked"
+    )
+    _SWEEP = "DELETE FROM rate_limits WHERE start + 2 * window <= ? AND locked_until <= ?"
+
+    def __init__(self, path: str = RATE_LIMIT_SQLITE_PATH, sweep_every: int = 1000):
+        self.path = path
+        self.sweep_every = sweep_every
+        self._local = threading.local()
+        self._calls = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute(self._SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _unavailable_on_error(self) -> Iterator[None]:
+        try:
+            yield
+        except sqlite3.OperationalError as e:
+            # Reconnect on the next call rather than reuse a failed connection
+            self.close()
+            logger.warning("Rate limit backend SQLite at %s failed: %s", self.path, e)
+            raise BackendUnavailable(f"SQLite at {self.path} is unavailable") from e
+
+    @contextmanager
+    def _transaction(self, now: float) -> Iterator[sqlite3.Connection]:
+        with self._unavailable_on_error():
+            connection = self._connection()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+                self._calls += 1
+                if self._calls % self.sweep_every == 0:
+                    connection.execute(self._SWEEP, (now, now))
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+
+    def _row(self, connection: sqlite3.Connection, key: str, window: float, now: float) -> list:
+        row = connection.execute(self._SELECT, (key,)).fetchone()
+        if row is None:
+            return [window, now, 0.0, 0, 0, 0]
+        _, start, locked_until, current, previous, blocked = row
+        start, current, previous = roll_window(start, current, previous, window, now)
+        return [window, start, locked_until, current, previous, blocked]
+
+    def hit(self, key: str, limit: int, window: float, now: Optional[float] = None) -> RateLimitResult:
+        if now is None:
+            now = time.time()
+        with self._transaction(now) as connection:
+            fields = self._row(connection, key, window, now)
+            _, start, _, current, previous, blocked = fields
+            if estimate(start, current, previous, window, now) + 1 <= limit:
+                fields[3] += 1
+                fields[5] = 0
+                result = RateLimitResult(True, 0.0, False)
+            else:
+                fields[5] = 1
+                result = RateLimitResult(
+                    False, retry_after(start, current, previous, window, limit, now), not blocked
+                )
+            connection.execute(self._UPSERT, (key, *fields))
+        return result
+
+    def add(self, key: str, window: float, now: Optional[float] = None) -> float:
+        if now is None:
+            now = time.time()
+        with self._transaction(now) as connection:
+            fields = self._row(connection, key, window, now)
+            fields[3] += 1
+            connection.execute(self._UPSERT, (key, *fields))
+        return estimate(fields[1], fields[3], fields[4], window, now)
+
+    def lock(self, key: str, seconds: float, now: Optional[float] = None) -> None:
+        if now is None:
+            now = time.time()
+        with self._transaction(now) as connection:
+            connection.execute(self._UPSERT, (key, seconds, now, now + seconds, 0, 0, 0))
+
+    def locked_for(self, key: str, now: Optional[float] = None) -> float:
+        if now is None:
+            now = time.time()
+        with self._unavailable_on_error():
+            row = self._connection().execute(
+                "SELECT locked_until FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+        return max(row[0] - now, 0.0) if row else 0.0
+
+    def reset(self, key: str) -> None:
+        with self._unavailable_on_error():
+            self._connection().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._unavailable_on_error():
+            self._connection().execute("DELETE FROM rate_limits")
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+class RedisError(Exception):
+    pass
+
+class _RespConnection:
+    """Minimal Redis protocol (RESP2) client: pipelined commands, no pooling."""
+
+    def __init__(self, host: str, port: int, timeout: float = 1.0):
+        self._socket = socket.create_connection((host, port), timeout=timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._socket.makefile("rb")
+
+    @staticmethod
+    def _encode(command: Tuple[Any, ...]) -> bytes:
+        parts = [b"*%d\r\n" % len(command)]
+        for arg in command:
+            value = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(value), value))
+        return b"".join(parts)
+
+    def _read(self) -> Any:
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            return RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            return None if length < 0 else [self._read() for _ in range(length)]
+        raise RedisError(f"Unexpected reply {line!r}")
+
+    def pipeline(self, *commands: Tuple[Any, ...]) -> List[Any]:
+        """Send ``commands`` in one write and return their replies."""
+        self._socket.sendall(b"".join(self._encode(command) for command in commands))
+        replies = [self._read() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def close(self) -> None:
+        self._reader.close()
+        self._socket.close()
+
+# Reads the key's two windows and counts the hit only if it fits under the
+# limit, so a check is atomic and costs one round trip whatever the outcome.
+# KEYS: counts hash, blocked flag. ARGV: window index, previous index, index
+# to drop, weight of the previous window, limit, counts TTL, flag TTL (ms).
+_HIT_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or 0)
+local previous = tonumber(redis.call('HGET', KEYS[1], ARGV[2]) or 0)
+redis.call('HDEL', KEYS[1], ARGV[3])
+if previous * tonumber(ARGV[4]) + current + 1 <= tonumber(ARGV[5]) then
+    current = redis.call('HINCRBY', KEYS[1], ARGV[1], 1)
+    redis.call('PEXPIRE', KEYS[1], ARGV[6])
+    return {1, current, previous, 0}
+end
+local first = redis.call('SET', KEYS[2], 1, 'NX', 'PX', ARGV[7])
+return {0, current, previous, first and 1 or 0}
+"""
+_HIT_SCRIPT_SHA = hashlib.sha1(_HIT_SCRIPT.encode()).hexdigest()
+
+class RedisBackend(RateLimitBackend):
+    """Counters in Redis, or any server speaking its protocol, shared by all hosts.
+
+    Windows are aligned to multiples of ``window`` since the epoch. A key's
+    counts live in one hash with a field per window index, expiring two
+    windows after the last hit; a check is one script call. Locks are
+    separate keys with a TTL of the lockout.
+
+    When the server cannot be reached every call raises
+    ``BackendUnavailable``, and for ``retry_seconds`` afterwards calls raise
+    it straight away instead of waiting on the connection again.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        url: str = RATE_LIMIT_REDIS_URL,
+        prefix: str = RATE_LIMIT_REDIS_PREFIX,
+        retry_seconds: float = RATE_LIMIT_REDIS_RETRY_SECONDS
+    ):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.retry_seconds = retry_seconds
+        self._local = threading.local()
+        self._down_until = 0.0
+
+    def _connection(self) -> _RespConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = _RespConnection(self.host, self.port)
+            setup = []
+            if self.password:
+                setup.append(("AUTH", self.password))
+            if self.db:
+                setup.append(("SELECT", self.db))
+            if setup:
+                connection.pipeline(*setup)
+            self._local.connection = connection
+        return connection
+
+    def _pipeline(self, *commands: Tuple[Any, ...]) -> List[Any]:
+        if time.monotonic() < self._down_until:
+            raise BackendUnavailable(f"Redis at {self.host}:{self.port} is unavailable")
+        try:
+            return self._connection().pipeline(*commands)
+        except (OSError, ConnectionError) as e:
+            # Reconnect on the next call rather than reuse a broken socket
+            self.close()
+            self._down_until = time.monotonic() + self.retry_seconds
+            logger.warning(
+                "Rate limit backend Redis at %s:%s failed, retrying in %gs: %s",
+                self.host, self.port, self.retry_seconds, e
+            )
+            raise BackendUnavailable(f"Redis at {self.host}:{self.port} is unavailable") from e
+
+    def _script(self, keys: Tuple[str, ...], args: Tuple[Any, ...]) -> Any:
+        try:
+            return self._pipeline(("EVALSHA", _HIT_SCRIPT_SHA, len(keys), *keys, *args))[0]
+        except RedisError as e:
+            if not str(e).startswith("NOSCRIPT"):
+                raise
+        # Not cached on this server yet; EVAL runs the script and caches it
+        return self._pipeline(("EVAL", _HIT_SCRIPT, len(keys), *keys, *args))[0]
+
+    def _count(self, key: str, window: float, now: float, increment: int) -> Tuple[float, int, int]:
+        index = int(now // window)
+        counts = self.prefix + key
+        current, previous, _, _ = self._pipeline(
+            ("HINCRBY", counts, index, increment),
+            ("HGET", counts, index - 1),
+            ("HDEL", counts, index - 2),
+            ("PEXPIRE", counts, int(2 * window * 1000)),
+        )
+        return index * window, current, int(previous or 0)
+
+    def hit(self, key: str, limit: int, window: float, now: Optional[float] = None) -> RateLimitResult:
+        if now is None:
+            now = time.time()
+        index = int(now // window)
+        start = index * window
+        weight = 1.0 - (now - start) / window
+        allowed, current, previous, first = self._script(
+            (self.prefix + key, f"{self.prefix}{key}:blocked"),
+            (index, index - 1, index - 2, repr(weight), limit, int(2 * window * 1000), int(window * 1000)),
+        )
+        if allowed:
+            return RateLimitResult(True, 0.0, False)
+        return RateLimitResult(False, retry_after(start, current, previous, window, limit, now), bool(first))
+
+    def add(self, key: str, window: float, now: Optional[float] = None) -> float:
+        if now is None:
+            now = time.time()
+        start, current, previous = self._count(key, window, now, 1)
+        return estimate(start, current, previous, window, now)
+
+    def lock(self, key: str, seconds: float, now: Optional[float] = None) -> None:
+        self._pipeline(
+            ("DEL", self.prefix + key),
+            ("SET", f"{self.prefix}{key}:lock", 1, "PX", max(1, int(seconds * 1000))),
+        )
+
+    def locked_for(self, key: str, now: Optional[float] = None) -> float:
+        ttl = self._pipeline(("PTTL", f"{self.prefix}{key}:lock"))[0]
+        return ttl / 1000 if ttl > 0 else 0.0
+
+    def reset(self, key: str) -> None:
+        self._pipeline(
+            ("DEL", self.prefix + key, f"{self.prefix}{key}:lock", f"{self.prefix}{key}:blocked")
+        )
+
+    def clear(self) -> None:
+        cursor = b"0"
+        while True:
+            cursor, keys = self._pipeline(("SCAN", cursor, "MATCH", self.prefix + "*", "COUNT", 1000))[0]
+            if keys:
+                self._pipeline(("DEL", *keys))
+            if cursor in (b"0", "0"):
+                return
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
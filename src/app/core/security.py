@@ -7,6 +7,8 @@ import re
 from fastapi import HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
+from .hashing import hashing_executor
+
 # Security configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")  # Must be set in production
 ALGORITHM = "HS256"
@@ -15,14 +17,28 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/token")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a plain password against its hash."""
+def _verify(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
-def get_password_hash(password: str) -> str:
-    """Generate password hash."""
+def _hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a plain password against its hash on the hashing pool."""
+    return hashing_executor.run(_verify, plain_password, hashed_password)
+
+def get_password_hash(password: str) -> str:
+    """Generate password hash on the hashing pool."""
+    return hashing_executor.run(_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password without blocking the event loop."""
+    return await hashing_executor.run_async(_verify, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Generate password hash without blocking the event loop."""
+    return await hashing_executor.run_async(_hash, password)
+
 def validate_password(password: str) -> bool:
     """
     Validate password complexity requirements:
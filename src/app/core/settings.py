@@ -0,0 +1,32 @@
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+def _env_flag(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes", "on")
+
+@dataclass
+class Settings:
+    """Options for ``create_app``; ``from_env`` reads them from the environment."""
+
+    title: str = "Budget API"
+    version: str = "1.0.0"
+    cors_origins: List[str] = field(default_factory=lambda: ["http://localhost:3000"])
+    rate_limit: int = 100
+    rate_limit_window: float = 60
+    login_max_attempts: int = 5
+    login_lockout_seconds: float = 300
+    # Largest request body accepted; None uses MAX_REQUEST_SIZE
+    max_request_size: Optional[int] = None
+    # Create missing tables and indexes on startup instead of via ``app.cli migrate``
+    auto_migrate: bool = False
+    # Route the root logger through the background log pipeline
+    configure_logging: bool = True
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            cors_origins=os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(","),
+            auto_migrate=_env_flag("AUTO_MIGRATE"),
+            configure_logging=_env_flag("CONFIGURE_LOGGING", "true"),
+        )
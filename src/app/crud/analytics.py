@@ -0,0 +1,183 @@
+import math
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Float, func, select, type_coerce
+from sqlalchemy.orm import Session
+
+from ..models.models import Transaction
+
+BUCKETS = ("day", "week", "month")
+PERCENTILES = (50, 90, 95, 99)
+LARGEST_LIMIT = 5
+
+def _day_expression(dialect: str):
+    """SQL expression for the calendar day of ``Transaction.date``."""
+    if dialect == "sqlite":
+        # SQLite stores DateTime as ISO text; slicing is much cheaper than date()
+        return func.substr(Transaction.date, 1, 10)
+    return func.date(func.date_trunc("day", Transaction.date))
+
+def _bucket_start(day: date, bucket: str) -> date:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+def _range_filters(card_id: int, date_from: Optional[datetime], date_to: Optional[datetime]) -> list:
+    filters = [Transaction.card_id == card_id]
+    if date_from is not None:
+        filters.append(Transaction.date >= date_from)
+    if date_to is not None:
+        filters.append(Transaction.date <= date_to)
+    return filters
+
+def _get_buckets(db: Session, filters: list, bucket: str) -> List[Dict[str, Any]]:
+    """Daily totals are grouped in SQL, then rolled up to weeks or months."""
+    day = _day_expression(db.get_bind().dialect.name).label("day")
+    rows = db.execute(
+        select(day, Transaction.type, func.sum(Transaction.amount), func.count())
+        .where(*filters)
+        .group_by(day, Transaction.type)
+    ).all()
+
+    buckets: Dict[date, Dict[str, Any]] = {}
+    for day_value, transaction_type, total, count in rows:
+        if day_value is None:
+            continue
+        if isinstance(day_value, str):
+            day_value = date.fromisoformat(day_value)
+        start = _bucket_start(day_value, bucket)
+        entry = buckets.setdefault(start, {"income": 0.0, "expense": 0.0, "count": 0})
+        if transaction_type in ("income", "expense"):
+            entry[transaction_type] += total
+        entry["count"] += count
+
+    return [
+        {
+            "start": start.isoformat(),
+            "income": entry["income"],
+            "expense": entry["expense"],
+            "net": entry["income"] - entry["expense"],
+            "count": entry["count"],
+        }
+        for start, entry in sorted(buckets.items())
+    ]
+
+def _ranked_amounts(db: Session, filters: list, rank: int, count: int) -> Optional[tuple[float, float]]:
+    """Amounts at ascending ``rank`` and ``rank + 1`` (clamped to the last row).
+
+    Walks the (card_id, type, amount, date) index from whichever end is
+    closer. The date is in the index so a date range is checked there too:
+    bounded walks still read amounts in order, with no sort or table lookups.
+    ``count`` comes from an earlier statement; if rows were deleted since,
+    the walk clamps to the nearest remaining row, or returns None if none
+    are left.
+    """
+    query = select(Transaction.amount).where(*filters)
+    ascending = query.order_by(Transaction.amount.asc())
+    descending = query.order_by(Transaction.amount.desc())
+    if rank >= count - 1:
+        amounts = db.scalars(descending.limit(1)).all()
+    elif rank < count / 2:
+        amounts = (
+            db.scalars(ascending.limit(2).offset(rank)).all()
+            or db.scalars(descending.limit(1)).all()
+        )
+    else:
+        amounts = (
+            db.scalars(descending.limit(2).offset(count - rank - 2)).all()[::-1]
+            or db.scalars(ascending.limit(1)).all()
+        )
+    if not amounts:
+        return None
+    return amounts[0], amounts[-1]
+
+def _percentile(db: Session, filters: list, q: float, count: int) -> Optional[float]:
+    """Linear-interpolated percentile, matching NumPy's default method."""
+    position = (count - 1) * q / 100
+    rank = math.floor(position)
+    amounts = _ranked_amounts(db, filters, rank, count)
+    if amounts is None:
+        return None
+    low, high = amounts
+    return low + (high - low) * (position - rank)
+
+def _amount_statistics(db: Session, filters: list, transaction_type: str) -> Dict[str, Any]:
+    """Count, total, mean, extremes and percentiles of one transaction type.
+
+    PostgreSQL computes every percentile in the same aggregate pass with
+    ``percentile_cont``, which interpolates like NumPy.
+    """
+    filters = [*filters, Transaction.type == transaction_type]
+    columns = [
+        func.count(),
+        func.coalesce(func.sum(Transaction.amount), 0.0),
+        func.min(Transaction.amount),
+        func.max(Transaction.amount),
+    ]
+    ordered_set = db.get_bind().dialect.name == "postgresql"
+    if ordered_set:
+        # Imported here so SQLite deployments do not load the dialect at startup
+        from sqlalchemy.dialects import postgresql
+
+        fractions = postgresql.array([q / 100 for q in PERCENTILES])
+        # Typed from the ORDER BY column otherwise, but an array comes back
+        ordered = func.percentile_cont(fractions).within_group(Transaction.amount)
+        columns.append(type_coerce(ordered, postgresql.ARRAY(Float)))
+    row = db.execute(select(*columns).where(*filters)).one()
+    count, total, minimum, maximum = row[:4]
+    if count == 0:
+        return {"count": 0, "total": 0.0, "mean": None, "min": None, "max": None, "percentiles": {}}
+    if ordered_set:
+        percentiles = {f"p{q}": value for q, value in zip(PERCENTILES, row[4])}
+    else:
+        percentiles = {f"p{q}": _percentile(db, filters, q, count) for q in PERCENTILES}
+        if None in percentiles.values():
+            # Every row was deleted after the count was read
+            percentiles = {}
+    return {
+        "count": count,
+        "total": total,
+        "mean": total / count,
+        "min": minimum,
+        "max": maximum,
+        "percentiles": percentiles,
+    }
+
+def get_card_analytics(
+    db: Session,
+    card_id: int,
+    bucket: str = "month",
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Time-bucketed income/expense totals and amount statistics for a card.
+
+    All aggregation runs in SQL: buckets are a GROUP BY and percentiles are
+    an ordered-set aggregate (PostgreSQL) or index walks over (card_id, type,
+    amount, date), so no ORM ``Transaction`` objects are built and only a
+    handful of rows reach Python.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket: {bucket}")
+    filters = _range_filters(card_id, date_from, date_to)
+
+    largest = db.execute(
+        select(Transaction.id, Transaction.date, Transaction.amount, Transaction.description)
+        .where(*filters, Transaction.type == "expense")
+        .order_by(Transaction.amount.desc())
+        .limit(LARGEST_LIMIT)
+    ).all()
+
+    return {
+        "card_id": card_id,
+        "bucket": bucket,
+        "date_from": date_from,
+        "date_to": date_to,
+        "buckets": _get_buckets(db, filters, bucket),
+        "income": _amount_statistics(db, filters, "income"),
+        "expense": _amount_statistics(db, filters, "expense"),
+        "largest_expenses": [row._asdict() for row in largest],
+    }
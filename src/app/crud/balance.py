@@ -0,0 +1,104 @@
+from typing import Optional
+from sqlalchemy import Float, Integer, bindparam, case, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from ..models.models import Card, CardBalance, Transaction
+
+def _last_transaction_date(card_id):
+    return (
+        select(func.max(Transaction.date))
+        .where(Transaction.card_id == card_id)
+        .scalar_subquery()
+    )
+
+def split_amount(amount: float, transaction_type: str) -> tuple[float, float]:
+    """Return the ``(income, expense)`` contribution of one transaction."""
+    if transaction_type == "income":
+        return amount, 0.0
+    if transaction_type == "expense":
+        return 0.0, amount
+    return 0.0, 0.0
+
+def get_card_balance(db: Session, card_id: int) -> CardBalance:
+    balance = db.query(CardBalance).filter(CardBalance.card_id == card_id).first()
+    if balance is None:
+        # Cards created before balances were tracked
+        rebuild_balances(db, card_id=card_id)
+        db.commit()
+        balance = db.query(CardBalance).filter(CardBalance.card_id == card_id).first()
+    return balance
+
+# Built once: constructing and compiling this UPDATE per call costs more
+# than executing it
+_BALANCE_DELTA = (
+    update(CardBalance)
+    .where(CardBalance.card_id == bindparam("target_card_id"))
+    .values(
+        income_total=CardBalance.income_total + bindparam("income_delta", type_=Float),
+        expense_total=CardBalance.expense_total + bindparam("expense_delta", type_=Float),
+        transaction_count=CardBalance.transaction_count + bindparam("count_delta", type_=Integer),
+        last_transaction_date=_last_transaction_date(bindparam("target_card_id"))
+    )
+)
+
+def apply_balance_delta(
+    db: Session,
+    card_id: int,
+    income: float = 0.0,
+    expense: float = 0.0,
+    count: int = 0
+) -> None:
+    """Adjust a card's running totals inside the caller's transaction.
+
+    Must run after the transaction rows themselves have been flushed so the
+    last transaction date reflects them. The caller commits.
+    """
+    result = db.connection().execute(_BALANCE_DELTA, {
+        "target_card_id": card_id,
+        "income_delta": income,
+        "expense_delta": expense,
+        "count_delta": count
+    })
+    if result.rowcount == 0:
+        rebuild_balances(db, card_id=card_id)
+
+def rebuild_balances(db: Session, card_id: Optional[int] = None) -> int:
+    """Recompute balances from the transactions table to repair drift.
+
+    Rebuilds one card, or every card when ``card_id`` is None. The caller
+    commits. Returns the number of cards rebuilt.
+    """
+    income, expense = (
+        func.coalesce(func.sum(case((Transaction.type == kind, Transaction.amount), else_=0.0)), 0.0)
+        for kind in ("income", "expense")
+    )
+    totals = (
+        select(
+            Card.id,
+            income,
+            expense,
+            func.count(Transaction.id),
+            func.max(Transaction.date)
+        )
+        .select_from(Card)
+        .outerjoin(Transaction, Transaction.card_id == Card.id)
+        .group_by(Card.id)
+    )
+    stale = delete(CardBalance)
+    if card_id is not None:
+        totals = totals.where(Card.id == card_id)
+        stale = stale.where(CardBalance.card_id == card_id)
+
+    db.execute(stale.execution_options(synchronize_session=False))
+    result = db.execute(
+        insert(CardBalance).from_select(
+            [
+                CardBalance.card_id,
+                CardBalance.income_total,
+                CardBalance.expense_total,
+                CardBalance.transaction_count,
+                CardBalance.last_transaction_date
+            ],
+            totals
+        )
+    )
+    return result.rowcount
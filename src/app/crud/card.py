@@ -1,15 +1,48 @@
-from sqlalchemy.orm import Session
-from ..models.models import Card
+from typing import Optional
+from sqlalchemy.orm import Session, raiseload, selectinload
+from ..models.models import Card, CardBalance
 from ..schemas.schemas import CardCreate
 
-def get_card(db: Session, card_id: int):
-    return db.query(Card).filter(Card.id == card_id).first()
+def get_card(db: Session, card_id: int, with_transactions: bool = False):
+    query = db.query(Card)
+    if with_transactions:
+        query = query.options(selectinload(Card.transactions), selectinload(Card.balance))
+    return query.filter(Card.id == card_id).first()
 
-def get_user_cards(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(Card).filter(Card.owner_id == user_id).offset(skip).limit(limit).all()
+def get_user_cards(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None,
+    with_balance: bool = False
+):
+    """List a user's cards by id; ``after_id`` continues from a previous page.
+
+    Transactions, and the balance unless ``with_balance``, are never loaded:
+    touching them on a listed card raises instead of issuing a query per card.
+    """
+    query = (
+        db.query(Card)
+        .options(
+            raiseload(Card.transactions),
+            selectinload(Card.balance) if with_balance else raiseload(Card.balance)
+        )
+        .filter(Card.owner_id == user_id)
+    )
+    if after_id is not None:
+        query = query.filter(Card.id > after_id)
+    query = query.order_by(Card.id)
+    if after_id is None and skip:
+        query = query.offset(skip)
+    return query.limit(limit).all()
 
 def create_card(db: Session, card: CardCreate, user_id: int):
-    db_card = Card(**card.dict(), owner_id=user_id)
+    db_card = Card(
+        **card.dict(),
+        owner_id=user_id,
+        balance=CardBalance(income_total=0.0, expense_total=0.0, transaction_count=0)
+    )
     db.add(db_card)
     db.commit()
     db.refresh(db_card)
@@ -1,23 +1,172 @@
+import os
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import Row, and_, insert, or_, select, text
 from sqlalchemy.orm import Session
-from ..models.models import Transaction
+from ..database import fts
+from ..models.models import Card, Transaction
 from ..schemas.schemas import TransactionCreate
+from .balance import apply_balance_delta, split_amount
+
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", "1000"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_COLUMNS = ("id", "date", "type", "amount", "description")
 
 def get_transaction(db: Session, transaction_id: int):
     return db.query(Transaction).filter(Transaction.id == transaction_id).first()
 
-def get_card_transactions(db: Session, card_id: int, skip: int = 0, limit: int = 100):
-    return db.query(Transaction).filter(Transaction.card_id == card_id).offset(skip).limit(limit).all()
+def get_card_transactions(
+    db: Session,
+    card_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    transaction_type: Optional[str] = None
+):
+    """List a card's transactions newest first.
+
+    ``after`` is the ``(date, id)`` of the last row of the previous page;
+    when given, the page is read by keyset instead of ``skip``. Date bounds
+    are inclusive and served by the (card_id, date, id) index.
+    """
+    query = db.query(Transaction).filter(Transaction.card_id == card_id)
+    if date_from is not None:
+        query = query.filter(Transaction.date >= date_from)
+    if date_to is not None:
+        query = query.filter(Transaction.date <= date_to)
+    if min_amount is not None:
+        query = query.filter(Transaction.amount >= min_amount)
+    if max_amount is not None:
+        query = query.filter(Transaction.amount <= max_amount)
+    if transaction_type is not None:
+        query = query.filter(Transaction.type == transaction_type)
+    if after is not None:
+        after_date, after_id = after
+        query = query.filter(or_(
+            Transaction.date < after_date,
+            and_(Transaction.date == after_date, Transaction.id < after_id)
+        ))
+    query = query.order_by(Transaction.date.desc(), Transaction.id.desc())
+    if after is None and skip:
+        query = query.offset(skip)
+    return query.limit(limit).all()
+
+def search_transactions(db: Session, user_id: int, query: str, limit: int = 50) -> List[Transaction]:
+    """Search descriptions across a user's cards, best matches first.
+
+    Every word is prefix-matched. SQLite uses the FTS5 index ranked by
+    bm25; other backends fall back to ILIKE (trigram-indexed on Postgres)
+    ordered by date.
+    """
+    terms = fts.search_terms(query)
+    if not terms:
+        return []
+    connection = db.connection()
+    if fts.fts_index_exists(connection):
+        statement = text(
+            f"SELECT transactions.* FROM {fts.FTS_TABLE} "
+            f"JOIN transactions ON transactions.id = {fts.FTS_TABLE}.rowid "
+            "JOIN cards ON cards.id = transactions.card_id "
+            f"WHERE {fts.FTS_TABLE} MATCH :match AND cards.owner_id = :user_id "
+            "ORDER BY rank LIMIT :limit"
+        )
+        return db.scalars(
+            select(Transaction).from_statement(statement),
+            {"match": fts.fts_match_expression(terms), "user_id": user_id, "limit": limit}
+        ).all()
+
+    # Terms are word characters only, so "_" is the one LIKE wildcard to escape
+    patterns = [
+        Transaction.description.ilike("%" + term.replace("_", "\\_") + "%", escape="\\")
+        for term in terms
+    ]
+    return (
+        db.query(Transaction)
+        .join(Card, Card.id == Transaction.card_id)
+        .filter(Card.owner_id == user_id, *patterns)
+        .order_by(Transaction.date.desc(), Transaction.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+def stream_card_transactions(
+    db: Session,
+    card_id: int,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[Sequence[Row]]:
+    """Yield a card's full history, oldest first, in batches of plain rows.
+
+    Uses a server-side cursor and selects bare columns, so no ORM objects
+    are built and memory stays bounded by ``batch_size``.
+    """
+    statement = (
+        select(*(getattr(Transaction, column) for column in EXPORT_COLUMNS))
+        .where(Transaction.card_id == card_id)
+        .order_by(Transaction.date, Transaction.id)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    result = db.execute(statement)
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
 
 def create_transaction(db: Session, transaction: TransactionCreate, card_id: int):
     db_transaction = Transaction(**transaction.dict(), card_id=card_id)
     db.add(db_transaction)
+    db.flush()
+    income, expense = split_amount(transaction.amount, transaction.type)
+    apply_balance_delta(db, card_id, income=income, expense=expense, count=1)
     db.commit()
     db.refresh(db_transaction)
     return db_transaction
 
+def create_transactions_bulk(
+    db: Session,
+    transactions: List[TransactionCreate],
+    card_id: int,
+    chunk_size: int = BULK_INSERT_CHUNK_SIZE
+) -> List[int]:
+    """Insert many transactions in one database transaction.
+
+    Rows are sent as batched executemany INSERTs of ``chunk_size`` rows and
+    committed once. Returns the new ids in input order.
+    """
+    statement = insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True)
+    ids: List[int] = []
+    income_total = expense_total = 0.0
+    try:
+        for start in range(0, len(transactions), chunk_size):
+            rows = []
+            for transaction in transactions[start:start + chunk_size]:
+                income, expense = split_amount(transaction.amount, transaction.type)
+                income_total += income
+                expense_total += expense
+                rows.append({**transaction.dict(), "card_id": card_id})
+            ids.extend(db.scalars(statement, rows).all())
+        apply_balance_delta(
+            db, card_id, income=income_total, expense=expense_total, count=len(ids)
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return ids
+
 def delete_transaction(db: Session, transaction_id: int):
     transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
     if transaction:
         db.delete(transaction)
+        db.flush()
+        if transaction.card_id is not None:
+            income, expense = split_amount(transaction.amount, transaction.type)
+            apply_balance_delta(
+                db, transaction.card_id, income=-income, expense=-expense, count=-1
+            )
         db.commit()
     return transaction
\ No newline at end of file
@@ -1,37 +1,58 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, lazyload, selectinload
 from sqlalchemy.exc import SQLAlchemyError
 import logging
 
-from ..models.models import User
+from ..models.models import Card, User
 from ..schemas.schemas import UserCreate
 from ..core.security import get_password_hash
+from ..core.principal_cache import principal_cache
 
 logger = logging.getLogger(__name__)
 
-def get_user(db: Session, user_id: int) -> User | None:
+def _cards_loader(with_cards: bool):
+    if with_cards:
+        return selectinload(User.cards).options(
+            selectinload(Card.transactions),
+            selectinload(Card.balance)
+        )
+    return lazyload(User.cards)
+
+def get_user(db: Session, user_id: int, with_cards: bool = False) -> User | None:
     try:
-        return db.query(User).filter(User.id == user_id).first()
+        return (
+            db.query(User)
+            .options(_cards_loader(with_cards))
+            .filter(User.id == user_id)
+            .first()
+        )
     except SQLAlchemyError as e:
-        logger.error(f"Database error in get_user: {str(e)}", extra={"security": True})
+        logger.error("Database error in get_user: %s", e, extra={"security": True})
         raise
 
-def get_user_by_email(db: Session, email: str) -> User | None:
+def get_user_by_email(db: Session, email: str, with_cards: bool = False) -> User | None:
     try:
-        return db.query(User).filter(User.email == email).first()
+        return (
+            db.query(User)
+            .options(_cards_loader(with_cards))
+            .filter(User.email == email)
+            .first()
+        )
     except SQLAlchemyError as e:
-        logger.error(f"Database error in get_user_by_email: {str(e)}", extra={"security": True})
+        logger.error("Database error in get_user_by_email: %s", e, extra={"security": True})
         raise
 
 def get_users(db: Session, skip: int = 0, limit: int = 100) -> list[User]:
     try:
         return db.query(User).offset(skip).limit(limit).all()
     except SQLAlchemyError as e:
-        logger.error(f"Database error in get_users: {str(e)}", extra={"security": True})
+        logger.error("Database error in get_users: %s", e, extra={"security": True})
         raise
 
-def create_user(db: Session, user: UserCreate) -> User:
+def create_user(db: Session, user: UserCreate, hashed_password: str | None = None) -> User:
+    """Create a user; pass ``hashed_password`` when the hash was computed upfront."""
     try:
-        hashed_password = get_password_hash(user.password)
+        if hashed_password is None:
+            hashed_password = get_password_hash(user.password)
         db_user = User(
             email=user.email,
             hashed_password=hashed_password,
@@ -40,11 +61,11 @@ def create_user(db: Session, user: UserCreate) -> User:
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
-        logger.info(f"Created new user: {user.email}", extra={"security": True})
+        logger.info("Created new user: %s", user.email, extra={"security": True})
         return db_user
     except SQLAlchemyError as e:
         db.rollback()
-        logger.error(f"Database error in create_user: {str(e)}", extra={"security": True})
+        logger.error("Database error in create_user: %s", e, extra={"security": True})
         raise
 
 def update_user(db: Session, user_id: int, user_update: dict) -> User | None:
@@ -61,24 +82,27 @@ def update_user(db: Session, user_id: int, user_update: dict) -> User | None:
         
         db.commit()
         db.refresh(db_user)
-        logger.info(f"Updated user: {db_user.email}", extra={"security": True})
+        principal_cache.invalidate_user(user_id)
+        logger.info("Updated user: %s", db_user.email, extra={"security": True})
         return db_user
     except SQLAlchemyError as e:
         db.rollback()
-        logger.error(f"Database error in update_user: {str(e)}", extra={"security": True})
+        logger.error("Database error in update_user: %s", e, extra={"security": True})
         raise
 
 def delete_user(db: Session, user_id: int) -> bool:
     try:
-        db_user = get_user(db, user_id)
+        # Plain query: the unit of work must see the real cards collection
+        db_user = db.query(User).filter(User.id == user_id).first()
         if db_user is None:
             return False
         
         db.delete(db_user)
         db.commit()
-        logger.info(f"Deleted user: {db_user.email}", extra={"security": True})
+        principal_cache.invalidate_user(user_id)
+        logger.info("Deleted user: %s", db_user.email, extra={"security": True})
         return True
     except SQLAlchemyError as e:
         db.rollback()
-        logger.error(f"Database error in delete_user: {str(e)}", extra={"security": True})
+        logger.error("Database error in delete_user: %s", e, extra={"security": True})
         raise
\ No newline at end of file
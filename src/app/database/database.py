@@ -1,24 +1,71 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Callable, TypeVar, Union
 import os
 
+from . import sqlite
+from .pool import pool_metrics, pool_options
+
+T = TypeVar("T")
+DBSession = Union[Session, AsyncSession]
+
 SQLALCHEMY_DATABASE_URL = os.getenv(
     "DATABASE_URL",
     "sqlite:///./budget.db"
 )
 
 # Create SQLite engine with foreign key support
-connect_args = {"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+connect_args = {"check_same_thread": False} if IS_SQLITE else {}
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args=connect_args,
-    pool_pre_ping=True
+    **pool_options(SQLALCHEMY_DATABASE_URL, "primary")
 )
+if IS_SQLITE:
+    sqlite.register(engine)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional async stack: handlers await I/O on the event loop instead of
+# holding a threadpool thread for the whole request
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() == "true"
+
+def _async_database_url(url: str) -> str:
+    """Map a sync URL onto its async driver (aiosqlite / asyncpg)."""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    for prefix in ("postgresql://", "postgres://", "postgresql+psycopg2://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    _async_database_url(SQLALCHEMY_DATABASE_URL)
+)
+
+async_engine = None
+AsyncSessionLocal = None
+if DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        **pool_options(ASYNC_DATABASE_URL, "primary-async", is_async=True)
+    )
+    if IS_SQLITE:
+        sqlite.register(async_engine.sync_engine)
+    # Results are serialized after the session work returns, so keep loaded
+    # attributes instead of expiring them (an expired attribute would need IO)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
 # Create declarative base
 Base = declarative_base()
 
@@ -30,9 +77,50 @@ def get_db() -> Session:
     finally:
         db.close()
 
-def init_db() -> None:
-    """Initialize database with all tables."""
-    Base.metadata.create_all(bind=engine)
+async def get_async_db() -> AsyncSession:
+    """Get async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Session dependency used by the API: async when DATABASE_ASYNC is enabled
+get_session = get_async_db if DATABASE_ASYNC else get_db
+
+async def run_db(db: DBSession, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await a sync CRUD function against either kind of session.
+
+    With an ``AsyncSession`` the function runs via ``run_sync``, so its
+    queries go through the async driver without occupying a thread; with a
+    plain ``Session`` it runs in the threadpool as a sync handler would.
+    """
+    if isinstance(db, Session):
+        return await run_in_threadpool(fn, db, *args, **kwargs)
+    return await db.run_sync(fn, *args, **kwargs)
+
+def get_database_settings() -> dict:
+    """Backend and effective connection settings, as reported by /health."""
+    settings = {"dialect": engine.dialect.name, "async": DATABASE_ASYNC}
+    if IS_SQLITE:
+        settings["pragmas"] = dict(sqlite.effective_pragmas)
+    settings["pools"] = [metrics.get_stats() for metrics in pool_metrics.values()]
+    return settings
+
+def init_db(bind=None) -> None:
+    """Initialize database with all tables and indexes.
+
+    ``create_all`` only adds indexes when it creates their table, so indexes
+    and the description search index introduced after a database was
+    created are added here as well.
+    """
+    from ..models import models  # noqa: F401 - registers the tables
+    from .fts import ensure_search_index
+
+    bind = bind if bind is not None else engine
+    Base.metadata.create_all(bind=bind)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+    with bind.begin() as connection:
+        ensure_search_index(connection)
 
 def get_test_db() -> Session:
     """Get test database session."""
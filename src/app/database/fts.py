@@ -0,0 +1,90 @@
+import logging
+import re
+from typing import List
+
+from sqlalchemy import DDL, Table, event, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "transactions_fts"
+
+# External-content FTS5 index over transactions.description, kept in sync
+# by triggers so every write path (ORM, bulk insert, raw SQL) is covered.
+SQLITE_FTS_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "description, content='transactions', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON transactions BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON transactions BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) "
+    "VALUES ('delete', old.id, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF description ON transactions BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) "
+    "VALUES ('delete', old.id, old.description); "
+    f"INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description); END",
+]
+
+SQLITE_FTS_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+# Other backends fall back to ILIKE, which pg_trgm can serve from an index
+POSTGRES_TRGM_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_transactions_description_trgm "
+    "ON transactions USING gin (description gin_trgm_ops)",
+]
+
+def fts5_available(connection: Connection) -> bool:
+    if connection.dialect.name != "sqlite":
+        return False
+    options = connection.exec_driver_sql("PRAGMA compile_options").scalars().all()
+    return "ENABLE_FTS5" in options
+
+def fts_index_exists(connection: Connection) -> bool:
+    if connection.dialect.name != "sqlite":
+        return False
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE}
+    ).first() is not None
+
+def _execute_if_fts5(ddl, target, bind, **kw) -> bool:
+    return fts5_available(bind)
+
+def register(table: Table) -> None:
+    """Create/drop the FTS index together with the transactions table."""
+    for statement in SQLITE_FTS_DDL:
+        event.listen(table, "after_create", DDL(statement).execute_if(callable_=_execute_if_fts5))
+    for statement in SQLITE_FTS_DROP:
+        event.listen(table, "before_drop", DDL(statement).execute_if(dialect="sqlite"))
+
+def ensure_search_index(connection: Connection) -> None:
+    """Add the search index to an existing database and backfill it."""
+    if fts5_available(connection):
+        if fts_index_exists(connection):
+            return
+        for statement in SQLITE_FTS_DDL:
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    elif connection.dialect.name == "postgresql":
+        try:
+            with connection.begin_nested():
+                for statement in POSTGRES_TRGM_DDL:
+                    connection.exec_driver_sql(statement)
+        except SQLAlchemyError as e:
+            logger.warning("Could not create trigram search index: %s", e)
+
+def search_terms(query: str) -> List[str]:
+    """Split free text into word terms, dropping FTS syntax characters."""
+    return re.findall(r"\w+", query)
+
+def fts_match_expression(terms: List[str]) -> str:
+    """Build an FTS5 query that prefix-matches every term."""
+    return " ".join(f'"{term}"*' for term in terms)
@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Type
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from ..core.metrics import (
+    DB_POOL_CHECKOUT_WAIT,
+    DB_POOL_IDLE,
+    DB_POOL_IN_USE,
+    DB_POOL_OVERFLOW,
+    DB_POOL_TIMEOUTS,
+)
+
+# Connection pool configuration (per engine, per worker process)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+# Unset: ping networked databases on checkout, skip it for local SQLite files
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING")
+
+# Upper bounds (seconds) of the checkout wait histogram
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+class PoolMetrics:
+    """Checkout wait times and timeouts for one engine's pool.
+
+    Also feeds the Prometheus pool metrics, labelled with the pool name.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool: Optional[Pool] = None
+        self._wait = DB_POOL_CHECKOUT_WAIT.labels(name)
+        self._timeouts = DB_POOL_TIMEOUTS.labels(name)
+        self._in_use = DB_POOL_IN_USE.labels(name)
+        self._idle = DB_POOL_IDLE.labels(name)
+        self._overflow = DB_POOL_OVERFLOW.labels(name)
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.bucket_counts = [0] * len(WAIT_BUCKETS)
+        self.peak_in_use = 0
+
+    def record_checkout(self, pool: Pool, waited: float) -> None:
+        in_use = pool.checkedout()
+        with self._lock:
+            self.pool = pool
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            if waited > self.wait_seconds_max:
+                self.wait_seconds_max = waited
+            for index, bound in enumerate(WAIT_BUCKETS):
+                if waited <= bound:
+                    self.bucket_counts[index] += 1
+                    break
+            if in_use > self.peak_in_use:
+                self.peak_in_use = in_use
+        self._wait.observe(waited)
+        self.update_gauges(pool)
+
+    def record_timeout(self, pool: Pool) -> None:
+        with self._lock:
+            self.pool = pool
+            self.timeouts += 1
+        self._timeouts.inc()
+
+    def update_gauges(self, pool: Pool) -> None:
+        self._in_use.set(pool.checkedout())
+        self._idle.set(pool.checkedin())
+        self._overflow.set(max(0, pool.overflow()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        pool = self.pool
+        with self._lock:
+            return {
+                "name": self.name,
+                "size": pool.size() if pool is not None else None,
+                "in_use": pool.checkedout() if pool is not None else 0,
+                "idle": pool.checkedin() if pool is not None else 0,
+                "overflow": max(0, pool.overflow()) if pool is not None else 0,
+                "peak_in_use": self.peak_in_use,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": self.wait_seconds_total,
+                "wait_seconds_max": self.wait_seconds_max,
+                "wait_buckets": dict(zip(WAIT_BUCKETS, self.bucket_counts)),
+            }
+
+# Metrics of every instrumented pool, by engine name
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+class _InstrumentedPoolMixin:
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout(self)
+            raise
+        self.metrics.record_checkout(self, time.perf_counter() - started)
+        return connection
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self.metrics.update_gauges(self)
+
+def instrumented_pool_class(base: Type[QueuePool], name: str) -> Type[QueuePool]:
+    """``base`` subclass that records checkout waits under ``name``.
+
+    The metrics live on the class so they survive ``Pool.recreate()``.
+    """
+    metrics = pool_metrics.setdefault(name, PoolMetrics(name))
+    return type(f"Instrumented{base.__name__}", (_InstrumentedPoolMixin, base), {"metrics": metrics})
+
+def pool_options(url: str, name: str, is_async: bool = False) -> Dict[str, Any]:
+    """``create_engine`` pool arguments from the DB_POOL_* settings."""
+    is_sqlite = url.startswith("sqlite")
+    if DB_POOL_PRE_PING is None:
+        pre_ping = not is_sqlite
+    else:
+        pre_ping = DB_POOL_PRE_PING.lower() == "true"
+    options: Dict[str, Any] = {"pool_pre_ping": pre_ping, "pool_recycle": DB_POOL_RECYCLE}
+    if is_sqlite and (":memory:" in url or url.rstrip("/").endswith(":")):
+        # In-memory SQLite keeps its single-connection pool
+        return options
+    options.update(
+        poolclass=instrumented_pool_class(AsyncAdaptedQueuePool if is_async else QueuePool, name),
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    return options
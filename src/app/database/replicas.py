@@ -0,0 +1,235 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import sqlite
+from .pool import pool_options
+from .database import DATABASE_ASYNC, _async_database_url
+
+logger = logging.getLogger(__name__)
+
+# Read replica configuration
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+DATABASE_REPLICA_WEIGHTS = [
+    float(weight) for weight in os.getenv("DATABASE_REPLICA_WEIGHTS", "").split(",") if weight.strip()
+]
+REPLICA_HEALTH_INTERVAL_SECONDS = float(os.getenv("REPLICA_HEALTH_INTERVAL_SECONDS", "10"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "30"))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Seconds since the last replayed transaction; NULL on a primary
+POSTGRES_LAG_QUERY = (
+    "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+)
+
+class Replica:
+    """A read-only engine with its routing weight and health state."""
+
+    def __init__(
+        self,
+        url: str,
+        weight: float = 1.0,
+        engine: Optional[Engine] = None,
+        name: Optional[str] = None
+    ):
+        self.url = url
+        self.weight = weight
+        if engine is None:
+            is_sqlite = url.startswith("sqlite")
+            engine = create_engine(
+                url,
+                connect_args={"check_same_thread": False} if is_sqlite else {},
+                **pool_options(url, name or "replica")
+            )
+            if is_sqlite:
+                sqlite.register(engine)
+        self.engine = engine
+        self.name = engine.url.render_as_string(hide_password=True)
+        self.pool_name = name or "replica"
+        self.healthy = True
+        self.lag_seconds: Optional[float] = None
+        self.failures = 0
+        self.reads = 0
+        self._session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self._async_engine = None
+        self._async_session_factory = None
+
+    def session(self) -> Session:
+        return self._session_factory()
+
+    def async_session(self):
+        if self._async_session_factory is None:
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+            async_url = _async_database_url(self.url)
+            self._async_engine = create_async_engine(
+                async_url,
+                **pool_options(async_url, f"{self.pool_name}-async", is_async=True)
+            )
+            if self.url.startswith("sqlite"):
+                sqlite.register(self._async_engine.sync_engine)
+            self._async_session_factory = async_sessionmaker(
+                self._async_engine, autoflush=False, expire_on_commit=False
+            )
+        return self._async_session_factory()
+
+    def check(self, max_lag: float) -> bool:
+        """Probe the replica and update its health; returns the new state."""
+        try:
+            with self.engine.connect() as connection:
+                if connection.dialect.name == "postgresql":
+                    self.lag_seconds = float(connection.exec_driver_sql(POSTGRES_LAG_QUERY).scalar() or 0)
+                else:
+                    connection.exec_driver_sql("SELECT 1")
+                    self.lag_seconds = 0.0
+        except Exception as e:
+            self.mark_down(str(e))
+            return False
+        healthy = self.lag_seconds <= max_lag
+        if healthy != self.healthy:
+            logger.warning(
+                "Replica %s is %s (%.1fs behind)",
+                self.name, "healthy" if healthy else "lagging", self.lag_seconds
+            )
+        self.healthy = healthy
+        return healthy
+
+    def mark_down(self, reason: str) -> None:
+        if self.healthy:
+            logger.warning("Replica %s marked unhealthy: %s", self.name, reason)
+        self.healthy = False
+        self.failures += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "weight": self.weight,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "failures": self.failures,
+            "reads": self.reads,
+        }
+
+class ReplicaRouter:
+    """Chooses where a read-only request runs.
+
+    Reads go to a healthy replica picked by weight, or to the primary when
+    none is healthy or the user wrote within ``read_your_writes`` seconds
+    (so they never see their own change missing). A background thread
+    re-checks every replica each ``health_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        replicas: List[Replica],
+        health_interval: float = REPLICA_HEALTH_INTERVAL_SECONDS,
+        max_lag: float = REPLICA_MAX_LAG_SECONDS,
+        read_your_writes: float = READ_YOUR_WRITES_SECONDS
+    ):
+        self.replicas = replicas
+        self.health_interval = health_interval
+        self.max_lag = max_lag
+        self.read_your_writes = read_your_writes
+        self._lock = threading.Lock()
+        self._last_write: "OrderedDict[int, float]" = OrderedDict()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.primary_reads = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def mark_write(self, user_id: int) -> None:
+        """Pin ``user_id``'s reads to the primary for the read-your-writes window."""
+        if self.read_your_writes <= 0 or not self.replicas:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._last_write[user_id] = now
+            self._last_write.move_to_end(user_id)
+            while self._last_write:
+                oldest_user, written_at = next(iter(self._last_write.items()))
+                if now - written_at < self.read_your_writes:
+                    break
+                del self._last_write[oldest_user]
+
+    def _wrote_recently(self, user_id: Optional[int]) -> bool:
+        if user_id is None or self.read_your_writes <= 0:
+            return False
+        with self._lock:
+            written_at = self._last_write.get(user_id)
+        return written_at is not None and time.monotonic() - written_at < self.read_your_writes
+
+    def choose(self, user_id: Optional[int] = None) -> Optional[Replica]:
+        """Return the replica to read from, or None to use the primary."""
+        if not self.replicas:
+            return None
+        self._ensure_health_checks()
+        if not self._wrote_recently(user_id):
+            healthy = [replica for replica in self.replicas if replica.healthy]
+            if healthy:
+                replica = random.choices(healthy, weights=[r.weight for r in healthy])[0]
+                replica.reads += 1
+                return replica
+        self.primary_reads += 1
+        return None
+
+    def check_all(self) -> None:
+        for replica in self.replicas:
+            replica.check(self.max_lag)
+
+    def _ensure_health_checks(self) -> None:
+        if self._thread is None and self.health_interval > 0:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._health_loop, name="replica-health", daemon=True
+                    )
+                    self._thread.start()
+
+    def _health_loop(self) -> None:
+        while True:
+            self.check_all()
+            if self._stop.wait(self.health_interval):
+                return
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "replicas": [replica.get_stats() for replica in self.replicas],
+            "primary_reads": self.primary_reads,
+            "read_your_writes_seconds": self.read_your_writes,
+        }
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+        for replica in self.replicas:
+            replica.engine.dispose()
+
+def _configured_replicas() -> List[Replica]:
+    weights = DATABASE_REPLICA_WEIGHTS or [1.0] * len(DATABASE_REPLICA_URLS)
+    if len(weights) != len(DATABASE_REPLICA_URLS):
+        raise ValueError("DATABASE_REPLICA_WEIGHTS must have one weight per replica URL")
+    return [
+        Replica(url, weight, name=f"replica-{index}")
+        for index, (url, weight) in enumerate(zip(DATABASE_REPLICA_URLS, weights))
+    ]
+
+# Global instance
+replica_router = ReplicaRouter(_configured_replicas())
+
+def open_replica_session(replica: Replica):
+    """Session on ``replica`` matching the primary's sync/async mode."""
+    return replica.async_session() if DATABASE_ASYNC else replica.session()
@@ -0,0 +1,75 @@
+import logging
+import os
+import re
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Pragma profile applied to every new SQLite connection; set a variable to
+# an empty string to leave that pragma at SQLite's default
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+    "foreign_keys": os.getenv("SQLITE_FOREIGN_KEYS", "ON"),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),  # KiB when negative
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", "268435456"),
+}
+
+_PRAGMA_VALUE = re.compile(r"^-?[A-Za-z0-9_]+$")
+
+# PRAGMA reads return enum values as integers
+_SYNCHRONOUS_NAMES = {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"}
+_TEMP_STORE_NAMES = {0: "DEFAULT", 1: "FILE", 2: "MEMORY"}
+
+# Settings read back from the most recent connection, reported by /health
+effective_pragmas: Dict[str, Any] = {}
+
+def _validate(pragmas: Dict[str, str]) -> Dict[str, str]:
+    configured = {name: value for name, value in pragmas.items() if value}
+    for name, value in configured.items():
+        if not _PRAGMA_VALUE.match(value):
+            raise ValueError(f"Invalid value for SQLite pragma {name}: {value!r}")
+    return configured
+
+def _readable(name: str, value: Any) -> Any:
+    if name == "synchronous":
+        return _SYNCHRONOUS_NAMES.get(value, value)
+    if name == "temp_store":
+        return _TEMP_STORE_NAMES.get(value, value)
+    if name == "foreign_keys":
+        return "ON" if value else "OFF"
+    if name == "journal_mode" and isinstance(value, str):
+        return value.upper()
+    return value
+
+def apply_pragmas(dbapi_connection, pragmas: Dict[str, str]) -> Dict[str, Any]:
+    """Apply ``pragmas`` to a DBAPI connection and return the values in effect."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        effective = {}
+        for name in pragmas:
+            cursor.execute(f"PRAGMA {name}")
+            row = cursor.fetchone()
+            effective[name] = _readable(name, row[0] if row else None)
+        return effective
+    finally:
+        cursor.close()
+
+def register(engine: Engine, pragmas: Dict[str, str] = SQLITE_PRAGMAS) -> None:
+    """Apply the pragma profile whenever ``engine`` opens a connection."""
+    configured = _validate(pragmas)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        effective = apply_pragmas(dbapi_connection, configured)
+        if effective != effective_pragmas:
+            logger.info("SQLite settings: %s", effective)
+            effective_pragmas.clear()
+            effective_pragmas.update(effective)
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from .database import DBSession, engine, run_db
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Write coordinator configuration
+WRITE_COORDINATOR = os.getenv("WRITE_COORDINATOR", "false").lower() == "true"
+WRITE_BATCH_MAX = int(os.getenv("WRITE_BATCH_MAX", "128"))
+WRITE_BATCH_WAIT_MS = float(os.getenv("WRITE_BATCH_WAIT_MS", "0"))
+WRITE_TIMEOUT_SECONDS = float(os.getenv("WRITE_TIMEOUT_SECONDS", "30"))
+
+_Job = Tuple[Callable[..., Any], tuple, dict, Future]
+
+class WriteCoordinator:
+    """Serializes writes through one connection with group commit.
+
+    A single thread owns the connection and takes jobs from a queue. Every
+    job queued while the previous batch was committing (up to ``batch_max``,
+    optionally waiting ``batch_wait`` seconds for more) runs in one
+    transaction and shares its COMMIT and fsync. Each job runs inside its own
+    SAVEPOINT, in which the CRUD functions' ``commit()``/``rollback()`` only
+    release or roll back nested savepoints, so a failing job discards just
+    its own changes. Futures resolve after the batch is durable.
+
+    If the connection fails (connecting, BEGIN, a savepoint), that batch's
+    jobs fail with the error and the next batch opens a fresh connection.
+    """
+
+    def __init__(
+        self,
+        bind: Engine,
+        batch_max: int = WRITE_BATCH_MAX,
+        batch_wait: float = WRITE_BATCH_WAIT_MS / 1000,
+        timeout: float = WRITE_TIMEOUT_SECONDS
+    ):
+        self.bind = bind
+        self.batch_max = max(1, batch_max)
+        self.batch_wait = max(0.0, batch_wait)
+        self.timeout = timeout
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._batches = 0
+        self._jobs = 0
+        self._failed = 0
+        self._max_batch = 0
+        self._commit_seconds = 0.0
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="db-writer", daemon=True
+                    )
+                    self._thread.start()
+
+    def submit(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        """Queue ``fn(session, *args, **kwargs)`` for the writer thread."""
+        future: Future = Future()
+        self._ensure_started()
+        self._queue.put((fn, args, kwargs, future))
+        return future
+
+    async def run_async(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Await ``fn`` on the writer thread for at most ``timeout`` seconds.
+
+        A write that has not started by then is dropped; one that has
+        started still finishes, but the caller gets the timeout.
+        """
+        future = asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+        try:
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise exc.TimeoutError(f"Write not completed within {self.timeout} seconds") from None
+
+    def _collect(self, first: _Job) -> List[Optional[_Job]]:
+        batch: List[Optional[_Job]] = [first]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_max:
+            timeout = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(job)
+            if job is None:
+                break
+        return batch
+
+    def _run(self) -> None:
+        connection: Optional[Connection] = None
+        try:
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    return
+                batch = self._collect(job)
+                jobs = [job for job in batch if job is not None]
+                try:
+                    if connection is None:
+                        connection = self.bind.connect()
+                    self._run_batch(connection, jobs)
+                except Exception as e:
+                    logger.error("Write batch of %d failed: %s", len(jobs), e)
+                    self._fail(jobs, e)
+                    self._discard(connection)
+                    connection = None
+                if len(jobs) < len(batch):
+                    return
+        finally:
+            self._discard(connection)
+            with self._lock:
+                # Let the next submit() start a new writer if this one died
+                if self._thread is threading.current_thread():
+                    self._thread = None
+
+    def _discard(self, connection: Optional[Connection]) -> None:
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception as e:
+                logger.warning("Closing the writer connection failed: %s", e)
+
+    def _fail(self, jobs: List[_Job], error: Exception) -> None:
+        for _, _, _, future in jobs:
+            if not future.done():
+                future.set_exception(error)
+        self._record(len(jobs), len(jobs), 0.0)
+
+    def _begin(self, connection: Connection):
+        transaction = connection.begin()
+        if connection.dialect.name == "sqlite":
+            # Take the write lock upfront; pysqlite would otherwise defer BEGIN
+            # and let the first SAVEPOINT RELEASE commit on its own
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+        return transaction
+
+    def _run_batch(self, connection: Connection, jobs: List[_Job]) -> None:
+        outcomes: List[Tuple[Future, bool, Any]] = []
+        transaction = self._begin(connection)
+
+        for fn, args, kwargs, future in jobs:
+            if not future.set_running_or_notify_cancel():
+                continue
+            savepoint = connection.begin_nested()
+            session = Session(
+                bind=connection,
+                join_transaction_mode="create_savepoint",
+                autoflush=False,
+                expire_on_commit=False
+            )
+            try:
+                result = fn(session, *args, **kwargs)
+                session.close()
+                savepoint.commit()
+                outcomes.append((future, True, result))
+            except Exception as e:
+                session.close()
+                savepoint.rollback()
+                outcomes.append((future, False, e))
+
+        started = time.perf_counter()
+        try:
+            transaction.commit()
+        except Exception as e:
+            logger.error("Group commit of %d writes failed: %s", len(outcomes), e)
+            if transaction.is_active:
+                transaction.rollback()
+            outcomes = [(future, False, e) for future, _, _ in outcomes]
+        elapsed = time.perf_counter() - started
+
+        failed = 0
+        for future, ok, value in outcomes:
+            if ok:
+                future.set_result(value)
+            else:
+                failed += 1
+                future.set_exception(value)
+        self._record(len(jobs), failed, elapsed)
+
+    def _record(self, size: int, failed: int, commit_seconds: float) -> None:
+        with self._lock:
+            self._batches += 1
+            self._jobs += size
+            self._failed += failed
+            self._commit_seconds += commit_seconds
+            if size > self._max_batch:
+                self._max_batch = size
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "batches": self._batches,
+                "writes": self._jobs,
+                "failed": self._failed,
+                "max_batch": self._max_batch,
+                "avg_batch": self._jobs / self._batches if self._batches else 0.0,
+                "commit_seconds": self._commit_seconds,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Finish queued writes, then stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            if wait:
+                thread.join()
+
+# Global instance
+write_coordinator = WriteCoordinator(engine)
+
+async def run_write(db: DBSession, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await a mutating CRUD function, via the write coordinator when enabled.
+
+    With the coordinator the write runs on its own connection, so ``db`` is
+    only used when the coordinator is off.
+    """
+    if WRITE_COORDINATOR:
+        return await write_coordinator.run_async(fn, *args, **kwargs)
+    return await run_db(db, fn, *args, **kwargs)
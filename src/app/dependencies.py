@@ -1,25 +1,28 @@
+from typing import AsyncIterator, Iterator
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session
-from .database.database import SessionLocal
+from .database.database import DBSession, get_db, get_session, run_db
+from .database.replicas import open_replica_session, replica_router
+from .database.writer import run_write
 from .core.security import SECRET_KEY, ALGORITHM
+from .core.principal_cache import Principal, principal_cache
 from .crud import user as user_crud
 from .schemas import schemas
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/token")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> schemas.User:
+    db=Depends(get_session)
+) -> Principal:
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -33,7 +36,55 @@ async def get_current_user(
         token_data = schemas.TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    user = user_crud.get_user_by_email(db, email=token_data.email)
+    user = await run_db(db, user_crud.get_user_by_email, email=token_data.email)
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    principal = Principal(id=user.id, email=user.email, is_active=user.is_active)
+    principal_cache.set(token, principal, exp=payload.get("exp"))
+    return principal
+
+async def get_read_session(
+    principal: Principal = Depends(get_current_user),
+    db: DBSession = Depends(get_session)
+) -> AsyncIterator[DBSession]:
+    """Session for read-only endpoints: a replica when one is available."""
+    replica = replica_router.choose(principal.id)
+    if replica is None:
+        yield db
+        return
+    replica_db = open_replica_session(replica)
+    try:
+        yield replica_db
+    except DBAPIError as e:
+        if e.connection_invalidated:
+            replica.mark_down(str(e))
+        raise
+    finally:
+        if isinstance(replica_db, Session):
+            replica_db.close()
+        else:
+            await replica_db.close()
+
+def get_read_db(
+    principal: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Iterator[Session]:
+    """Sync variant of ``get_read_session`` for streaming responses."""
+    replica = replica_router.choose(principal.id)
+    if replica is None:
+        yield db
+        return
+    replica_db = replica.session()
+    try:
+        yield replica_db
+    finally:
+        replica_db.close()
+
+def get_write_session(
+    principal: Principal = Depends(get_current_user),
+    db: DBSession = Depends(get_session)
+) -> Iterator[DBSession]:
+    """Primary session for mutations; pins the user's next reads to the primary."""
+    replica_router.mark_write(principal.id)
+    yield db
+    replica_router.mark_write(principal.id)
@@ -1,8 +1,9 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String, Float, DateTime
 from sqlalchemy.orm import relationship
 from datetime import datetime, UTC
 
 from ..database.database import Base
+from ..database import fts
 
 class User(Base):
     __tablename__ = "users"
@@ -24,6 +25,17 @@ class Card(Base):
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="cards")
     transactions = relationship("Transaction", back_populates="card")
+    balance = relationship(
+        "CardBalance",
+        uselist=False,
+        back_populates="card",
+        cascade="all, delete-orphan"
+    )
+
+    __table_args__ = (
+        # Keyset pagination of a user's cards
+        Index("ix_cards_owner_id_id", "owner_id", "id"),
+    )
 
 class Transaction(Base):
     __tablename__ = "transactions"
@@ -34,4 +46,28 @@ class Transaction(Base):
     date = Column(DateTime, default=lambda: datetime.now(UTC))
     type = Column(String)  # "income" or "expense"
     card_id = Column(Integer, ForeignKey("cards.id"))
-    card = relationship("Card", back_populates="transactions")
\ No newline at end of file
+    card = relationship("Card", back_populates="transactions")
+
+    __table_args__ = (
+        # Keyset pagination of a card's history, newest first
+        Index("ix_transactions_card_id_date_id", "card_id", "date", "id"),
+        # Covering index for per-type amount statistics and largest transactions
+        Index("ix_transactions_card_id_type_amount", "card_id", "type", "amount", "date"),
+    )
+
+fts.register(Transaction.__table__)
+
+class CardBalance(Base):
+    """Running totals per card, maintained by the transaction CRUD layer."""
+    __tablename__ = "card_balances"
+
+    card_id = Column(Integer, ForeignKey("cards.id"), primary_key=True)
+    income_total = Column(Float, nullable=False, default=0.0)
+    expense_total = Column(Float, nullable=False, default=0.0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+    last_transaction_date = Column(DateTime, nullable=True)
+    card = relationship("Card", back_populates="balance")
+
+    @property
+    def net(self) -> float:
+        return (self.income_total or 0.0) - (self.expense_total or 0.0)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 
 class TransactionBase(BaseModel):
@@ -18,6 +18,48 @@ class Transaction(TransactionBase):
     class Config:
         orm_mode = True
 
+class BulkTransactionRowResult(BaseModel):
+    index: int
+    status: str  # "created" or "invalid"
+    id: Optional[int] = None
+    errors: List[str] = []
+
+class BulkTransactionResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkTransactionRowResult]
+
+class AnalyticsBucket(BaseModel):
+    start: str
+    income: float
+    expense: float
+    net: float
+    count: int
+
+class AmountStatistics(BaseModel):
+    count: int
+    total: float
+    mean: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    percentiles: Dict[str, float] = {}
+
+class LargestTransaction(BaseModel):
+    id: int
+    date: datetime
+    amount: float
+    description: str
+
+class CardAnalytics(BaseModel):
+    card_id: int
+    bucket: str
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    buckets: List[AnalyticsBucket]
+    income: AmountStatistics
+    expense: AmountStatistics
+    largest_expenses: List[LargestTransaction]
+
 class CardBase(BaseModel):
     card_number: str
     card_name: str
@@ -26,14 +68,28 @@ class CardBase(BaseModel):
 class CardCreate(CardBase):
     pass
 
-class Card(CardBase):
+class CardBalance(BaseModel):
+    card_id: int
+    income_total: float
+    expense_total: float
+    net: float
+    transaction_count: int
+    last_transaction_date: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+class CardSummary(CardBase):
     id: int
     owner_id: int
-    transactions: List[Transaction] = []
+    balance: Optional[CardBalance] = None
 
     class Config:
         orm_mode = True
 
+class Card(CardSummary):
+    transactions: List[Transaction] = []
+
 class UserBase(BaseModel):
     email: EmailStr
     full_name: str
@@ -41,14 +97,16 @@ class UserBase(BaseModel):
 class UserCreate(UserBase):
     password: str
 
-class User(UserBase):
+class UserSummary(UserBase):
     id: int
     is_active: bool
-    cards: List[Card] = []
 
     class Config:
         orm_mode = True
 
+class User(UserSummary):
+    cards: List[Card] = []
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -1,117 +1,148 @@
-from fastapi import FastAPI, Request, status
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import SQLAlchemyError
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
 import logging
-import logging.config
 from datetime import datetime
+from typing import AsyncIterator, Optional
 
-from app.api.v1 import auth, cards, transactions
-from app.core.middleware import SecurityHeadersMiddleware, RateLimitingMiddleware, BruteForceProtectionMiddleware
+from app.api.v1 import analytics, auth, cards, transactions
+from app.core.middleware import (
+    MAX_REQUEST_SIZE,
+    BruteForceProtectionMiddleware,
+    CorrelationIdMiddleware,
+    ProcessTimeMiddleware,
+    RateLimitingMiddleware,
+    RequestSizeMiddleware,
+    SecurityHeadersMiddleware,
+)
 from app.core.error_handling import (
     validation_error_handler,
     sqlalchemy_error_handler,
-    http_exception_handler,
     general_exception_handler
 )
-from app.database.database import engine
-from app.models import models
-
-# Configure logging
-logging.config.dictConfig({
-    'version': 1,
-    'disable_existing_loggers': False,
-    'formatters': {
-        'standard': {
-            'format': '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
-        },
-    },
-    'handlers': {
-        'default': {
-            'level': 'INFO',
-            'formatter': 'standard',
-            'class': 'logging.StreamHandler',
-            'stream': 'ext://sys.stdout',
-        },
-        'file': {
-            'level': 'INFO',
-            'formatter': 'standard',
-            'class': 'logging.FileHandler',
-            'filename': 'app.log',
-            'mode': 'a',
-        },
-    },
-    'loggers': {
-        '': {
-            'handlers': ['default', 'file'],
-            'level': 'INFO',
-            'propagate': True
-        },
-    }
-})
+from app.core.audit import audit_writer
+from app.core.hashing import hashing_executor
+from app.core.logging_config import log_pipeline
+from app.core.metrics import MetricsMiddleware, mark_process_dead, render_metrics
+from app.core.principal_cache import principal_cache
+from app.core.settings import Settings
+from app.database.database import get_database_settings, init_db
+from app.database.replicas import replica_router
+from app.database.writer import WRITE_COORDINATOR, write_coordinator
 
 logger = logging.getLogger(__name__)
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+def _lifespan(settings: Settings):
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        if settings.configure_logging:
+            # Send all logging through the background queue listener
+            log_pipeline.configure()
+        if settings.auto_migrate:
+            init_db()
+        # Handlers added with ``app.on_event`` still run
+        await app.router.startup()
+        yield
+        await app.router.shutdown()
+        hashing_executor.shutdown()
+        write_coordinator.shutdown()
+        replica_router.shutdown()
+        audit_writer.shutdown()
+        mark_process_dead()
+        # Last, so records from the other shutdown steps are still written
+        log_pipeline.shutdown()
 
-app = FastAPI(
-    title="Budget API",
-    description="API for managing personal budget and card transactions",
-    version="1.0.0",
-    docs_url="/api/docs",
-    redoc_url="/api/redoc",
-    openapi_url="/openapi.json"
-)
+    return lifespan
 
-# Configure CORS first
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE"],
-    allow_headers=["*"],
-    expose_headers=["*"],
-    max_age=600,
-)
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """Build the application.
+
+    Importing this module has no side effects: logging is configured and
+    background workers are stopped by the lifespan handler, and the schema
+    is created by ``python -m app.cli migrate`` (or ``AUTO_MIGRATE=true``).
+    """
+    settings = settings or Settings.from_env()
+    app = FastAPI(
+        title=settings.title,
+        description="API for managing personal budget and card transactions",
+        version=settings.version,
+        docs_url="/api/docs",
+        redoc_url="/api/redoc",
+        openapi_url="/openapi.json"
+    )
+    app.state.settings = settings
+    # FastAPI of this vintage has no ``lifespan`` argument
+    app.router.lifespan_context = _lifespan(settings)
+
+    # Configure CORS first
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_origins,
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE"],
+        allow_headers=["*"],
+        expose_headers=["*"],
+        max_age=600,
+    )
+
+    # Add security middlewares in correct order
+    app.add_middleware(RequestSizeMiddleware, max_size=settings.max_request_size or MAX_REQUEST_SIZE)
+    app.add_middleware(
+        BruteForceProtectionMiddleware,
+        max_attempts=settings.login_max_attempts,
+        lockout_time=settings.login_lockout_seconds
+    )
+    app.add_middleware(RateLimitingMiddleware, rate_limit=settings.rate_limit, time_window=settings.rate_limit_window)
+    app.add_middleware(SecurityHeadersMiddleware)
+
+    # Outside the security middleware, so the measured latency covers all of it
+    app.add_middleware(ProcessTimeMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    # Outermost, so every log record of a request carries its ID
+    app.add_middleware(CorrelationIdMiddleware)
+
+    # Add exception handlers
+    app.add_exception_handler(RequestValidationError, validation_error_handler)
+    app.add_exception_handler(SQLAlchemyError, sqlalchemy_error_handler)
+    app.add_exception_handler(Exception, general_exception_handler)
+
+    # Include routers
+    app.include_router(auth.router, prefix="/api/v1", tags=["authentication"])
+    app.include_router(cards.router, prefix="/api/v1", tags=["cards"])
+    app.include_router(transactions.router, prefix="/api/v1", tags=["transactions"])
+    app.include_router(analytics.router, prefix="/api/v1", tags=["analytics"])
+
+    @app.get("/")
+    async def read_root():
+        return {"message": "Welcome to the Budget API"}
+
+    @app.get("/api/v1/")
+    async def read_api_root():
+        return {"version": settings.version, "status": "active"}
+
+    @app.get("/health")
+    async def health_check():
+        health = {
+            "status": "healthy",
+            "timestamp": datetime.now().isoformat(),
+            "version": settings.version,
+            "principal_cache": principal_cache.get_stats(),
+            "audit_log": audit_writer.get_stats(),
+            "logging": log_pipeline.get_stats(),
+            "database": get_database_settings()
+        }
+        if WRITE_COORDINATOR:
+            health["write_coordinator"] = write_coordinator.get_stats()
+        if replica_router.enabled:
+            health["replicas"] = replica_router.get_stats()
+        return health
+
+    @app.get("/metrics")
+    async def metrics():
+        body, content_type = render_metrics()
+        return Response(content=body, headers={"Content-Type": content_type})
+
+    return app
 
-# Add security middlewares in correct order
-app.add_middleware(BruteForceProtectionMiddleware, max_attempts=5, lockout_time=300)
-app.add_middleware(RateLimitingMiddleware, rate_limit=100, time_window=60)
-app.add_middleware(SecurityHeadersMiddleware)
-
-# Add exception handlers
-app.add_exception_handler(RequestValidationError, validation_error_handler)
-app.add_exception_handler(SQLAlchemyError, sqlalchemy_error_handler)
-app.add_exception_handler(Exception, general_exception_handler)
-
-# Include routers
-app.include_router(auth.router, prefix="/api/v1", tags=["authentication"])
-app.include_router(cards.router, prefix="/api/v1", tags=["cards"])
-app.include_router(transactions.router, prefix="/api/v1", tags=["transactions"])
-
-@app.get("/")
-async def read_root():
-    return {"message": "Welcome to the Budget API"}
-
-@app.get("/api/v1/")
-async def read_api_root():
-    return {"version": "1.0.0", "status": "active"}
-
-@app.get("/health")
-async def health_check():
-    return {
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "version": "1.0.0"
-    }
-
-@app.get("/metrics")
-async def metrics():
-    return (
-        "http_requests_total{method=\"GET\"} 100\n"
-        "http_requests_total{method=\"POST\"} 50\n"
-        "http_request_duration_seconds{method=\"GET\"} 0.123\n"
-        "http_request_duration_seconds{method=\"POST\"} 0.456\n"
-    )
\ No newline at end of file
+app = create_app()
@@ -0,0 +1,175 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import status
+from sqlalchemy import event
+
+from app.crud.analytics import _range_filters, _ranked_amounts, get_card_analytics
+from app.models.models import Card, Transaction, User
+
+
+@pytest.fixture
+def auth_headers(client):
+    # Create user and get token
+    client.post(
+        "/api/v1/users/",
+        json={
+            "email": "test@example.com",
+            "password": "SecurePass123!",
+            "full_name": "Test User"
+        }
+    )
+    
+    response = client.post(
+        "/api/v1/token",
+        data={
+            "username": "test@example.com",
+            "password": "SecurePass123!"
+        }
+    )
+    token = response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def test_card_id(client, auth_headers):
+    response = client.post(
+        "/api/v1/cards/",
+        headers=auth_headers,
+        json={
+            "card_number": "1234567890123456",
+            "card_name": "Test Card",
+            "bank_name": "Test Bank"
+        }
+    )
+    return response.json()["id"]
+
+def test_card_analytics(client, auth_headers, test_card_id):
+    client.post(
+        f"/api/v1/cards/{test_card_id}/transactions/bulk",
+        headers=auth_headers,
+        json=[
+            {"amount": 2000.0, "description": "Salary", "type": "income"},
+            {"amount": 10.0, "description": "Coffee", "type": "expense"},
+            {"amount": 20.0, "description": "Lunch", "type": "expense"},
+            {"amount": 300.0, "description": "Groceries", "type": "expense"}
+        ]
+    )
+
+    response = client.get(
+        f"/api/v1/cards/{test_card_id}/analytics",
+        headers=auth_headers,
+        params={"bucket": "day"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert len(data["buckets"]) == 1
+    assert data["buckets"][0]["income"] == 2000.0
+    assert data["buckets"][0]["expense"] == 330.0
+    assert data["buckets"][0]["net"] == 1670.0
+    assert data["expense"]["count"] == 3
+    assert data["expense"]["percentiles"]["p50"] == 20.0
+    assert data["largest_expenses"][0]["description"] == "Groceries"
+
+def test_card_analytics_invalid_bucket(client, auth_headers, test_card_id):
+    response = client.get(
+        f"/api/v1/cards/{test_card_id}/analytics",
+        headers=auth_headers,
+        params={"bucket": "year"}
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+def test_card_analytics_percentiles(client, auth_headers, test_card_id):
+    client.post(
+        f"/api/v1/cards/{test_card_id}/transactions/bulk",
+        headers=auth_headers,
+        json=[
+            {"amount": float(amount), "description": "Item", "type": "expense"}
+            for amount in (4, 1, 3, 2)
+        ]
+    )
+
+    response = client.get(
+        f"/api/v1/cards/{test_card_id}/analytics",
+        headers=auth_headers
+    )
+    stats = response.json()["expense"]
+    assert stats["percentiles"]["p50"] == 2.5
+    assert stats["percentiles"]["p90"] == pytest.approx(3.7)
+    assert stats["min"] == 1.0
+    assert stats["max"] == 4.0
+    assert stats["mean"] == 2.5
+
+START = datetime(2024, 1, 1)
+
+@pytest.fixture
+def card_history(test_db):
+    """A card with 100 daily expenses of 0-16; returns the amounts by day."""
+    test_db.add(User(id=1, email="a@example.com", hashed_password="x", full_name="A"))
+    test_db.add(Card(id=1, owner_id=1, card_number="1234567890123456", card_name="Card", bank_name="Bank"))
+    amounts = [float(i * 7 % 17) for i in range(100)]
+    test_db.add_all(
+        Transaction(card_id=1, amount=amount, type="expense", description="Item", date=START + timedelta(days=i))
+        for i, amount in enumerate(amounts)
+    )
+    test_db.commit()
+    return amounts
+
+def analytics_statements(db, **kwargs):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        result = get_card_analytics(db, 1, **kwargs)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return result, statements
+
+def is_walk(statement):
+    return statement.startswith("SELECT transactions.amount \nFROM") and "OFFSET" in statement
+
+def numpy_percentile(values, q):
+    values = sorted(values)
+    position = (len(values) - 1) * q / 100
+    rank = int(position)
+    high = values[min(rank + 1, len(values) - 1)]
+    return values[rank] + (high - values[rank]) * (position - rank)
+
+@pytest.mark.parametrize("first, last", [(20, 80), (0, 99), (None, None)])
+def test_percentile_walks_use_the_covering_index(test_db, card_history, first, last):
+    bounds = {
+        "date_from": None if first is None else START + timedelta(days=first),
+        "date_to": None if last is None else START + timedelta(days=last),
+    }
+    stats, statements = analytics_statements(test_db, **bounds)
+    in_range = card_history if first is None else card_history[first:last + 1]
+    assert stats["expense"]["count"] == len(in_range)
+    for q in (50, 90, 95, 99):
+        assert stats["expense"]["percentiles"][f"p{q}"] == pytest.approx(numpy_percentile(in_range, q))
+
+    walks = [(statement, parameters) for statement, parameters in statements if is_walk(statement)]
+    assert walks
+    for statement, parameters in walks:
+        plan = " ".join(row[3] for row in test_db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters))
+        # Amount order straight from the covering index, date range included:
+        # no sort per percentile and no table lookups
+        assert "COVERING INDEX ix_transactions_card_id_type_amount" in plan
+        assert "TEMP B-TREE" not in plan
+
+@pytest.mark.parametrize("rank, stale_count, expected", [
+    (99, 200, (16.0, 16.0)),  # ascending walk returns only the last row
+    (120, 300, (16.0, 16.0)),  # ascending walk runs past the end
+    (160, 300, (0.0, 0.0)),  # descending walk runs past the start
+])
+def test_walks_clamp_when_rows_were_deleted(test_db, card_history, rank, stale_count, expected):
+    filters = [*_range_filters(1, None, None), Transaction.type == "expense"]
+    assert _ranked_amounts(test_db, filters, rank, stale_count) == expected
+
+def test_walks_find_nothing_when_every_row_was_deleted(test_db, card_history):
+    test_db.query(Transaction).delete()
+    test_db.commit()
+    filters = [*_range_filters(1, None, None), Transaction.type == "expense"]
+    assert _ranked_amounts(test_db, filters, 10, 100) is None
@@ -1,6 +1,9 @@
 import pytest
 from fastapi import status
 
+from app.crud.balance import rebuild_balances
+from app.models.models import CardBalance
+
 @pytest.fixture
 def auth_headers(client):
     # Create user and get token
@@ -8,7 +11,7 @@ def auth_headers(client):
         "/api/v1/users/",
         json={
             "email": "test@example.com",
-            "password": "testpassword123",
+            "password": "SecurePass123!",
             "full_name": "Test User"
         }
     )
@@ -17,7 +20,7 @@ def auth_headers(client):
         "/api/v1/token",
         data={
             "username": "test@example.com",
-            "password": "testpassword123"
+            "password": "SecurePass123!"
         }
     )
     token = response.json()["access_token"]
@@ -97,4 +100,121 @@ def test_delete_card(client, auth_headers):
     
     # Verify card is deleted
     get_response = client.get(f"/api/v1/cards/{card_id}", headers=auth_headers)
-    assert get_response.status_code == status.HTTP_404_NOT_FOUND
\ No newline at end of file
+    assert get_response.status_code == status.HTTP_404_NOT_FOUND
+
+def test_list_cards_omits_transactions(client, auth_headers):
+    create_response = client.post(
+        "/api/v1/cards/",
+        headers=auth_headers,
+        json={
+            "card_number": "1234567890123456",
+            "card_name": "Test Card",
+            "bank_name": "Test Bank"
+        }
+    )
+    card_id = create_response.json()["id"]
+    client.post(
+        f"/api/v1/cards/{card_id}/transactions/",
+        headers=auth_headers,
+        json={"amount": 10.0, "description": "Coffee", "type": "expense"}
+    )
+
+    response = client.get("/api/v1/cards/", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert "transactions" not in response.json()[0]
+
+    response = client.get(f"/api/v1/cards/{card_id}", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["transactions"]) == 1
+
+def test_card_balance(client, auth_headers, test_db):
+    create_response = client.post(
+        "/api/v1/cards/",
+        headers=auth_headers,
+        json={
+            "card_number": "1234567890123456",
+            "card_name": "Test Card",
+            "bank_name": "Test Bank"
+        }
+    )
+    card_id = create_response.json()["id"]
+    client.post(
+        f"/api/v1/cards/{card_id}/transactions/",
+        headers=auth_headers,
+        json={"amount": 1000.0, "description": "Salary", "type": "income"}
+    )
+    coffee = client.post(
+        f"/api/v1/cards/{card_id}/transactions/",
+        headers=auth_headers,
+        json={"amount": 5.0, "description": "Coffee", "type": "expense"}
+    ).json()
+    client.post(
+        f"/api/v1/cards/{card_id}/transactions/bulk",
+        headers=auth_headers,
+        json=[
+            {"amount": 20.0, "description": "Lunch", "type": "expense"},
+            {"amount": 30.0, "description": "Dinner", "type": "expense"}
+        ]
+    )
+    client.delete(f"/api/v1/transactions/{coffee['id']}", headers=auth_headers)
+
+    response = client.get(f"/api/v1/cards/{card_id}/balance", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["income_total"] == 1000.0
+    assert data["expense_total"] == 50.0
+    assert data["net"] == 950.0
+    assert data["transaction_count"] == 3
+    assert data["last_transaction_date"] is not None
+
+    response = client.get(
+        "/api/v1/cards/",
+        headers=auth_headers,
+        params={"include_balance": True}
+    )
+    assert response.json()[0]["balance"]["net"] == 950.0
+
+def test_rebuild_balances_repairs_drift(client, auth_headers, test_db):
+    create_response = client.post(
+        "/api/v1/cards/",
+        headers=auth_headers,
+        json={
+            "card_number": "1234567890123456",
+            "card_name": "Test Card",
+            "bank_name": "Test Bank"
+        }
+    )
+    card_id = create_response.json()["id"]
+    client.post(
+        f"/api/v1/cards/{card_id}/transactions/",
+        headers=auth_headers,
+        json={"amount": 100.0, "description": "Refund", "type": "income"}
+    )
+    test_db.query(CardBalance).update({CardBalance.income_total: 0.0})
+    test_db.commit()
+
+    assert rebuild_balances(test_db) == 1
+    test_db.commit()
+
+    response = client.get(f"/api/v1/cards/{card_id}/balance", headers=auth_headers)
+    assert response.json()["income_total"] == 100.0
+
+def test_offset_pagination(client, auth_headers):
+    for i in range(5):
+        client.post(
+            "/api/v1/cards/",
+            headers=auth_headers,
+            json={
+                "card_number": f"123456789012345{i}",
+                "card_name": f"Card {i}",
+                "bank_name": "Test Bank"
+            }
+        )
+
+    pages = [
+        client.get("/api/v1/cards/", headers=auth_headers, params={"skip": skip, "limit": 2})
+        for skip in (0, 2, 4)
+    ]
+    assert all(page.status_code == status.HTTP_200_OK for page in pages)
+    names = [card["card_name"] for page in pages for card in page.json()]
+    assert names == [f"Card {i}" for i in range(5)]
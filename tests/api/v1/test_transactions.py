@@ -1,3 +1,4 @@
+import json
 import pytest
 from fastapi import status
 
@@ -8,7 +9,7 @@ def auth_headers(client):
         "/api/v1/users/",
         json={
             "email": "test@example.com",
-            "password": "testpassword123",
+            "password": "SecurePass123!",
             "full_name": "Test User"
         }
     )
@@ -17,7 +18,7 @@ def auth_headers(client):
         "/api/v1/token",
         data={
             "username": "test@example.com",
-            "password": "testpassword123"
+            "password": "SecurePass123!"
         }
     )
     token = response.json()["access_token"]
@@ -113,4 +114,221 @@ def test_create_transaction_invalid_card(client, auth_headers):
             "type": "income"
         }
     )
-    assert response.status_code == status.HTTP_404_NOT_FOUND
\ No newline at end of file
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+def test_cursor_pagination(client, auth_headers, test_card_id):
+    for i in range(5):
+        client.post(
+            f"/api/v1/cards/{test_card_id}/transactions/",
+            headers=auth_headers,
+            json={
+                "amount": float(i),
+                "description": f"Transaction {i}",
+                "type": "expense"
+            }
+        )
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(
+            f"/api/v1/cards/{test_card_id}/transactions/",
+            headers=auth_headers,
+            params=params
+        )
+        assert response.status_code == status.HTTP_200_OK
+        seen.extend(item["id"] for item in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert len(seen) == 5
+    assert seen == sorted(seen, reverse=True)
+
+def test_offset_pagination(client, auth_headers, test_card_id):
+    for i in range(5):
+        client.post(
+            f"/api/v1/cards/{test_card_id}/transactions/",
+            headers=auth_headers,
+            json={
+                "amount": float(i),
+                "description": f"Transaction {i}",
+                "type": "expense"
+            }
+        )
+
+    pages = [
+        client.get(
+            f"/api/v1/cards/{test_card_id}/transactions/",
+            headers=auth_headers,
+            params={"skip": skip, "limit": 2}
+        )
+        for skip in (0, 2, 4)
+    ]
+    assert all(page.status_code == status.HTTP_200_OK for page in pages)
+    seen = [item["id"] for page in pages for item in page.json()]
+    assert len(seen) == 5
+    assert seen == sorted(seen, reverse=True)
+
+def test_invalid_cursor(client, auth_headers, test_card_id):
+    response = client.get(
+        f"/api/v1/cards/{test_card_id}/transactions/",
+        headers=auth_headers,
+        params={"cursor": "not-a-cursor"}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_bulk_create_transactions(client, auth_headers, test_card_id):
+    response = client.post(
+        f"/api/v1/cards/{test_card_id}/transactions/bulk",
+        headers=auth_headers,
+        json=[
+            {"amount": 10.0, "description": "Coffee", "type": "expense"},
+            {"amount": "not-a-number", "description": "Broken", "type": "expense"},
+            {"amount": 2500.0, "description": "Salary", "type": "income"}
+        ]
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["created"] == 2
+    assert data["failed"] == 1
+    assert [row["status"] for row in data["results"]] == ["created", "invalid", "created"]
+    assert data["results"][0]["id"] is not None
+
+    listing = client.get(
+        f"/api/v1/cards/{test_card_id}/transactions/",
+        headers=auth_headers
+    )
+    assert len(listing.json()) == 2
+
+def test_bulk_create_transactions_ndjson(client, auth_headers, test_card_id):
+    body = "\n".join([
+        '{"amount": 10.0, "description": "Coffee", "type": "expense"}',
+        '{not json',
+        '{"amount": 20.0, "description": "Lunch", "type": "expense"}',
+    ])
+    response = client.post(
+        f"/api/v1/cards/{test_card_id}/transactions/bulk",
+        headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+        data=body
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["created"] == 2
+    assert data["results"][1]["errors"] == ["Invalid JSON"]
+
+def test_export_transactions(client, auth_headers, test_card_id):
+    for i in range(3):
+        client.post(
+            f"/api/v1/cards/{test_card_id}/transactions/",
+            headers=auth_headers,
+            json={
+                "amount": float(i),
+                "description": f"Transaction {i}",
+                "type": "expense"
+            }
+        )
+
+    response = client.get(
+        f"/api/v1/cards/{test_card_id}/transactions/export",
+        headers=auth_headers,
+        params={"format": "csv"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.strip().splitlines()
+    assert lines[0] == "id,date,type,amount,description"
+    assert len(lines) == 4
+
+    response = client.get(
+        f"/api/v1/cards/{test_card_id}/transactions/export",
+        headers=auth_headers,
+        params={"format": "ndjson"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["description"] for row in rows] == [f"Transaction {i}" for i in range(3)]
+
+def test_filter_transactions(client, auth_headers, test_card_id):
+    client.post(
+        f"/api/v1/cards/{test_card_id}/transactions/bulk",
+        headers=auth_headers,
+        json=[
+            {"amount": 5.0, "description": "Coffee", "type": "expense"},
+            {"amount": 50.0, "description": "Groceries", "type": "expense"},
+            {"amount": 500.0, "description": "Rent", "type": "expense"},
+            {"amount": 2000.0, "description": "Salary", "type": "income"}
+        ]
+    )
+
+    response = client.get(
+        f"/api/v1/cards/{test_card_id}/transactions/",
+        headers=auth_headers,
+        params={"type": "expense", "min_amount": 10, "max_amount": 500}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert sorted(item["description"] for item in response.json()) == ["Groceries", "Rent"]
+
+    response = client.get(
+        f"/api/v1/cards/{test_card_id}/transactions/",
+        headers=auth_headers,
+        params={"date_to": "2000-01-01T00:00:00"}
+    )
+    assert response.json() == []
+
+def test_search_transactions(client, auth_headers, test_card_id):
+    client.post(
+        f"/api/v1/cards/{test_card_id}/transactions/bulk",
+        headers=auth_headers,
+        json=[
+            {"amount": 25.0, "description": "Amazon Marketplace order", "type": "expense"},
+            {"amount": 12.0, "description": "AMAZON Prime", "type": "expense"},
+            {"amount": 4.0, "description": "Coffee shop", "type": "expense"}
+        ]
+    )
+
+    response = client.get(
+        "/api/v1/transactions/search",
+        headers=auth_headers,
+        params={"q": "amaz"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    descriptions = {item["description"] for item in response.json()}
+    assert descriptions == {"Amazon Marketplace order", "AMAZON Prime"}
+
+    response = client.get(
+        "/api/v1/transactions/search",
+        headers=auth_headers,
+        params={"q": "amazon prime"}
+    )
+    assert [item["description"] for item in response.json()] == ["AMAZON Prime"]
+
+def test_search_is_scoped_to_own_cards(client, auth_headers, test_card_id):
+    client.post(
+        f"/api/v1/cards/{test_card_id}/transactions/",
+        headers=auth_headers,
+        json={"amount": 25.0, "description": "Amazon order", "type": "expense"}
+    )
+    client.post(
+        "/api/v1/users/",
+        json={
+            "email": "other@example.com",
+            "password": "SecurePass123!",
+            "full_name": "Other User"
+        }
+    )
+    token = client.post(
+        "/api/v1/token",
+        data={"username": "other@example.com", "password": "SecurePass123!"}
+    ).json()["access_token"]
+
+    response = client.get(
+        "/api/v1/transactions/search",
+        headers={"Authorization": f"Bearer {token}"},
+        params={"q": "amazon"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == []
@@ -7,9 +7,11 @@ import asyncio
 import logging
 from typing import Generator
 
-from src.main import app
-from src.app.database.database import get_db, Base
-from src.app.models.models import User
+from main import app
+from app.database.database import get_db, Base
+from app.models.models import User
+from app.core.principal_cache import principal_cache
+from app.core.rate_limit import rate_limiter
 
 SQLALCHEMY_DATABASE_URL = "sqlite://"
 
@@ -53,6 +55,9 @@ def test_db():
     # Cleanup
     Base.metadata.drop_all(bind=engine)
     db.close()
+    principal_cache.clear()
+    # Also clears the login lockouts, which share the backend
+    rate_limiter.clear()
 
 @pytest.fixture(scope="function")
 def client(test_db):
@@ -0,0 +1,161 @@
+import gzip
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app.core.audit import AuditWriter, index_path, query_audit_log, read_index, segment_paths
+from app.core.event_store import to_timestamp
+
+START = datetime(2024, 1, 1)
+
+def event_at(minutes):
+    return {"timestamp": (START + timedelta(minutes=minutes)).isoformat(), "n": minutes}
+
+def at(minutes):
+    return to_timestamp(START + timedelta(minutes=minutes))
+
+def read_events(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def test_events_are_batched_into_the_log(tmp_path):
+    writer = AuditWriter(tmp_path / "audit.log", flush_interval=0.05)
+    for i in range(20):
+        assert writer.write({"n": i})
+    assert writer.flush(timeout=5)
+
+    assert [event["n"] for event in read_events(tmp_path / "audit.log")] == list(range(20))
+    stats = writer.get_stats()
+    assert stats["written"] == 20
+    assert stats["batches"] < 20
+    writer.shutdown()
+
+def test_rotates_by_size(tmp_path):
+    path = tmp_path / "audit.log"
+    writer = AuditWriter(path, batch_max=1, max_bytes=100, rotate_seconds=0, compress="none")
+    for i in range(10):
+        writer.write({"n": i, "padding": "x" * 20})
+    writer.shutdown()
+
+    segments = segment_paths(path)
+    assert segments
+    assert all(segment.stat().st_size <= 100 for segment in segments)
+    events = [event["n"] for segment in [*segments, path] for event in read_events(segment)]
+    assert events == list(range(10))
+    assert writer.get_stats()["rotations"] == len(segments)
+
+def test_rotates_by_age(tmp_path):
+    path = tmp_path / "audit.log"
+    writer = AuditWriter(path, rotate_seconds=0.01, fsync="never")
+    writer.write({"n": 0})
+    writer.flush(timeout=5)
+    threading.Event().wait(0.05)
+    writer.write({"n": 1})
+    writer.shutdown()
+
+    assert len(segment_paths(path)) == 1
+    assert read_events(path) == [{"n": 1}]
+
+def test_full_queue_drops_and_counts(tmp_path):
+    writer = AuditWriter(tmp_path / "audit.log", max_queue=2, flush_interval=0)
+    release = threading.Event()
+    # Hold the writer thread up so the queue fills
+    writer._append = lambda events, append=writer._append: (release.wait(5), append(events))
+    writer.write({"n": 0})
+    while writer.get_stats()["queued"]:
+        threading.Event().wait(0.001)
+
+    results = [writer.write({"n": i}) for i in range(1, 5)]
+    assert results == [True, True, False, False]
+    assert writer.get_stats()["dropped"] == 2
+    release.set()
+    writer.shutdown()
+    assert [event["n"] for event in read_events(tmp_path / "audit.log")] == [0, 1, 2]
+
+def test_flush_times_out_when_the_queue_is_full(tmp_path):
+    writer = AuditWriter(tmp_path / "audit.log", max_queue=1, flush_interval=0, block_seconds=0)
+    release = threading.Event()
+    writer._append = lambda events, append=writer._append: (release.wait(5), append(events))
+    writer.write({"n": 0})
+    while writer.get_stats()["queued"]:
+        threading.Event().wait(0.001)
+    assert writer.write({"n": 1})
+
+    started = time.monotonic()
+    assert not writer.flush(timeout=0.05)
+    assert time.monotonic() - started < 1
+    release.set()
+    assert writer.flush(timeout=5)
+    writer.shutdown()
+
+def test_sync_errors_do_not_stop_the_writer(tmp_path, monkeypatch):
+    writer = AuditWriter(tmp_path / "audit.log", flush_interval=0)
+    writer.write({"n": 0})
+
+    def failing_fsync(fd):
+        raise OSError("disk gone")
+    monkeypatch.setattr("app.core.audit.os.fsync", failing_fsync)
+    assert writer.flush(timeout=5)
+    monkeypatch.undo()
+
+    writer.write({"n": 1})
+    assert writer.flush(timeout=5)
+    assert [event["n"] for event in read_events(tmp_path / "audit.log")] == [0, 1]
+    writer.shutdown()
+
+def test_query_reads_only_overlapping_blocks(tmp_path, caplog):
+    path = tmp_path / "audit.log"
+    writer = AuditWriter(path, rotate_seconds=0, index_block_seconds=3600, compress="none")
+    # Ten days, one event every ten minutes
+    for minutes in range(0, 10 * 24 * 60, 10):
+        writer.write(event_at(minutes))
+    writer.shutdown()
+
+    records = read_index(path)
+    assert len(records) == 10 * 24
+    # Garble the first day; a query for day five must not read it
+    data = bytearray(path.read_bytes())
+    first_day = records[23][2] + records[23][3]
+    data[:first_day] = bytes(b if b == ord("\n") else ord("x") for b in data[:first_day])
+    path.write_bytes(bytes(data))
+
+    with caplog.at_level(logging.ERROR):
+        entries = query_audit_log(at(5 * 24 * 60), at(5 * 24 * 60 + 60), path)
+    assert [entry["n"] for entry in entries] == list(range(5 * 24 * 60, 5 * 24 * 60 + 61, 10))
+    assert not caplog.records
+
+def test_compressed_segments_stay_queryable(tmp_path):
+    path = tmp_path / "audit.log"
+    writer = AuditWriter(path, batch_max=10, max_bytes=1000, rotate_seconds=0, index_block_seconds=30)
+    for minutes in range(0, 600, 5):
+        writer.write(event_at(minutes))
+    writer.shutdown()
+
+    segments = segment_paths(path)
+    assert len(segments) > 2
+    assert all(segment.name.endswith(".gz") and index_path(segment).exists() for segment in segments)
+    assert not list(tmp_path.glob("*.tmp"))
+    # Archives are ordinary gzip files
+    lines = [json.loads(line) for segment in segments for line in gzip.decompress(segment.read_bytes()).splitlines()]
+    lines += read_events(path)
+    assert [entry["n"] for entry in lines] == list(range(0, 600, 5))
+
+    entries = query_audit_log(at(100), at(400), path)
+    assert [entry["n"] for entry in entries] == list(range(100, 401, 5))
+
+def test_unindexed_tail_is_indexed_on_reopen(tmp_path):
+    path = tmp_path / "audit.log"
+    writer = AuditWriter(path, rotate_seconds=0, index_block_seconds=30, compress="none")
+    for minutes in range(0, 120, 10):
+        writer.write(event_at(minutes))
+    writer.shutdown()
+    # Lose the last index entry, as after a crash
+    index_path(path).write_bytes(index_path(path).read_bytes()[:-10])
+
+    writer = AuditWriter(path, rotate_seconds=0, index_block_seconds=30, compress="none")
+    writer.write(event_at(120))
+    writer.shutdown()
+    records = read_index(path)
+    assert records[-1][2] + records[-1][3] == path.stat().st_size
+    assert [entry["n"] for entry in query_audit_log(at(0), at(200), path)] == list(range(0, 121, 10))
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.event_store import EventStore, to_timestamp
+
+def test_time_range_query_is_inclusive():
+    store = EventStore(10)
+    for i in range(5):
+        store.append(i, timestamp=100 + i)
+    assert store.query(101, 103) == [1, 2, 3]
+    assert store.query(200, 300) == []
+    assert store.query(0, 1000) == [0, 1, 2, 3, 4]
+
+def test_oldest_events_are_overwritten():
+    store = EventStore(3)
+    for i in range(10):
+        store.append(i, timestamp=i)
+    assert len(store) == 3
+    assert list(store) == [7, 8, 9]
+    assert store.query(0, 100) == [7, 8, 9]
+
+def test_indexed_queries_survive_eviction():
+    store = EventStore(4, ("ip", "type"))
+    for i in range(200):
+        store.append(i, timestamp=i, ip=f"10.0.0.{i % 2}", type="login" if i % 3 else "scan")
+    assert store.query(0, 1000, ip="10.0.0.0") == [196, 198]
+    assert store.query(0, 1000, ip="10.0.0.1", type="login") == [197, 199]
+    assert store.query(0, 1000, type="scan") == [198]
+    assert store.query(0, 1000, ip="10.0.0.9") == []
+    # Index entries for evicted values are dropped
+    assert set(store._indexes["ip"]) == {"10.0.0.0", "10.0.0.1"}
+
+def test_unindexed_filter_is_rejected():
+    store = EventStore(4, ("ip",))
+    store.append("a", timestamp=1, ip="x")
+    with pytest.raises(ValueError):
+        store.query(0, 10, user="bob")
+
+def test_timestamps_never_go_backwards():
+    store = EventStore(5)
+    store.append("late", timestamp=10)
+    store.append("skewed", timestamp=5)
+    assert store.query(10, 10) == ["late", "skewed"]
+
+def test_to_timestamp_reads_naive_datetimes_as_utc():
+    moment = datetime(2024, 1, 1, 12, 0, 0)
+    assert to_timestamp(moment) == moment.replace(tzinfo=timezone.utc).timestamp()
+    assert to_timestamp(moment + timedelta(seconds=1)) - to_timestamp(moment) == 1
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException, status
+
+from app.core.hashing import HashingExecutor
+from app.core.security import get_password_hash, verify_password
+
+def test_hash_and_verify_roundtrip():
+    hashed = get_password_hash("SecurePass123!")
+    assert hashed != "SecurePass123!"
+    assert verify_password("SecurePass123!", hashed)
+    assert not verify_password("WrongPass123!", hashed)
+
+def test_executor_sheds_load_when_queue_is_full():
+    executor = HashingExecutor(kind="thread", workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        blocked = executor.submit(release.wait)
+        with pytest.raises(HTTPException) as exc_info:
+            executor.submit(release.wait)
+        assert exc_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        release.set()
+        blocked.result(timeout=5)
+    finally:
+        release.set()
+        executor.shutdown()
+
+    stats = executor.get_stats()
+    assert stats["calls"] == 1
+    assert stats["rejected"] == 1
+    assert stats["pending"] == 0
+
+def test_run_returns_result():
+    executor = HashingExecutor(kind="thread", workers=2, max_queue=4)
+    try:
+        assert executor.run(sum, [1, 2, 3]) == 6
+    finally:
+        executor.shutdown()
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_timeout_is_reported_as_busy(asynchronous):
+    executor = HashingExecutor(kind="thread", workers=1, max_queue=1, timeout=0.05)
+    release = threading.Event()
+    try:
+        with pytest.raises(HTTPException) as exc_info:
+            if asynchronous:
+                loop = asyncio.new_event_loop()
+                try:
+                    loop.run_until_complete(executor.run_async(release.wait))
+                finally:
+                    loop.close()
+            else:
+                executor.run(release.wait)
+        assert exc_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert exc_info.value.headers == {"Retry-After": "1"}
+    finally:
+        release.set()
+        executor.shutdown()
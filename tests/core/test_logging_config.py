@@ -0,0 +1,52 @@
+import json
+import logging
+import queue
+
+from app.core.logging_config import JSONFormatter, LogPipeline, SheddingQueueHandler, correlation_id
+
+def make_record(level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord("test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+def test_json_formatter_includes_extra_fields():
+    entry = json.loads(JSONFormatter().format(make_record(security=True, correlation_id="req-1")))
+    assert entry["message"] == "hello world"
+    assert entry["level"] == "INFO"
+    assert entry["security"] is True
+    assert entry["correlation_id"] == "req-1"
+    assert entry["timestamp"].endswith("Z")
+
+def test_low_severity_records_are_shed_under_load():
+    handler = SheddingQueueHandler(queue.SimpleQueue(), max_queue=4, shed_threshold=0.5, sample_rate=0.0)
+    for _ in range(4):
+        handler.handle(make_record())
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == {"shed": 2, "full": 0}
+
+    # Warnings are still queued until the queue is full
+    for _ in range(3):
+        handler.handle(make_record(level=logging.WARNING))
+    assert handler.queue.qsize() == 4
+    assert handler.dropped == {"shed": 2, "full": 1}
+
+def test_pipeline_writes_json_lines_with_correlation_id(tmp_path):
+    log_file = tmp_path / "app.log"
+    logger = logging.getLogger("test_pipeline")
+    logger.propagate = False
+    pipeline = LogPipeline(filename=str(log_file))
+    pipeline.configure(logger)
+    token = correlation_id.set("req-42")
+    try:
+        logger.info("user %s logged in", "bob", extra={"security": True})
+    finally:
+        correlation_id.reset(token)
+    logger.debug("filtered out")
+    pipeline.shutdown()
+
+    entries = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert len(entries) == 1
+    assert entries[0]["message"] == "user bob logged in"
+    assert entries[0]["correlation_id"] == "req-42"
+    assert entries[0]["security"] is True
+    assert pipeline.get_stats() == {"configured": False}
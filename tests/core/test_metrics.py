@@ -0,0 +1,49 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+from app.core.metrics import MetricsMiddleware, render_metrics
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def make_client(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'metrics.db'}")
+    app = FastAPI()
+
+    @app.get("/metrics-test/items/{item_id}")
+    def read_item(item_id: int):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+        return {"id": item_id}
+
+    app.add_middleware(MetricsMiddleware)
+    return TestClient(app)
+
+def test_requests_are_labelled_by_route_template(tmp_path):
+    client = make_client(tmp_path)
+    route = "/metrics-test/items/{item_id}"
+    before = _sample("http_requests_total", method="GET", route=route, status="200")
+
+    assert client.get("/metrics-test/items/1").status_code == 200
+    assert client.get("/metrics-test/items/2").status_code == 200
+
+    assert _sample("http_requests_total", method="GET", route=route, status="200") == before + 2
+    assert _sample("http_request_latency_seconds_count", method="GET", route=route) >= 2
+    assert _sample("db_queries_per_request_sum", route=route) >= 4
+
+def test_unknown_paths_and_methods_share_one_series(tmp_path):
+    client = make_client(tmp_path)
+    before = _sample("http_requests_total", method="OTHER", route="unmatched", status="404")
+
+    client.request("BREW", "/no/such/path/1")
+    client.request("PROPFIND", "/no/such/path/2")
+
+    assert _sample("http_requests_total", method="OTHER", route="unmatched", status="404") == before + 2
+
+def test_render_metrics_uses_the_prometheus_text_format():
+    body, content_type = render_metrics()
+    assert content_type.startswith("text/plain")
+    assert b"# TYPE http_requests_total counter" in body
@@ -0,0 +1,108 @@
+import asyncio
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse, StreamingResponse
+
+from app.core.logging_config import correlation_id
+from app.core.middleware import (
+    SECURITY_HEADERS,
+    CorrelationIdMiddleware,
+    ProcessTimeMiddleware,
+    RequestSizeMiddleware,
+    SecurityHeadersMiddleware,
+)
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/hello")
+    def hello():
+        return PlainTextResponse("hello", headers={"X-Frame-Options": "SAMEORIGIN"})
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b"a", b"b", b"c"]))
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {"size": len(await request.body())}
+
+    app.add_middleware(RequestSizeMiddleware, max_size=10)
+    app.add_middleware(SecurityHeadersMiddleware)
+    app.add_middleware(ProcessTimeMiddleware)
+    return app
+
+def call(app, body_chunks, headers=()):
+    """Drive ``app`` over raw ASGI; returns (status, headers, body)."""
+    chunks = list(body_chunks)
+    sent = []
+
+    async def receive():
+        if chunks:
+            return {"type": "http.request", "body": chunks.pop(0), "more_body": bool(chunks)}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": "POST", "path": "/echo", "raw_path": b"/echo", "query_string": b"",
+        "headers": list(headers), "scheme": "http", "server": ("test", 80), "client": ("1.2.3.4", 1),
+        "root_path": "", "http_version": "1.1",
+    }
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(app(scope, receive, send))
+    finally:
+        loop.close()
+    start = sent[0]
+    body = b"".join(message.get("body", b"") for message in sent[1:])
+    return start["status"], dict(start["headers"]), body
+
+def test_security_headers_replace_app_values():
+    response = TestClient(make_app()).get("/hello")
+    for name, value in SECURITY_HEADERS.items():
+        assert response.headers[name] == value
+    assert response.raw.headers.getlist("X-Frame-Options") == ["DENY"]
+    assert float(response.headers["X-Process-Time"]) >= 0
+
+def test_streaming_responses_pass_through():
+    response = TestClient(make_app()).get("/stream")
+    assert response.content == b"abc"
+    assert response.headers["X-Content-Type-Options"] == "nosniff"
+
+def test_declared_content_length_over_limit_is_rejected():
+    status, _, body = call(make_app(), [b"0123456789ab"], headers=[(b"content-length", b"12")])
+    assert status == 413
+    assert body == b'{"detail":"Request too large"}'
+
+def test_streamed_body_over_limit_is_rejected():
+    status, headers, body = call(make_app(), [b"012345", b"6789ab"])
+    assert status == 413
+    assert body == b'{"detail":"Request too large"}'
+    assert headers[b"x-frame-options"] == b"DENY"
+
+def test_body_within_limit_is_accepted():
+    status, _, body = call(make_app(), [b"01234", b"56789"])
+    assert status == 200
+    assert body == b'{"size":10}'
+
+def test_correlation_id_reaches_sync_endpoints_and_response():
+    app = FastAPI()
+
+    @app.get("/id")
+    def current_id():
+        return {"id": correlation_id.get()}
+
+    app.add_middleware(CorrelationIdMiddleware)
+    client = TestClient(app)
+
+    response = client.get("/id", headers={"X-Request-ID": "abc-123"})
+    assert response.json() == {"id": "abc-123"}
+    assert response.headers["x-request-id"] == "abc-123"
+
+    # Missing or malformed IDs are replaced
+    response = client.get("/id", headers={"X-Request-ID": "bad id\t"})
+    assert response.json()["id"] == response.headers["x-request-id"] != "bad id\t"
+    assert correlation_id.get() is None
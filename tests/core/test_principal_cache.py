@@ -0,0 +1,48 @@
+import time
+
+from app.core.principal_cache import Principal, PrincipalCache
+
+def make_principal(user_id: int) -> Principal:
+    return Principal(id=user_id, email=f"user{user_id}@example.com", is_active=True)
+
+def test_hit_and_miss_counters():
+    cache = PrincipalCache(max_size=10, ttl=60)
+    assert cache.get("token-a") is None
+
+    cache.set("token-a", make_principal(1))
+    assert cache.get("token-a") == make_principal(1)
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+def test_entries_expire_at_token_exp():
+    cache = PrincipalCache(max_size=10, ttl=60)
+    cache.set("token-a", make_principal(1), exp=time.time() - 1)
+    assert cache.get("token-a") is None
+    assert cache.get_stats()["size"] == 0
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PrincipalCache(max_size=2, ttl=60)
+    cache.set("token-a", make_principal(1))
+    cache.set("token-b", make_principal(2))
+    cache.get("token-a")
+    cache.set("token-c", make_principal(3))
+
+    assert cache.get("token-a") is not None
+    assert cache.get("token-b") is None
+    assert cache.get("token-c") is not None
+    assert cache.get_stats()["evictions"] == 1
+
+def test_invalidate_user_drops_all_tokens():
+    cache = PrincipalCache(max_size=10, ttl=60)
+    cache.set("token-a", make_principal(1))
+    cache.set("token-b", make_principal(1))
+    cache.set("token-c", make_principal(2))
+
+    cache.invalidate_user(1)
+
+    assert cache.get("token-a") is None
+    assert cache.get("token-b") is None
+    assert cache.get("token-c") is not None
@@ -0,0 +1,56 @@
+import pytest
+
+from app.core.rate_limit import LockoutTracker, SlidingWindowCounter, parse_route_limits
+
+def test_limit_is_enforced_within_the_window():
+    counter = SlidingWindowCounter()
+    results = [counter.hit("ip", limit=3, window=10, now=100 + i) for i in range(5)]
+    assert [result.allowed for result in results] == [True, True, True, False, False]
+    assert [result.first_rejection for result in results] == [False, False, False, True, False]
+    assert results[3].retry_after == pytest.approx(7)
+
+def test_previous_window_slides_out():
+    counter = SlidingWindowCounter()
+    for i in range(4):
+        assert counter.hit("ip", limit=4, window=10, now=100 + i).allowed
+    # Halfway through the next window half of the previous hits still count
+    assert counter.hit("ip", limit=4, window=10, now=115).allowed
+    assert counter.hit("ip", limit=4, window=10, now=115).allowed
+    assert not counter.hit("ip", limit=4, window=10, now=115).allowed
+    # Two windows later nothing is left
+    assert counter.hit("ip", limit=1, window=10, now=131).allowed
+
+def test_idle_and_excess_keys_are_evicted():
+    counter = SlidingWindowCounter(max_keys=3)
+    counter.add("old", window=10, now=0)
+    counter.add("a", window=10, now=25)
+    assert len(counter) == 1
+
+    counter.add("b", window=10, now=26)
+    counter.add("c", window=10, now=27)
+    counter.add("d", window=10, now=28)
+    assert len(counter) == 3
+    assert counter.add("a", window=10, now=29) == 1
+
+def test_lockout_after_max_attempts():
+    tracker = LockoutTracker(SlidingWindowCounter())
+    for i in range(4):
+        assert not tracker.record_failure("ip", max_attempts=5, window=300, lockout=60, now=i)
+    assert tracker.record_failure("ip", max_attempts=5, window=300, lockout=60, now=4)
+    assert tracker.locked_for("ip", now=10) == pytest.approx(54)
+    assert tracker.locked_for("ip", now=64) == 0
+
+def test_reset_clears_failures():
+    tracker = LockoutTracker(SlidingWindowCounter())
+    for i in range(4):
+        tracker.record_failure("ip", max_attempts=5, window=300, lockout=60, now=i)
+    tracker.reset("ip")
+    assert not tracker.record_failure("ip", max_attempts=5, window=300, lockout=60, now=5)
+
+def test_parse_route_limits():
+    assert parse_route_limits("/api/v1/token=20/60, /api/v1/users/=5/1") == {
+        "/api/v1/token": (20, 60.0),
+        "/api/v1/users/": (5, 1.0),
+    }
+    with pytest.raises(ValueError):
+        parse_route_limits("/api/v1/token=20")
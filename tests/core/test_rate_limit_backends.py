@@ -0,0 +1,239 @@
+import fnmatch
+import hashlib
+import multiprocessing
+import socketserver
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.middleware import RateLimitingMiddleware
+from app.core.rate_limit import BackendUnavailable, LockoutTracker, SlidingWindowCounter
+from app.core.rate_limit_backends import _HIT_SCRIPT, MmapBackend, RedisBackend, SQLiteBackend
+
+class _RedisStandIn(socketserver.ThreadingTCPServer):
+    """Just enough of a Redis server for RedisBackend, kept in memory."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _RedisHandler)
+        self.data = {}
+        self.expires = {}
+        self.scripts = set()
+        self.commands = 0
+        self.lock = threading.Lock()
+
+    def live(self, key):
+        if key in self.expires and self.expires[key] <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+class _RedisHandler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                command.append(self.rfile.read(length + 2)[:-2])
+            with self.server.lock:
+                self.server.commands += 1
+                reply = self.execute(command[0].upper().decode(), command[1:])
+            self.wfile.write(self.encode(reply))
+
+    def encode(self, reply):
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, Exception):
+            return b"-%s\r\n" % str(reply).encode()
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if isinstance(reply, list):
+            return b"*%d\r\n" % len(reply) + b"".join(self.encode(item) for item in reply)
+        if reply == "OK":
+            return b"+OK\r\n"
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+    def execute(self, name, args):
+        server = self.server
+        if name == "HINCRBY":
+            server.live(args[0])
+            fields = server.data.setdefault(args[0], {})
+            fields[args[1]] = int(fields.get(args[1], 0)) + int(args[2])
+            return fields[args[1]]
+        if name == "HGET":
+            value = server.data.get(args[0], {}).get(args[1]) if server.live(args[0]) else None
+            return None if value is None else str(value).encode()
+        if name == "HDEL":
+            return 1 if server.live(args[0]) and server.data[args[0]].pop(args[1], None) is not None else 0
+        if name == "PEXPIRE":
+            if not server.live(args[0]):
+                return 0
+            server.expires[args[0]] = time.time() + int(args[1]) / 1000
+            return 1
+        if name == "PTTL":
+            if not server.live(args[0]):
+                return -2
+            return int((server.expires[args[0]] - time.time()) * 1000) if args[0] in server.expires else -1
+        if name == "SET":
+            options = [arg.upper() for arg in args[2:]]
+            if b"NX" in options and server.live(args[0]):
+                return None
+            server.data[args[0]] = args[1]
+            server.expires.pop(args[0], None)
+            if b"PX" in options:
+                server.expires[args[0]] = time.time() + int(args[2 + options.index(b"PX") + 1]) / 1000
+            return "OK"
+        if name == "DEL":
+            deleted = [key for key in args if server.live(key)]
+            for key in deleted:
+                del server.data[key]
+                server.expires.pop(key, None)
+            return len(deleted)
+        if name in ("EVAL", "EVALSHA"):
+            if name == "EVAL":
+                assert args[0].decode() == _HIT_SCRIPT
+                server.scripts.add(hashlib.sha1(args[0]).hexdigest())
+            elif args[0].decode() not in server.scripts:
+                return Exception("NOSCRIPT No matching script")
+            keys = args[2:2 + int(args[1])]
+            return self.hit_script(keys, args[2 + int(args[1]):])
+        if name == "SCAN":
+            pattern = args[args.index(b"MATCH") + 1].decode()
+            keys = [key for key in list(server.data) if server.live(key) and fnmatch.fnmatch(key.decode(), pattern)]
+            return [b"0", keys]
+        raise AssertionError(f"Unexpected command {name}")
+
+    def hit_script(self, keys, args):
+        """What _HIT_SCRIPT does, step by step."""
+        counts, blocked = keys
+        index, previous_index, old_index, weight, limit, ttl, blocked_ttl = args
+        current = int(self.execute("HGET", [counts, index]) or 0)
+        previous = int(self.execute("HGET", [counts, previous_index]) or 0)
+        self.execute("HDEL", [counts, old_index])
+        if previous * float(weight) + current + 1 <= int(limit):
+            current = self.execute("HINCRBY", [counts, index, b"1"])
+            self.execute("PEXPIRE", [counts, ttl])
+            return [1, current, previous, 0]
+        first = self.execute("SET", [blocked, b"1", b"NX", b"PX", blocked_ttl])
+        return [0, current, previous, 0 if first is None else 1]
+
+@pytest.fixture
+def redis_server():
+    server = _RedisStandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def redis_url(redis_server):
+    return f"redis://127.0.0.1:{redis_server.server_address[1]}/0"
+
+@pytest.fixture(params=["memory", "mmap", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        backend = SlidingWindowCounter()
+    elif request.param == "mmap":
+        backend = MmapBackend(str(tmp_path / "limits.bin"), slots=1024)
+    elif request.param == "sqlite":
+        backend = SQLiteBackend(str(tmp_path / "limits.db"))
+    else:
+        backend = RedisBackend(request.getfixturevalue("redis_url"))
+    yield backend
+    backend.clear()
+    backend.close()
+
+def test_limit_and_first_rejection(backend):
+    now = time.time()
+    results = [backend.hit("client", limit=3, window=60, now=now) for _ in range(5)]
+    assert [result.allowed for result in results] == [True, True, True, False, False]
+    assert [result.first_rejection for result in results] == [False, False, False, True, False]
+    assert 0 < results[3].retry_after <= 60
+
+def test_keys_are_independent_and_resettable(backend):
+    now = time.time()
+    assert backend.hit("a", limit=1, window=60, now=now).allowed
+    assert not backend.hit("a", limit=1, window=60, now=now).allowed
+    assert backend.hit("b", limit=1, window=60, now=now).allowed
+    backend.reset("a")
+    assert backend.hit("a", limit=1, window=60, now=now).allowed
+
+def test_lockout(backend):
+    tracker = LockoutTracker(backend)
+    for _ in range(2):
+        assert not tracker.record_failure("ip", max_attempts=3, window=60, lockout=30)
+    assert tracker.record_failure("ip", max_attempts=3, window=60, lockout=30)
+    assert 25 < tracker.locked_for("ip") <= 30
+    tracker.reset("ip")
+    assert tracker.locked_for("ip") == 0
+
+def _hammer(backend_class, path, hits, allowed):
+    backend = backend_class(path)
+    allowed.put(sum(backend.hit("shared", limit=150, window=60).allowed for _ in range(hits)))
+
+@pytest.mark.parametrize("backend_class, filename", [(MmapBackend, "limits.bin"), (SQLiteBackend, "limits.db")])
+def test_limit_is_global_across_processes(backend_class, filename, tmp_path):
+    path = str(tmp_path / filename)
+    backend_class(path).clear()
+    context = multiprocessing.get_context("fork")
+    allowed = context.Queue()
+    workers = [context.Process(target=_hammer, args=(backend_class, path, 100, allowed)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    total = sum(allowed.get(timeout=30) for _ in workers)
+    for worker in workers:
+        worker.join()
+    assert total == 150
+
+def test_redis_hit_is_one_round_trip(redis_server, redis_url):
+    backend = RedisBackend(redis_url)
+    now = time.time()
+    # The first call finds the script uncached and sends it
+    assert backend.hit("client", limit=1, window=60, now=now).allowed
+    commands = redis_server.commands
+    assert not backend.hit("client", limit=1, window=60, now=now).allowed
+    assert redis_server.commands == commands + 1
+    backend.close()
+
+# Nothing listens on port 1, so connecting fails straight away
+UNREACHABLE_REDIS = "redis://127.0.0.1:1/0"
+
+def test_unreachable_redis_is_not_retried_until_the_interval_passes(monkeypatch):
+    backend = RedisBackend(UNREACHABLE_REDIS, retry_seconds=60)
+    with pytest.raises(BackendUnavailable):
+        backend.hit("client", limit=1, window=60)
+    monkeypatch.setattr(backend, "_connection", lambda: pytest.fail("reconnected"))
+    with pytest.raises(BackendUnavailable):
+        backend.hit("client", limit=1, window=60)
+
+def test_sqlite_errors_make_the_backend_unavailable(tmp_path):
+    # A directory cannot be opened as a database file
+    backend = SQLiteBackend(str(tmp_path))
+    with pytest.raises(BackendUnavailable):
+        backend.hit("client", limit=1, window=60)
+    with pytest.raises(BackendUnavailable):
+        backend.locked_for("client")
+
+@pytest.mark.parametrize("failure_mode, status_code", [("open", 200), ("closed", 503)])
+@pytest.mark.parametrize("unavailable", ["redis", "sqlite"])
+def test_middleware_failure_mode(failure_mode, status_code, unavailable, tmp_path):
+    app = FastAPI()
+    app.get("/")(lambda: {"ok": True})
+    app.add_middleware(
+        RateLimitingMiddleware,
+        route_limits={},
+        limiter=RedisBackend(UNREACHABLE_REDIS) if unavailable == "redis" else SQLiteBackend(str(tmp_path)),
+        failure_mode=failure_mode
+    )
+    assert TestClient(app).get("/").status_code == status_code
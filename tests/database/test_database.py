@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.crud import user as user_crud
+from app.database import sqlite
+from app.database.database import _async_database_url, init_db, run_db
+from app.models.models import User
+
+def test_init_db_adds_missing_indexes_to_existing_tables():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    # Tables as created by an older release, without the composite indexes
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE transactions (id INTEGER PRIMARY KEY, amount FLOAT, "
+            "description VARCHAR, date DATETIME, type VARCHAR, card_id INTEGER)"
+        ))
+
+    init_db(bind=engine)
+
+    index_names = {index["name"] for index in inspect(engine).get_indexes("transactions")}
+    assert "ix_transactions_card_id_date_id" in index_names
+    assert "ix_transactions_card_id_type_amount" in index_names
+    assert "card_balances" in inspect(engine).get_table_names()
+
+
+def test_async_database_url_maps_drivers():
+    assert _async_database_url("sqlite:///./budget.db") == "sqlite+aiosqlite:///./budget.db"
+    assert _async_database_url("postgresql://u:p@db/budget") == "postgresql+asyncpg://u:p@db/budget"
+    assert _async_database_url("postgres://u:p@db/budget") == "postgresql+asyncpg://u:p@db/budget"
+
+def test_run_db_with_sync_session():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    init_db(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(email="sync@example.com", hashed_password="x"))
+    db.commit()
+
+    loop = asyncio.new_event_loop()
+    try:
+        user = loop.run_until_complete(run_db(db, user_crud.get_user_by_email, "sync@example.com"))
+    finally:
+        loop.close()
+        db.close()
+    assert user.email == "sync@example.com"
+
+def test_run_db_with_async_session(tmp_path):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    path = tmp_path / "async.db"
+    init_db(bind=create_engine(f"sqlite:///{path}"))
+
+    async def scenario():
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        try:
+            async with async_sessionmaker(async_engine, expire_on_commit=False)() as db:
+                db.add(User(email="async@example.com", hashed_password="x"))
+                await db.commit()
+                return await run_db(db, user_crud.get_user_by_email, "async@example.com")
+        finally:
+            await async_engine.dispose()
+
+    loop = asyncio.new_event_loop()
+    try:
+        user = loop.run_until_complete(scenario())
+    finally:
+        loop.close()
+    assert user.email == "async@example.com"
+
+def test_sqlite_pragmas_applied_on_connect(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+    sqlite.register(engine, {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": "2500",
+        "foreign_keys": "ON",
+        "temp_store": "",
+    })
+
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        assert connection.exec_driver_sql("PRAGMA busy_timeout").scalar() == 2500
+        assert connection.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+    assert sqlite.effective_pragmas == {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 2500,
+        "foreign_keys": "ON",
+    }
+
+def test_sqlite_pragma_values_are_validated():
+    engine = create_engine("sqlite://")
+    with pytest.raises(ValueError):
+        sqlite.register(engine, {"journal_mode": "WAL; DROP TABLE users"})
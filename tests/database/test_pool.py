@@ -0,0 +1,40 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import QueuePool
+
+from app.database.pool import instrumented_pool_class, pool_options
+
+def test_pool_records_checkouts_and_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=instrumented_pool_class(QueuePool, "test-exhausted"),
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    metrics = engine.pool.metrics
+
+    held = engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    stats = metrics.get_stats()
+    assert stats["in_use"] == 1
+    assert stats["checkouts"] == 1
+    assert stats["timeouts"] == 1
+
+    held.close()
+    engine.dispose()  # recreated pools keep reporting to the same metrics
+    with engine.connect():
+        assert metrics.get_stats()["in_use"] == 1
+    assert metrics.get_stats()["checkouts"] == 2
+    assert REGISTRY.get_sample_value("db_pool_timeouts_total", {"pool": "test-exhausted"}) == 1
+
+def test_pool_options():
+    file_options = pool_options("sqlite:///./budget.db", "test-file")
+    assert file_options["pool_pre_ping"] is False
+    assert file_options["pool_size"] == 5
+    assert issubclass(file_options["poolclass"], QueuePool)
+
+    assert pool_options("postgresql://db/budget", "test-pg")["pool_pre_ping"] is True
+    assert "poolclass" not in pool_options("sqlite://", "test-memory")
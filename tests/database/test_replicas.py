@@ -0,0 +1,49 @@
+import random
+import time
+
+from sqlalchemy import create_engine
+
+from app.database.replicas import Replica, ReplicaRouter
+
+def _replica(tmp_path, name, weight=1.0):
+    return Replica(f"sqlite:///{tmp_path / name}", weight)
+
+def test_reads_are_spread_by_weight(tmp_path):
+    heavy, light = _replica(tmp_path, "heavy.db", 3), _replica(tmp_path, "light.db", 1)
+    router = ReplicaRouter([heavy, light], health_interval=0)
+    random.seed(7)
+
+    for _ in range(400):
+        assert router.choose(user_id=1) is not None
+    assert heavy.reads + light.reads == 400
+    assert 250 < heavy.reads < 350
+
+def test_recent_writer_reads_from_primary(tmp_path):
+    router = ReplicaRouter([_replica(tmp_path, "r.db")], health_interval=0, read_your_writes=60)
+
+    router.mark_write(1)
+    assert router.choose(user_id=1) is None
+    assert router.choose(user_id=2) is not None
+    assert router.primary_reads == 1
+
+def test_read_your_writes_window_expires(tmp_path):
+    router = ReplicaRouter([_replica(tmp_path, "r.db")], health_interval=0, read_your_writes=0.01)
+
+    router.mark_write(1)
+    time.sleep(0.02)
+    assert router.choose(user_id=1) is not None
+
+def test_unreachable_replica_is_skipped(tmp_path):
+    healthy = _replica(tmp_path, "ok.db")
+    broken = Replica("sqlite:///missing/dir/replica.db", engine=create_engine(
+        f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"
+    ))
+    router = ReplicaRouter([healthy, broken], health_interval=0)
+
+    router.check_all()
+    assert healthy.healthy and not broken.healthy
+    assert all(router.choose() is healthy for _ in range(20))
+
+    healthy.mark_down("connection refused")
+    assert router.choose() is None
+    assert router.get_stats()["primary_reads"] == 1
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import create_engine, exc, func, select
+
+from app.crud import card as card_crud
+from app.crud import transaction as transaction_crud
+from app.database.database import init_db
+from app.database.writer import WriteCoordinator
+from app.models.models import CardBalance, Transaction, User
+from app.schemas.schemas import CardCreate, TransactionCreate
+
+@pytest.fixture
+def coordinator(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'writer.db'}")
+    init_db(bind=engine)
+    coordinator = WriteCoordinator(engine)
+    yield coordinator
+    coordinator.shutdown()
+    engine.dispose()
+
+def _block(coordinator, release):
+    """Occupy the writer until ``release`` is set so later writes queue up."""
+    started = threading.Event()
+
+    def wait(db):
+        started.set()
+        return release.wait(5)
+    future = coordinator.submit(wait)
+    started.wait(5)
+    return future
+
+def _create_card(db):
+    user = User(email="writer@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    card = card_crud.create_card(
+        db, CardCreate(card_number="4111111111111111", card_name="Main", bank_name="Bank"), user.id
+    )
+    return card.id
+
+def test_queued_writes_share_one_commit(coordinator):
+    card_id = coordinator.submit(_create_card).result()
+
+    release = threading.Event()
+    blocker = _block(coordinator, release)
+    futures = [
+        coordinator.submit(
+            transaction_crud.create_transaction,
+            transaction=TransactionCreate(amount=10.0, type="expense", description=f"t{i}"),
+            card_id=card_id
+        )
+        for i in range(5)
+    ]
+    release.set()
+
+    assert blocker.result() is True
+    ids = [future.result().id for future in futures]
+    assert len(set(ids)) == 5
+    stats = coordinator.get_stats()
+    assert stats["writes"] == 7
+    assert stats["batches"] == 3  # card, blocker, then the five queued inserts
+    assert stats["max_batch"] == 5
+
+    def totals(db):
+        balance = db.get(CardBalance, card_id)
+        return balance.expense_total, balance.transaction_count
+    assert coordinator.submit(totals).result() == (50.0, 5)
+
+def test_failed_write_only_discards_its_own_changes(coordinator):
+    card_id = coordinator.submit(_create_card).result()
+
+    release = threading.Event()
+    _block(coordinator, release)
+    ok = coordinator.submit(
+        transaction_crud.create_transaction,
+        transaction=TransactionCreate(amount=1.0, type="income", description="kept"),
+        card_id=card_id
+    )
+
+    def failing(db):
+        transaction_crud.create_transaction(
+            db, TransactionCreate(amount=2.0, type="income", description="lost"), card_id
+        )
+        raise RuntimeError("boom")
+    failed = coordinator.submit(failing)
+    release.set()
+
+    assert ok.result().description == "kept"
+    with pytest.raises(RuntimeError):
+        failed.result()
+    descriptions = coordinator.submit(
+        lambda db: db.scalars(select(Transaction.description)).all()
+    ).result()
+    assert descriptions == ["kept"]
+    balance = coordinator.submit(lambda db: db.get(CardBalance, card_id).income_total).result()
+    assert balance == 1.0
+    assert coordinator.submit(
+        lambda db: db.scalar(select(func.count()).select_from(Transaction))
+    ).result() == 1
+
+def test_connection_failure_fails_the_batch_and_recovers(coordinator, monkeypatch):
+    connect = coordinator.bind.connect
+    calls = []
+
+    def flaky_connect():
+        calls.append(None)
+        if len(calls) == 1:
+            raise exc.OperationalError("connect", {}, Exception("unable to open database file"))
+        return connect()
+    monkeypatch.setattr(coordinator.bind, "connect", flaky_connect)
+
+    with pytest.raises(exc.OperationalError):
+        coordinator.submit(lambda db: 1).result(timeout=5)
+    assert coordinator.submit(lambda db: 2).result(timeout=5) == 2
+    assert coordinator.get_stats()["failed"] == 1
+
+def test_dead_writer_is_restarted(coordinator):
+    assert coordinator.submit(lambda db: 1).result(timeout=5) == 1
+    thread = coordinator._thread
+    coordinator._queue.put(None)
+    thread.join(5)
+
+    assert coordinator.submit(lambda db: 2).result(timeout=5) == 2
+
+def test_run_async_times_out(coordinator):
+    coordinator.timeout = 0.05
+    release = threading.Event()
+    try:
+        _block(coordinator, release)
+        loop = asyncio.new_event_loop()
+        try:
+            with pytest.raises(exc.TimeoutError):
+                loop.run_until_complete(coordinator.run_async(lambda db: 1))
+        finally:
+            loop.close()
+    finally:
+        release.set()
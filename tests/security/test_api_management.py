@@ -1,6 +1,6 @@
 import pytest
 from fastapi import status
-from src.main import app
+from main import app
 from tests.security.utils import SecurityTestClient
 import re
 
@@ -1,7 +1,7 @@
 import pytest
 from fastapi import status
 import time
-from src.main import app
+from main import app
 from tests.security.utils import SecurityTestClient
 
 @pytest.fixture
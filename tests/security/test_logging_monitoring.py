@@ -1,8 +1,8 @@
 import pytest
 import logging
 from datetime import datetime, timedelta
-from src.main import app
-from src.app.core.monitoring import get_security_alerts
+from main import app
+from app.core.monitoring import get_security_alerts
 from tests.security.utils import SecurityTestClient
 from fastapi.testclient import TestClient
 
@@ -2,7 +2,7 @@ import pytest
 from fastapi import status
 import json
 import re
-from src.main import app
+from main import app
 from tests.security.utils import SecurityTestClient
 
 @pytest.fixture
@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+import main
+from app.core.logging_config import log_pipeline
+from app.core.settings import Settings
+from main import create_app
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+
+def test_import_has_no_side_effects(tmp_path):
+    check = (
+        "import sys, threading, main\n"
+        "assert threading.active_count() == 1, threading.enumerate()\n"
+        "assert 'slowapi' not in sys.modules\n"
+    )
+    env = {**os.environ, "PYTHONPATH": os.path.abspath(SRC)}
+    subprocess.run([sys.executable, "-c", check], cwd=tmp_path, env=env, check=True)
+    # No log file and no database were created
+    assert list(tmp_path.iterdir()) == []
+
+def test_lifespan_runs_startup_work(monkeypatch):
+    migrations = []
+    monkeypatch.setattr(main, "init_db", lambda: migrations.append(True))
+    app = create_app(Settings(auto_migrate=True, configure_logging=False, version="9.9"))
+    started = []
+    app.on_event("startup")(lambda: started.append(True))
+
+    with TestClient(app) as client:
+        assert client.get("/api/v1/").json()["version"] == "9.9"
+    assert migrations == [True]
+    assert started == [True]
+
+def test_schema_is_not_created_by_default(monkeypatch):
+    monkeypatch.setattr(main, "init_db", lambda: (_ for _ in ()).throw(AssertionError("migrated")))
+    with TestClient(create_app(Settings(configure_logging=False))):
+        pass
+    assert not log_pipeline.get_stats()["configured"]
+
+def test_request_body_size_is_limited():
+    app = create_app(Settings(max_request_size=100, configure_logging=False))
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/v1/cards/1/transactions/bulk",
+            json=[{"amount": 1.0, "description": "x" * 100, "type": "expense"}]
+        )
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request too large"}
+
+def test_responses_report_process_time():
+    with TestClient(create_app(Settings(configure_logging=False))) as client:
+        response = client.get("/")
+    assert float(response.headers["X-Process-Time"]) >= 0